@@ -174,3 +174,108 @@ LOGGING = {
         },
     },
 }
+
+# 取得スケジューラ（process_source_dataの同時実行数・ホスト単位の礼儀正しいクロール）
+FETCH_MAX_CONCURRENCY = 10  # 全体の同時取得数上限
+FETCH_PER_HOST_CONCURRENCY = 2  # 同一ホストへの同時接続数
+FETCH_PER_HOST_INTERVAL = 1.0  # 同一ホストへのリクエスト開始間隔（秒）
+FETCH_RESPECT_CRAWL_DELAY = True  # robots.txtのCrawl-delayを尊重するか
+
+# HTTPトランスポート（取得・パイプライン・クローラで共有するhttpxクライアント）
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) ..."
+HTTP_USE_HTTP2 = False  # HTTP/2を使用するか（uv sync --extra http2 でh2のインストールが必要）
+HTTP_MAX_CONNECTIONS = 20  # 接続プールの最大接続数
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10  # キープアライブで保持する接続数
+HTTP_KEEPALIVE_EXPIRY = 30.0  # キープアライブの有効期限（秒）
+HTTP_CONNECT_TIMEOUT = 5.0  # 接続タイムアウト（秒）
+HTTP_READ_TIMEOUT = 20.0  # 読み込みタイムアウト（秒）
+HTTP_WRITE_TIMEOUT = 10.0  # 書き込みタイムアウト（秒）
+HTTP_POOL_TIMEOUT = 10.0  # 接続プールの空き待ちタイムアウト（秒）
+HTTP_MAX_RESPONSE_BYTES = 10 * 1024 * 1024  # レスポンスサイズ上限（10MB）
+HTTP_FOLLOW_REDIRECTS = True  # リダイレクトを追従するか
+
+# テキスト抽出（trafilatura）の実行先
+# processはページごとにHTMLをpickleしてワーカーに渡す（forkserverで起動）。通常はthreadで十分
+EXTRACT_EXECUTOR = "thread"  # process / thread / inline
+EXTRACT_MAX_WORKERS = None  # Noneの場合はCPUコア数
+
+# 取得ページのスナップショット（コンテンツアドレス型・gzip圧縮）
+SNAPSHOT_ENABLED = True
+SNAPSHOT_DIR = BASE_DIR / "snapshots"
+SNAPSHOT_RETENTION_DAYS = 30  # snapshot_gcで削除するまでの保持日数
+SNAPSHOT_KEEP_LATEST = 3  # 保持日数を過ぎても情報源ごとに残す最新件数
+
+# ページ内でリンクされたPDFの取得・テキスト抽出（pypdfが必要）
+PDF_FOLLOW_ENABLED = False
+PDF_CACHE_DIR = BASE_DIR / "pdf_cache"  # URL単位のテキストキャッシュ（ETag/Last-Modified・生データハッシュ付き）
+PDF_MAX_PER_SOURCE = 5  # 1ページあたりの取得PDF数上限
+PDF_MAX_BYTES = 20 * 1024 * 1024  # PDFサイズ上限（20MB）
+
+# ブロック単位の変更検知（前回から追加・変更されたブロックと前後関係のみをLLMに送る）
+BLOCK_DIFF_ENABLED = True
+BLOCK_DIFF_MAX_RATIO = 0.5  # 変更ブロックの割合がこれを超える場合はページ全体を送る
+BLOCK_DIFF_CONTEXT = 1  # 変更ブロックの直前に含める行数（見出し・日付など）
+
+# 取得キャッシュ（同一URLを指す情報源間で取得・抽出を共有。実行内は常に有効）
+FETCH_CACHE_TTL = 0  # 0より大きい場合、取得結果をディスクに保存して次回以降の実行でも再利用（秒）
+FETCH_CACHE_DIR = BASE_DIR / "fetch_cache"
+
+# 変更頻度に応じた再取得スケジュール（trail_sync --due-only）
+RECRAWL_MIN_INTERVAL = 60 * 60  # 最短の取得間隔（秒）
+RECRAWL_MAX_INTERVAL = 7 * 24 * 60 * 60  # 最長の取得間隔（秒）
+RECRAWL_HISTORY_LIMIT = 50  # 変更統計の観測回数がこれを超えたら半分に減衰
+RECRAWL_MAX_GROWTH = 2.0  # 1回の取得で延ばせる間隔の上限（平均取得間隔に対する倍率）
+
+# LLM APIクライアント（プロバイダ・APIキーごとに1つを全情報源で共有）
+LLM_MAX_CONNECTIONS = 20  # 接続プールの最大接続数
+LLM_MAX_KEEPALIVE_CONNECTIONS = 10  # キープアライブで保持する接続数
+LLM_KEEPALIVE_EXPIRY = 60.0  # キープアライブの有効期限（秒）
+LLM_TIMEOUT = 600.0  # 応答待ちタイムアウト（秒）
+
+# LLM応答キャッシュ（モデル・プロンプト・スキーマ・生成設定・入力テキストが同じなら再利用）
+# 再実行でも保存済みの応答を使うため既定は無効（trail_sync --llm-cache で実行ごとに有効化）
+LLM_CACHE_ENABLED = False
+LLM_CACHE_DIR = BASE_DIR / "llm_cache"
+LLM_CACHE_TTL = 30 * 24 * 60 * 60  # 有効期限（秒）
+LLM_CACHE_MAX_ENTRIES = 1000  # 保存件数の上限（超えたら古いものから削除）
+
+# LLM APIのレート制限（キーはモデル名の接頭辞。上限を超える呼び出しは順番待ち）
+LLM_RATE_LIMITS = {
+    "deepseek": {"rpm": 60, "tpm": 1_000_000, "concurrency": 10},
+    "gemini": {"rpm": 60, "tpm": 1_000_000, "concurrency": 10},
+}
+LLM_RATE_LIMIT_OUTPUT_RESERVE = 2000  # 1回の呼び出しで見込む出力トークン数（tpmの見積もり用）
+LLM_RATE_LIMIT_MAX_RETRIES = 5  # 429を受けたときのリトライ回数
+
+# 大きなページのチャンク分割（段落・表の行の境界で分割し、並行してLLMに送って結果を結合）
+LLM_CHUNK_ENABLED = False
+LLM_CHUNK_MAX_TOKENS = 8000  # 1チャンクあたりの入力トークン数の上限（推定値）
+
+# 情報源ごとのLLM入力の上限（推定トークン数）。超える分は末尾を切り捨てる（0で無制限。既定は無制限）
+# 実行全体の料金・トークン数の上限は trail_sync --max-cost / --max-input-tokens で指定
+LLM_MAX_INPUT_TOKENS_PER_SOURCE = 0
+
+# LLM応答のストリーミング受信（レコードを受信途中で検証し、構造が崩れた時点で打ち切ってリトライする）
+LLM_STREAMING_ENABLED = False
+
+# 小さな情報源のまとめ解析（変更のあった情報源を見出し付きで1回のLLM呼び出しにまとめ、料金は入力量で按分）
+LLM_BATCH_ENABLED = False
+LLM_BATCH_MAX_TOKENS = 6000  # 1回にまとめる情報源ごとの指示・データの推定トークン数の合計上限
+LLM_BATCH_MAX_SOURCES = 8  # 1回にまとめる情報源数の上限
+
+# LLM呼び出しのヘッジ（主モデルの応答が遅い場合に副モデルにも同じリクエストを送り、先に検証を通った応答を採用）
+LLM_HEDGE_ENABLED = False
+LLM_HEDGE_MODELS = {  # 主モデル → 副モデル
+    "deepseek-reasoner": "gemini-2.5-flash",
+    "deepseek-chat": "gemini-2.5-flash",
+}
+LLM_HEDGE_PERCENTILE = 90  # LlmUsageの直近の実行時間のこのパーセンタイルを過ぎたら副モデルにも送信
+LLM_HEDGE_MIN_SAMPLES = 10  # 実行時間の履歴がこれより少ないモデルはLLM_HEDGE_DEFAULT_DELAYを使う
+LLM_HEDGE_DEFAULT_DELAY = None  # 履歴が少ない場合の待ち時間（秒）。Noneの場合はヘッジしない
+LLM_HEDGE_HISTORY = 100  # 参照する実行時間の履歴の件数
+
+# デバッグ用の出力（LLMの応答・検証エラー時の出力）。バックグラウンドのスレッドで {LLM_ARTIFACT_DIR}/{実行ID}/ に保存
+LLM_ARTIFACTS_ENABLED = True
+LLM_ARTIFACT_DIR = BASE_DIR / "outputs"
+LLM_ARTIFACT_SAMPLE_RATE = 1.0  # 成功時の応答を保存する割合（0〜1。検証エラー時の出力は常に保存）
+LLM_ARTIFACT_MAX_PENDING = 100  # 書き込み待ちの上限（超えた分は破棄）
@@ -4,6 +4,7 @@ from .models.condition import TrailCondition
 from .models.llm_usage import LlmUsage
 from .models.mountain import MountainAlias, MountainGroup
 from .models.prompt_backup import PromptBackup
+from .models.snapshot import PageSnapshot
 from .models.source import DataSource
 
 
@@ -12,13 +13,54 @@ class DataSourceAdmin(admin.ModelAdmin):
     list_display = ["name", "id", "prompt_key", "organization_type", "prefecture_code", "url1", "last_scraped_at"]
     list_filter = ["organization_type", ("last_scraped_at", admin.DateFieldListFilter)]
     search_fields = ["name"]
-    readonly_fields = ["content_hash", "last_scraped_at"]
+    readonly_fields = [
+        "content_hash",
+        "raw_content_hash",
+        "etag",
+        "last_modified",
+        "url2_content_hash",
+        "url2_raw_content_hash",
+        "url2_etag",
+        "url2_last_modified",
+        "extraction_digest",
+        "url2_extraction_digest",
+        "last_scraped_at",
+        "check_count",
+        "change_count",
+        "change_stats_since",
+        "next_due_at",
+    ]
 
     fieldsets = (
         ("基本情報", {"fields": ("name", "organization_type", "prefecture_code", "prompt_key")}),
         ("URL", {"fields": ("url1", "url2")}),
         ("データ形式", {"fields": ("data_format",)}),
-        ("ハッシュ追跡", {"fields": ("content_hash", "last_scraped_at"), "classes": ("collapse",)}),
+        (
+            "ハッシュ追跡",
+            {
+                "fields": (
+                    "content_hash",
+                    "raw_content_hash",
+                    "etag",
+                    "last_modified",
+                    "url2_content_hash",
+                    "url2_raw_content_hash",
+                    "url2_etag",
+                    "url2_last_modified",
+                    "extraction_digest",
+                    "url2_extraction_digest",
+                    "last_scraped_at",
+                ),
+                "classes": ("collapse",),
+            },
+        ),
+        (
+            "再取得スケジュール",
+            {
+                "fields": ("next_due_at", "check_count", "change_count", "change_stats_since"),
+                "classes": ("collapse",),
+            },
+        ),
     )
 
 
@@ -108,10 +150,14 @@ class LlmUsageAdmin(admin.ModelAdmin):
         "cost_usd",
         "execution_time_seconds",
         "success",
+        "cache_hit",
+        "hedged",
     ]
     list_filter = [
         "model",
         "success",
+        "cache_hit",
+        "hedged",
         ("executed_at", admin.DateFieldListFilter),
         "source",
     ]
@@ -121,12 +167,30 @@ class LlmUsageAdmin(admin.ModelAdmin):
         "executed_at",
         "cost_per_condition",
         "total_tokens",
+        "prompt_cache_hit_rate",
     ]
 
     fieldsets = (
-        ("実行情報", {"fields": ("source", "model", "executed_at", "execution_time_seconds", "success")}),
-        ("トークン情報", {"fields": ("prompt_tokens", "thinking_tokens", "output_tokens", "total_tokens")}),
+        (
+            "実行情報",
+            {"fields": ("source", "model", "executed_at", "execution_time_seconds", "success", "cache_hit")},
+        ),
+        (
+            "トークン情報",
+            {
+                "fields": (
+                    "prompt_tokens",
+                    "prompt_cache_hit_tokens",
+                    "prompt_cache_miss_tokens",
+                    "prompt_cache_hit_rate",
+                    "thinking_tokens",
+                    "output_tokens",
+                    "total_tokens",
+                )
+            },
+        ),
         ("コスト情報", {"fields": ("cost_usd", "cost_per_condition")}),
+        ("ヘッジ", {"fields": ("hedged", "hedge_won", "hedge_extra_cost_usd")}),
         ("成果情報", {"fields": ("conditions_extracted",)}),
     )
 
@@ -166,3 +230,12 @@ class PromptBackupAdmin(admin.ModelAdmin):
     @admin.display(description="プロンプト内容")
     def content_preview_short(self, obj):
         return obj.content_preview
+
+
+@admin.register(PageSnapshot)
+class PageSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["fetched_at", "source", "url", "content_hash", "size"]
+    list_filter = [("fetched_at", admin.DateFieldListFilter), "source"]
+    search_fields = ["source__name", "url", "content_hash"]
+    readonly_fields = ["fetched_at"]
+    date_hierarchy = "fetched_at"
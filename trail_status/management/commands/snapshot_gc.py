@@ -0,0 +1,79 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from trail_status.models.snapshot import PageSnapshot
+from trail_status.services.snapshot import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "保持期間を過ぎたページスナップショットと参照されていない保存データを削除"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=getattr(settings, "SNAPSHOT_RETENTION_DAYS", 30),
+            help="保持日数（default: SNAPSHOT_RETENTION_DAYS）",
+        )
+        parser.add_argument(
+            "--keep-latest",
+            type=int,
+            default=getattr(settings, "SNAPSHOT_KEEP_LATEST", 3),
+            help="保持日数を過ぎても情報源ごとに残す最新件数（default: SNAPSHOT_KEEP_LATEST）",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="削除せず、対象件数のみ表示")
+
+    def handle(self, *args, **options):
+        keep_days = options["keep_days"]
+        keep_latest = options["keep_latest"]
+        dry_run = options["dry_run"]
+
+        logger.info(f"snapshot_gc コマンド開始 - keep_days: {keep_days}, keep_latest: {keep_latest}, dry_run: {dry_run}")
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY-RUNモード: 削除は行われません"))
+
+        # 1. 期限切れのスナップショット記録（情報源ごとの最新N件は残す）
+        cutoff = timezone.now() - timedelta(days=keep_days)
+        expired_ids = []
+        for source_id in PageSnapshot.objects.values_list("source_id", flat=True).distinct():
+            latest_ids = set(
+                PageSnapshot.objects.filter(source_id=source_id)
+                .order_by("-fetched_at")
+                .values_list("id", flat=True)[:keep_latest]
+            )
+            expired_ids.extend(
+                pk
+                for pk in PageSnapshot.objects.filter(source_id=source_id, fetched_at__lt=cutoff).values_list(
+                    "id", flat=True
+                )
+                if pk not in latest_ids
+            )
+
+        if not dry_run and expired_ids:
+            PageSnapshot.objects.filter(id__in=expired_ids).delete()
+        self.stdout.write(f"期限切れのスナップショット記録: {len(expired_ids)}件")
+
+        # 2. どの記録からも参照されていない保存データ（重複排除済みの本体）
+        #    実行中のtrail_syncが書き込んだ直後のデータを消さないよう、保持期間内に更新されたファイルは残す
+        store = SnapshotStore()
+        referenced = set(PageSnapshot.objects.exclude(id__in=expired_ids).values_list("content_hash", flat=True))
+        orphan_count = 0
+        freed_bytes = 0
+        for content_hash in list(store.iter_hashes()):
+            if content_hash in referenced or store.modified_at(content_hash) >= cutoff.timestamp():
+                continue
+            orphan_count += 1
+            freed_bytes += store.size_of(content_hash)
+            if not dry_run:
+                store.delete(content_hash)
+
+        logger.info(f"snapshot_gc 完了 - 記録: {len(expired_ids)}件, 保存データ: {orphan_count}件 ({freed_bytes} bytes)")
+        self.stdout.write(
+            self.style.SUCCESS(f"参照されていない保存データ: {orphan_count}件 ({freed_bytes / 1024:.1f} KB)")
+        )
@@ -1,21 +1,42 @@
 import asyncio
 import logging
+import uuid
+from datetime import datetime
 from decimal import Decimal
+from pathlib import Path
 from typing import Any
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 from trail_status.models.llm_usage import LlmUsage
+from trail_status.models.snapshot import PageSnapshot
 from trail_status.models.source import DataSource
+from trail_status.services.artifacts import artifact_writer
+from trail_status.services.budget import RunBudget
+from trail_status.services.executor import EXECUTOR_KINDS, ExtractionExecutor
+from trail_status.services.fetch_cache import FetchCache
+from trail_status.services.hedging import HedgePolicy
+from trail_status.services.llm_cache import LlmResponseCache
+from trail_status.services.llm_registry import llm_client_registry
 from trail_status.services.llm_stats import LlmStats
-from trail_status.services.pipeline import TrailConditionPipeline
+from trail_status.services.pipeline import URL_SLOTS, TrailConditionPipeline, url_state_prefix
+from trail_status.services.recrawl import RecrawlPolicy, RecrawlState
+from trail_status.services.replay import ReplayFetcher, ReplayLlmClient, load_snapshot_dir
+from trail_status.services.scheduler import PolitenessScheduler
 from trail_status.services.schema import TrailConditionSchemaInternal, TrailConditionSchemaList
+from trail_status.services.snapshot import SnapshotStore
 from trail_status.services.synchronizer import sync_trail_conditions
 from trail_status.services.types import UpdatedDataList, UpdatedDataSingle
 
 logger = logging.getLogger(__name__)
 
+# URLごとに保持する取得状態のフィールド（url2は"url2_"接頭辞付き）
+FETCH_STATE_FIELDS = ("content_hash", "raw_content_hash", "etag", "last_modified", "block_hashes", "extraction_digest")
+
 
 class Command(BaseCommand):
     help = "登山道状況の自動スクレイピング・AI解析・DB同期パイプライン"
@@ -29,13 +50,85 @@ class Command(BaseCommand):
             help="使用するAIモデル（指定しなければプロンプトファイル設定またはデフォルトを使用）",
         )
         parser.add_argument("--dry-run", action="store_true", help="実際にDBに保存せず、処理結果のみ表示")
+        parser.add_argument(
+            "--due-only",
+            action="store_true",
+            help="変更頻度から推定した次回取得予定を過ぎた情報源（未取得を含む）のみ処理",
+        )
+        parser.add_argument("--max-concurrency", type=int, help="全体の同時取得数上限（指定しなければ設定値）")
+        parser.add_argument("--per-host-concurrency", type=int, help="同一ホストへの同時接続数（指定しなければ設定値）")
+        parser.add_argument(
+            "--extract-executor",
+            type=str,
+            choices=EXECUTOR_KINDS,
+            help="テキスト抽出の実行方式（指定しなければ設定値）",
+        )
+        parser.add_argument("--extract-workers", type=int, help="テキスト抽出のワーカー数（指定しなければCPUコア数）")
+        parser.add_argument(
+            "--follow-pdf",
+            action="store_true",
+            help="ページ内でリンクされたPDFも取得してAI解析に含める（pypdfが必要。指定しなければPDF_FOLLOW_ENABLED）",
+        )
+        parser.add_argument(
+            "--llm-cache",
+            action="store_true",
+            help="入力が同じであれば保存済みのLLM応答を再利用する（指定しなければLLM_CACHE_ENABLED）",
+        )
+        parser.add_argument(
+            "--no-llm-cache", action="store_true", help="保存済みのLLM応答を使わず、必ずAPIを呼び出す"
+        )
+        parser.add_argument(
+            "--batch",
+            action="store_true",
+            help="変更のあった小さな情報源を1回のLLM呼び出しにまとめる（指定しなければLLM_BATCH_ENABLED）",
+        )
+        parser.add_argument(
+            "--hedge",
+            action="store_true",
+            help="主モデルの応答が直近の実行時間の上位パーセンタイルを超えたら副モデルにも送信（指定しなければLLM_HEDGE_ENABLED）",
+        )
+        parser.add_argument(
+            "--max-cost",
+            type=float,
+            help="実行全体のLLM料金の上限（ドル）。見込みが上限に達したら以降のLLM呼び出しを行わない",
+        )
+        parser.add_argument(
+            "--max-input-tokens", type=int, help="実行全体のLLM入力トークン数の上限（送信前の推定値で判定）"
+        )
+        parser.add_argument(
+            "--replay",
+            type=str,
+            metavar="SNAPSHOT_DIR|RUN_ID",
+            help="ネットワークに接続せず保存済みスナップショットで再実行（DBには保存されません）。"
+            "ディレクトリの場合は {source_id}.html[.gz]（URL②は {source_id}_2.html[.gz]）を読み込み、"
+            "それ以外は実行IDとして扱う",
+        )
+        parser.add_argument(
+            "--replay-llm",
+            type=str,
+            choices=["stub", "live"],
+            default="stub",
+            help="リプレイ時のLLM（stub: ローカル代替 / live: 実際のAPI）(default: stub)",
+        )
+        parser.add_argument("--llm-fixture", type=str, help="ローカル代替LLMが返すJSONファイル（省略時は空リスト）")
+        parser.add_argument("--llm-latency", type=float, default=0.0, help="ローカル代替LLMの疑似遅延（秒）")
 
     def handle(self, *args, **options):
         source_id = options.get("source")
         ai_model = options.get("model")
         dry_run = options["dry_run"]
+        replay = options.get("replay")
+        run_id = uuid.uuid4().hex
 
-        logger.info(f"trail_sync コマンド開始 - source_id: {source_id}, model: {ai_model}, dry_run: {dry_run}")
+        # リプレイは再現・ベンチマーク用のため、DBには書き込まない
+        if replay:
+            dry_run = True
+
+        logger.info(
+            f"trail_sync コマンド開始 - run_id: {run_id}, source_id: {source_id}, model: {ai_model}, "
+            f"dry_run: {dry_run}, replay: {replay}"
+        )
+        self.stdout.write(f"実行ID: {run_id}")
 
         if dry_run:
             self.stdout.write(self.style.WARNING("DRY-RUNモード: DBには保存されません"))
@@ -44,58 +137,245 @@ class Command(BaseCommand):
         if source_id:
             try:
                 source = DataSource.objects.get(id=source_id)
-                source_data_list = [
-                    {
-                        "id": source.id, 
-                        "name": source.name, 
-                        "url1": source.url1, 
-                        "prompt_key": source.prompt_key,
-                        "content_hash": source.content_hash
-                    }
-                ]
+                source_data_list = [self._to_source_data(source)]
                 self.stdout.write(f"情報源: {source.name}")
             except DataSource.DoesNotExist:
                 logger.error(f"指定された情報源が見つかりません: {source_id}")
                 self.stdout.write(self.style.ERROR(f"指定された情報源が見つかりません: {source_id}"))
                 return
+        elif options["due_only"]:
+            now = timezone.now()
+            due_sources = DataSource.objects.filter(Q(next_due_at__isnull=True) | Q(next_due_at__lte=now))
+            source_data_list = [self._to_source_data(s) for s in due_sources]
+            self.stdout.write(f"取得予定を過ぎた情報源を処理: {len(source_data_list)}件 / {DataSource.objects.count()}件")
         else:
-            source_data_list = [
-                {
-                    "id": s.id, 
-                    "name": s.name, 
-                    "url1": s.url1, 
-                    "prompt_key": s.prompt_key,
-                    "content_hash": s.content_hash
-                }
-                for s in DataSource.objects.all()
-            ]
+            source_data_list = [self._to_source_data(s) for s in DataSource.objects.all()]
             self.stdout.write(f"全ての情報源を処理: {len(source_data_list)}件")
 
         # パイプライン処理を実行（純粋にasync処理のみ）
-        pipeline = TrailConditionPipeline()
-        results = asyncio.run(pipeline.process_source_data(source_data_list, ai_model))
+        executor = ExtractionExecutor.from_settings(
+            kind=options.get("extract_executor"),
+            max_workers=options.get("extract_workers"),
+        )
+        if replay:
+            try:
+                source_data_list, pages = self._prepare_replay(replay, source_data_list)
+            except FileNotFoundError as e:
+                self.stdout.write(self.style.ERROR(str(e)))
+                return
+            self.stdout.write(self.style.WARNING(f"リプレイモード: {replay} ({len(source_data_list)}件)"))
+            # ネットワークに接続しないため、ホスト単位の待機・robots.txt取得は行わない
+            scheduler = PolitenessScheduler(
+                max_concurrency=max(len(source_data_list), 1),
+                per_host_concurrency=max(len(source_data_list), 1),
+                per_host_interval=0.0,
+                respect_crawl_delay=False,
+            )
+            llm_client_factory = None
+            if options["replay_llm"] == "stub":
+                llm_client_factory = ReplayLlmClient.factory(options.get("llm_fixture"), options["llm_latency"])
+            pipeline = TrailConditionPipeline(
+                scheduler=scheduler,
+                executor=executor,
+                fetcher=ReplayFetcher(pages, executor=executor),
+                llm_client_factory=llm_client_factory,
+                follow_pdf=False,  # PDFの取得にはネットワーク接続が必要
+                fetch_cache=FetchCache(ttl=0),  # 前回以前の実行の取得結果は使わない
+                save_snapshots=False,  # 保存済みデータの再保存は不要
+            )
+            if options["replay_llm"] == "stub":
+                pipeline.llm_cache = None  # ローカル代替の応答は保存しない
+        else:
+            scheduler = PolitenessScheduler.from_settings(
+                max_concurrency=options.get("max_concurrency"),
+                per_host_concurrency=options.get("per_host_concurrency"),
+            )
+            try:
+                pipeline = TrailConditionPipeline(
+                    scheduler=scheduler,
+                    executor=executor,
+                    follow_pdf=True if options["follow_pdf"] else None,
+                )
+            except ValueError as e:
+                self.stdout.write(self.style.ERROR(str(e)))
+                return
+        if options["llm_cache"] and pipeline.llm_cache is None and not (replay and options["replay_llm"] == "stub"):
+            pipeline.llm_cache = LlmResponseCache()
+        if options["no_llm_cache"]:
+            pipeline.llm_cache = None
+        if options["batch"]:
+            pipeline.batch = True
+        if options["hedge"] or pipeline.hedge_policy is not None:
+            pipeline.hedge_policy = HedgePolicy.from_settings(latencies=self._load_latency_history())
+        pipeline.budget = RunBudget(max_cost=options.get("max_cost"), max_input_tokens=options.get("max_input_tokens"))
+        artifact_writer.start_run(run_id)
+        try:
+            results = asyncio.run(self._run_pipeline(pipeline, source_data_list, ai_model))
+        finally:
+            executor.shutdown()
+            artifact_writer.close()
 
         # DB保存（同期処理）
         if not dry_run:
-            self.save_results_to_database(results)
+            self.save_results_to_database(results, run_id)
 
         # 結果サマリーを表示
         summary = self.generate_summary(results)
+        summary["scheduler_stats"] = scheduler.stats.to_dict()
+        summary["loop_block_stats"] = pipeline.loop_monitor.to_dict()
+        summary["fetch_cache_stats"] = pipeline.fetch_cache.stats.to_dict()
+        if pipeline.llm_cache is not None:
+            summary["llm_cache_stats"] = pipeline.llm_cache.stats.to_dict()
+        if pipeline.budget.limited:
+            summary["budget"] = pipeline.budget.to_dict()
         self.print_summary(summary)
 
-    def save_results_to_database(self, results: UpdatedDataList) -> None:
+    @staticmethod
+    async def _run_pipeline(
+        pipeline: TrailConditionPipeline, source_data_list: list[dict[str, Any]], ai_model: str | None
+    ) -> UpdatedDataList:
+        """パイプラインを実行し、終了時に共有LLMクライアントの接続を閉じる"""
+        try:
+            return await pipeline.process_source_data(source_data_list, ai_model)
+        finally:
+            await llm_client_registry.aclose()
+
+    @staticmethod
+    def _load_latency_history() -> dict[str, list[float]]:
+        """ヘッジ判定用に、モデルごとの直近のLLM実行時間を取得（キャッシュ利用・ヘッジ送信時を除く）"""
+        limit = getattr(settings, "LLM_HEDGE_HISTORY", 100)
+        latencies = {}
+        for model in LlmUsage.objects.values_list("model", flat=True).distinct():
+            latencies[model] = list(
+                LlmUsage.objects.filter(
+                    model=model, success=True, cache_hit=False, hedged=False, execution_time_seconds__isnull=False
+                )
+                .order_by("-executed_at")
+                .values_list("execution_time_seconds", flat=True)[:limit]
+            )
+        return latencies
+
+    def _to_source_data(self, source: DataSource) -> dict[str, Any]:
+        """パイプラインに渡すソースデータ（ORMから切り離したdict）"""
+        return {
+            "id": source.id,
+            "name": source.name,
+            "url1": source.url1,
+            "url2": source.url2,
+            "prompt_key": source.prompt_key,
+            **self._fetch_state_of(source),
+        }
+
+    def _fetch_state_of(self, source: DataSource) -> dict[str, Any]:
+        """URLごとの前回の取得状態（url1は接頭辞なし、url2は"url2_"）"""
+        state = {}
+        for slot in URL_SLOTS:
+            prefix = url_state_prefix(slot)
+            for field in FETCH_STATE_FIELDS:
+                state[f"{prefix}{field}"] = getattr(source, f"{prefix}{field}")
+        return state
+
+    def _prepare_replay(
+        self, replay: str, source_data_list: list[dict[str, Any]]
+    ) -> tuple[list[dict[str, Any]], dict[str, bytes]]:
+        """
+        リプレイ対象のソースデータと保存済みページ（URL → 生データ）を準備
+
+        前回のハッシュ・検証子は消去し、全ての対象をコンテンツ変更ありとして処理する。
+        """
+        if Path(replay).is_dir():
+            pages_by_id = load_snapshot_dir(Path(replay))
+            pages = {}
+            for sd in source_data_list:
+                for slot, raw in pages_by_id.get(sd["id"], {}).items():
+                    if sd.get(slot):
+                        pages[sd[slot]] = raw
+        else:
+            store = SnapshotStore()
+            pages = {}
+            snapshots = PageSnapshot.objects.filter(run_id=replay, source_id__in=[sd["id"] for sd in source_data_list])
+            for snapshot in snapshots.order_by("fetched_at"):
+                pages[snapshot.url] = store.get(snapshot.content_hash)
+            # 生データが前回と同じページはその実行で記録されないため、実行時点で最新のスナップショットを使う
+            run_time = max((snapshot.fetched_at for snapshot in snapshots), default=None)
+            for sd in source_data_list:
+                for url in (sd.get(slot) for slot in URL_SLOTS):
+                    if run_time is None or not url or url in pages:
+                        continue
+                    latest = (
+                        PageSnapshot.objects.filter(source_id=sd["id"], url=url, fetched_at__lte=run_time)
+                        .order_by("-fetched_at")
+                        .first()
+                    )
+                    if latest is not None:
+                        pages[url] = store.get(latest.content_hash)
+
+        if not pages:
+            raise FileNotFoundError(f"リプレイ用のスナップショットが見つかりません: {replay}")
+
+        replay_source_data_list = []
+        for sd in source_data_list:
+            if sd["url1"] not in pages:
+                continue
+            replay_sd = {**sd, **{key: "" for key in self._fetch_state_keys()}}
+            # スナップショットの無いURL②は対象外
+            if sd.get("url2") not in pages:
+                replay_sd["url2"] = ""
+            replay_source_data_list.append(replay_sd)
+        return replay_source_data_list, pages
+
+    @staticmethod
+    def _fetch_state_keys() -> list[str]:
+        return [f"{url_state_prefix(slot)}{field}" for slot in URL_SLOTS for field in FETCH_STATE_FIELDS]
+
+    @staticmethod
+    def _fit_validator(field_name: str, value: str) -> str:
+        """保存できない長さの検証子（ETag・Last-Modified）は破棄（次回は条件なしのGETになる）"""
+        max_length = DataSource._meta.get_field(field_name).max_length
+        if len(value) > max_length:
+            logger.warning(f"{field_name}が{max_length}文字を超えるため保存しません（{len(value)}文字）")
+            return ""
+        return value
+
+    def save_results_to_database(self, results: UpdatedDataList, run_id: str = "") -> None:
         """処理結果をDBに保存"""
-        from django.utils import timezone
+        recrawl_policy = RecrawlPolicy.from_settings()
 
         for source_data, result in results:
             if result.get("success"):
                 source = DataSource.objects.get(id=source_data["id"])
                 
-                # コンテンツハッシュとスクレイピング時刻を更新
-                if "new_hash" in result:
-                    source.content_hash = result["new_hash"]
+                # URLごとのコンテンツハッシュ・条件付きGET用の検証子・スクレイピング時刻を更新
+                pages = result.get("pages", {})
+                if pages:
+                    update_fields = ["last_scraped_at"]
+                    for slot, page in pages.items():
+                        if "error" in page:
+                            continue  # 取得に失敗したURLは前回の状態を維持
+                        prefix = url_state_prefix(slot)
+                        setattr(source, f"{prefix}content_hash", page["new_hash"])
+                        setattr(source, f"{prefix}raw_content_hash", page.get("new_raw_hash", ""))
+                        for field in ("etag", "last_modified"):
+                            field_name = f"{prefix}{field}"
+                            setattr(source, field_name, self._fit_validator(field_name, page.get(field, "")))
+                        setattr(source, f"{prefix}block_hashes", page.get("block_hashes", []))
+                        setattr(source, f"{prefix}extraction_digest", page.get("extraction_digest", ""))
+                        update_fields += [f"{prefix}{field}" for field in FETCH_STATE_FIELDS]
+
+                        # 取得したページのスナップショットを情報源に紐付け
+                        if page.get("snapshot_hash"):
+                            PageSnapshot.objects.create(
+                                source=source,
+                                url=page["snapshot_url"],
+                                content_hash=page["snapshot_hash"],
+                                size=page.get("snapshot_size", 0),
+                                run_id=run_id,
+                            )
                     source.last_scraped_at = timezone.now()
-                    source.save(update_fields=["content_hash", "last_scraped_at"])
+                    update_fields += self._update_recrawl_state(
+                        source, pages, source.last_scraped_at, recrawl_policy
+                    )
+                    source.save(update_fields=update_fields)
 
                 # コンテンツ変更なしの場合はLLM関連処理をスキップ
                 if not result.get("content_changed", True):
@@ -108,9 +388,11 @@ class Command(BaseCommand):
 
                 # AIの結果をInternal schemaに変換
                 trail_conditions_list = result["extracted_trail_conditions"]  # TrailConditionSchemaList
+                records = trail_conditions_list.trail_condition_records
+                record_urls = result.get("record_urls") or [source_data["url1"]] * len(records)
                 internal_data_list = [
-                    TrailConditionSchemaInternal(**condition.model_dump(), url1=source_data["url1"])
-                    for condition in trail_conditions_list.trail_condition_records
+                    TrailConditionSchemaInternal(**condition.model_dump(), url1=url)
+                    for condition, url in zip(records, record_urls)
                 ]
 
                 # DB同期とLLM使用履歴記録
@@ -129,19 +411,40 @@ class Command(BaseCommand):
                     )
                 )
 
+    def _update_recrawl_state(
+        self, source: DataSource, pages: dict[str, dict], now: datetime, policy: RecrawlPolicy
+    ) -> list[str]:
+        """変更統計に今回の結果を加えて次回取得予定を更新（更新したフィールド名を返す）"""
+        changed = any(page.get("content_changed") for page in pages.values())
+        state = RecrawlState(source.check_count, source.change_count, source.change_stats_since).record(
+            changed, now, policy
+        )
+        source.check_count = state.check_count
+        source.change_count = state.change_count
+        source.change_stats_since = state.stats_since
+        source.next_due_at = state.next_due_at
+        return ["check_count", "change_count", "change_stats_since", "next_due_at"]
+
     def _save_llm_usage(self, source: DataSource, llm_stats: LlmStats, generated_data_count: int) -> None:
-        """LLM使用履歴をDBに保存"""
+        """LLM使用履歴をDBに保存（応答キャッシュを再利用した場合はAPIを呼んでいないためトークン数は0）"""
         stats = llm_stats.to_dict()
+        cache_hit = stats.get("cache_hit", False)
         LlmUsage.objects.create(
             source=source,
             model=stats["model"],
-            prompt_tokens=stats["input_tokens"],
-            thinking_tokens=stats["thoughts_tokens"],
-            output_tokens=stats["output_tokens"],
+            prompt_tokens=0 if cache_hit else stats["input_tokens"],
+            prompt_cache_hit_tokens=0 if cache_hit else stats["prompt_cache_hit_tokens"],
+            prompt_cache_miss_tokens=0 if cache_hit else stats["prompt_cache_miss_tokens"],
+            thinking_tokens=0 if cache_hit else stats["thoughts_tokens"],
+            output_tokens=0 if cache_hit else stats["output_tokens"],
             cost_usd=Decimal(str(stats["total_fee"])),
             conditions_extracted=generated_data_count,
             success=True,
             execution_time_seconds=stats.get("execution_time"),  # Noneでも可
+            cache_hit=cache_hit,
+            hedged=stats.get("hedged", False),
+            hedge_won=stats.get("hedge_won", False),
+            hedge_extra_cost_usd=Decimal(str(stats.get("hedge_extra_cost", 0.0))),
         )
 
     def generate_summary(self, results: UpdatedDataList) -> dict[str, Any]:
@@ -161,7 +464,7 @@ class Command(BaseCommand):
                     summary["results"].append({
                         "source_name": source_data["name"],
                         "status": "skipped",
-                        "reason": "コンテンツ変更なし",
+                        "reason": "304 Not Modified" if result.get("not_modified") else "コンテンツ変更なし",
                     })
                     summary["skipped_count"] += 1
                 else:
@@ -210,3 +513,36 @@ class Command(BaseCommand):
 
         self.stdout.write(f"\n成功: {summary['success_count']}件, スキップ: {summary['skipped_count']}件, エラー: {summary['error_count']}件")
         self.stdout.write(f"取得された状況情報の総数: {summary['total_conditions']}件")
+
+        scheduler_stats = summary.get("scheduler_stats")
+        if scheduler_stats:
+            self.stdout.write(
+                f"取得待ち: 平均{scheduler_stats['average_wait_time']:.2f}秒, "
+                f"最大{scheduler_stats['max_wait_time']:.2f}秒, 最大待ち行列: {scheduler_stats['max_queue_depth']}件"
+            )
+
+        fetch_cache_stats = summary.get("fetch_cache_stats")
+        if fetch_cache_stats:
+            self.stdout.write(
+                f"ページ取得: {fetch_cache_stats['fetches']}回 (再利用: {fetch_cache_stats['hits']}回, "
+                f"相乗り: {fetch_cache_stats['coalesced']}回, ディスク: {fetch_cache_stats['disk_hits']}回)"
+            )
+
+        llm_cache_stats = summary.get("llm_cache_stats")
+        if llm_cache_stats:
+            self.stdout.write(f"LLMキャッシュ: ヒット{llm_cache_stats['hits']}回, ミス{llm_cache_stats['misses']}回")
+
+        budget = summary.get("budget")
+        if budget:
+            self.stdout.write(
+                f"LLM予算: 料金${budget['spent_cost']:.4f} (上限: {budget['max_cost'] or 'なし'}), "
+                f"入力トークン{budget['spent_input_tokens']} (上限: {budget['max_input_tokens'] or 'なし'}), "
+                f"予算超過で未送信: {budget['rejected']}回"
+            )
+
+        loop_block_stats = summary.get("loop_block_stats")
+        if loop_block_stats:
+            self.stdout.write(
+                f"イベントループのブロック: 合計{loop_block_stats['blocked_time']:.2f}秒, "
+                f"最大{loop_block_stats['max_block']:.2f}秒 ({loop_block_stats['block_count']}回)"
+            )
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0009_alter_trailcondition_reported_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='etag',
+            field=models.CharField(blank=True, help_text='前回レスポンスのETag（If-None-Match用）', max_length=200, verbose_name='ETag'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='last_modified',
+            field=models.CharField(blank=True, help_text='前回レスポンスのLast-Modified（If-Modified-Since用）', max_length=100, verbose_name='Last-Modified'),
+        ),
+    ]
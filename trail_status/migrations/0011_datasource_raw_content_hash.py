@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0010_datasource_etag_last_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='raw_content_hash',
+            field=models.CharField(blank=True, help_text='レスポンス生バイト列のハッシュ値（一致すればテキスト抽出を省略）', max_length=64, verbose_name='生データハッシュ'),
+        ),
+    ]
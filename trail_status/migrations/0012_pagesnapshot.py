@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0011_datasource_raw_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, verbose_name='取得URL')),
+                ('content_hash', models.CharField(db_index=True, help_text='SnapshotStoreのキー（SHA256）', max_length=64, verbose_name='生データハッシュ')),
+                ('size', models.IntegerField(default=0, verbose_name='サイズ(bytes)')),
+                ('fetched_at', models.DateTimeField(auto_now_add=True, verbose_name='取得日時')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='trail_status.datasource', verbose_name='情報源')),
+            ],
+            options={
+                'verbose_name': 'ページスナップショット',
+                'verbose_name_plural': 'ページスナップショット',
+                'ordering': ['-fetched_at'],
+                'indexes': [models.Index(fields=['source', '-fetched_at'], name='trail_statu_source__683833_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0012_pagesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagesnapshot',
+            name='run_id',
+            field=models.CharField(blank=True, db_index=True, help_text='trail_syncの実行単位（リプレイ用）', max_length=32, verbose_name='実行ID'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0013_pagesnapshot_run_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='url2_content_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='URL②コンテンツハッシュ'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='url2_etag',
+            field=models.CharField(blank=True, max_length=200, verbose_name='URL②ETag'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='url2_last_modified',
+            field=models.CharField(blank=True, max_length=100, verbose_name='URL②Last-Modified'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='url2_raw_content_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='URL②生データハッシュ'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0014_datasource_url2_fetch_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='block_hashes',
+            field=models.JSONField(blank=True, default=list, help_text='抽出テキストの各ブロックのハッシュ値（前回取得時）', verbose_name='ブロックハッシュ'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='url2_block_hashes',
+            field=models.JSONField(blank=True, default=list, verbose_name='URL②ブロックハッシュ'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0015_datasource_block_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='change_count',
+            field=models.FloatField(default=0, help_text='前回の取得から内容が変わっていた回数', verbose_name='変更回数'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='change_stats_since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='変更統計の起点'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='check_count',
+            field=models.FloatField(default=0, help_text='変更統計の観測回数（古い履歴は減衰）', verbose_name='取得回数'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='next_due_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='変更頻度から推定した次回の取得時刻', null=True, verbose_name='次回取得予定'),
+        ),
+    ]
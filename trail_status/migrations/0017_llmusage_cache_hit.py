@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0016_datasource_recrawl_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmusage',
+            name='cache_hit',
+            field=models.BooleanField(default=False, help_text='保存済みの応答を再利用（API呼び出しなし）', verbose_name='キャッシュ利用'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-17 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0017_llmusage_cache_hit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmusage',
+            name='prompt_cache_hit_tokens',
+            field=models.IntegerField(default=0, help_text='プロバイダのプレフィックスキャッシュから読まれた入力（割引料金）', verbose_name='キャッシュヒット入力トークン数'),
+        ),
+        migrations.AddField(
+            model_name='llmusage',
+            name='prompt_cache_miss_tokens',
+            field=models.IntegerField(default=0, verbose_name='キャッシュミス入力トークン数'),
+        ),
+    ]
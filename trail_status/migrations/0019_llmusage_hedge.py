@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-17 02:12
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0018_llmusage_prompt_cache_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmusage',
+            name='hedge_extra_cost_usd',
+            field=models.DecimalField(decimal_places=6, default=Decimal('0.000000'), max_digits=10, verbose_name='ヘッジ追加コスト(USD)'),
+        ),
+        migrations.AddField(
+            model_name='llmusage',
+            name='hedge_won',
+            field=models.BooleanField(default=False, help_text='ヘッジ時に副モデルの応答を採用（modelは採用したモデル）', verbose_name='副モデル採用'),
+        ),
+        migrations.AddField(
+            model_name='llmusage',
+            name='hedged',
+            field=models.BooleanField(default=False, help_text='応答が遅いため副モデルにも同じリクエストを送信', verbose_name='ヘッジ送信'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_status', '0019_llmusage_hedge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='extraction_digest',
+            field=models.CharField(blank=True, help_text='抽出設定が変わった場合は生データが同じでも抽出し直す', max_length=64, verbose_name='抽出設定ハッシュ'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='url2_extraction_digest',
+            field=models.CharField(blank=True, max_length=64, verbose_name='URL②抽出設定ハッシュ'),
+        ),
+    ]
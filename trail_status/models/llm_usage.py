@@ -16,6 +16,10 @@ class LlmUsage(models.Model):
     prompt_tokens = models.IntegerField("入力トークン数",default=0)
     thinking_tokens = models.IntegerField("思考トークン数", default=0)
     output_tokens = models.IntegerField("出力トークン数",default=0)
+    prompt_cache_hit_tokens = models.IntegerField(
+        "キャッシュヒット入力トークン数", default=0, help_text="プロバイダのプレフィックスキャッシュから読まれた入力（割引料金）"
+    )
+    prompt_cache_miss_tokens = models.IntegerField("キャッシュミス入力トークン数", default=0)
 
     # コスト情報
     cost_usd = models.DecimalField("コスト(USD)", max_digits=10, decimal_places=6, default=Decimal("0.000000"))
@@ -27,6 +31,12 @@ class LlmUsage(models.Model):
     # メタデータ
     executed_at = models.DateTimeField("実行日時", auto_now_add=True)
     execution_time_seconds = models.FloatField("実行時間(秒)", null=True, blank=True)
+    cache_hit = models.BooleanField("キャッシュ利用", default=False, help_text="保存済みの応答を再利用（API呼び出しなし）")
+    hedged = models.BooleanField("ヘッジ送信", default=False, help_text="応答が遅いため副モデルにも同じリクエストを送信")
+    hedge_won = models.BooleanField("副モデル採用", default=False, help_text="ヘッジ時に副モデルの応答を採用（modelは採用したモデル）")
+    hedge_extra_cost_usd = models.DecimalField(
+        "ヘッジ追加コスト(USD)", max_digits=10, decimal_places=6, default=Decimal("0.000000")
+    )
 
     class Meta:
         verbose_name = "LLM利用履歴"
@@ -44,6 +54,11 @@ class LlmUsage(models.Model):
             return self.cost_usd / self.conditions_extracted
         return Decimal("0")
 
+    @property
+    def prompt_cache_hit_rate(self) -> float:
+        """入力トークンのうちプレフィックスキャッシュから読まれた割合"""
+        return self.prompt_cache_hit_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
     @property
     def total_tokens(self):
         """総トークン数"""
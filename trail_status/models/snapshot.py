@@ -0,0 +1,25 @@
+from django.db import models
+
+from .source import DataSource
+
+
+class PageSnapshot(models.Model):
+    """取得したページの生データ（本体はSnapshotStoreにハッシュ単位で重複なく保存）"""
+
+    source = models.ForeignKey(DataSource, on_delete=models.CASCADE, related_name="snapshots", verbose_name="情報源")
+    url = models.URLField("取得URL", max_length=500)
+    content_hash = models.CharField("生データハッシュ", max_length=64, db_index=True, help_text="SnapshotStoreのキー（SHA256）")
+    size = models.IntegerField("サイズ(bytes)", default=0)
+    run_id = models.CharField("実行ID", max_length=32, blank=True, db_index=True, help_text="trail_syncの実行単位（リプレイ用）")
+    fetched_at = models.DateTimeField("取得日時", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "ページスナップショット"
+        verbose_name_plural = "ページスナップショット"
+        ordering = ["-fetched_at"]
+        indexes = [
+            models.Index(fields=["source", "-fetched_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.source.name} - {self.content_hash[:8]} ({self.fetched_at.strftime('%Y-%m-%d %H:%M')})"
@@ -39,12 +39,50 @@ class DataSource(models.Model):
         blank=True, 
         help_text="スクレイピング内容のハッシュ値（変更検知用）"
     )
+    raw_content_hash = models.CharField(
+        "生データハッシュ",
+        max_length=64,
+        blank=True,
+        help_text="レスポンス生バイト列のハッシュ値（一致すればテキスト抽出を省略）",
+    )
     last_scraped_at = models.DateTimeField(
         "最終スクレイピング日時", 
         null=True, 
         blank=True,
         help_text="最後にコンテンツを取得した日時"
     )
+
+    # 条件付きGET（サーバーが返した検証子）
+    etag = models.CharField("ETag", max_length=200, blank=True, help_text="前回レスポンスのETag（If-None-Match用）")
+    last_modified = models.CharField(
+        "Last-Modified", max_length=100, blank=True, help_text="前回レスポンスのLast-Modified（If-Modified-Since用）"
+    )
+
+    # URL②の取得状態（URL①と同じ変更検知をURLごとに行う）
+    url2_content_hash = models.CharField("URL②コンテンツハッシュ", max_length=64, blank=True)
+    url2_raw_content_hash = models.CharField("URL②生データハッシュ", max_length=64, blank=True)
+    url2_etag = models.CharField("URL②ETag", max_length=200, blank=True)
+    url2_last_modified = models.CharField("URL②Last-Modified", max_length=100, blank=True)
+
+    # ブロック単位の変更検知（変更のあったブロックのみLLMに送る）
+    block_hashes = models.JSONField(
+        "ブロックハッシュ", default=list, blank=True, help_text="抽出テキストの各ブロックのハッシュ値（前回取得時）"
+    )
+    url2_block_hashes = models.JSONField("URL②ブロックハッシュ", default=list, blank=True)
+
+    # 前回の抽出に使った設定（プロンプトファイルの extraction: セクション）のハッシュ
+    extraction_digest = models.CharField(
+        "抽出設定ハッシュ", max_length=64, blank=True, help_text="抽出設定が変わった場合は生データが同じでも抽出し直す"
+    )
+    url2_extraction_digest = models.CharField("URL②抽出設定ハッシュ", max_length=64, blank=True)
+
+    # 変更頻度に応じた再取得スケジュール（trail_sync --due-only）
+    check_count = models.FloatField("取得回数", default=0, help_text="変更統計の観測回数（古い履歴は減衰）")
+    change_count = models.FloatField("変更回数", default=0, help_text="前回の取得から内容が変わっていた回数")
+    change_stats_since = models.DateTimeField("変更統計の起点", null=True, blank=True)
+    next_due_at = models.DateTimeField(
+        "次回取得予定", null=True, blank=True, db_index=True, help_text="変更頻度から推定した次回の取得時刻"
+    )
     
     created_at = models.DateTimeField("登録日時", auto_now_add=True)
     updated_at = models.DateTimeField("更新日時", auto_now=True)
@@ -0,0 +1,170 @@
+import dataclasses
+import itertools
+import logging
+import os
+import queue
+import random
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_CHARS = re.compile(r"[^\w.-]+")
+
+
+@dataclass
+class ArtifactStats:
+    written: int = 0
+    sampled_out: int = 0  # サンプリングで保存しなかった件数
+    dropped: int = 0  # 書き込み待ちが上限に達したため破棄した件数
+    failed: int = 0
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    def __str__(self):
+        return f"保存: {self.written}件, 間引き: {self.sampled_out}件, 破棄: {self.dropped}件, 失敗: {self.failed}件"
+
+
+def artifact_label(prompt_filename: str | None, batch_source_ids: list[int] | None = None) -> str:
+    """ファイル名に使う情報源の識別子（プロンプトファイル名の拡張子なし。まとめ解析の場合は情報源ID）"""
+    if batch_source_ids:
+        label = "batch_" + "-".join(str(source_id) for source_id in batch_source_ids)
+    elif prompt_filename:
+        label = Path(prompt_filename).stem
+    else:
+        label = "unknown"
+    return _UNSAFE_CHARS.sub("_", label)[:100]
+
+
+class ArtifactWriter:
+    """
+    デバッグ用の出力（LLMの応答・検証エラー時の出力）をバックグラウンドのスレッドで保存する
+
+    呼び出し側は書き込み待ちのキューに積むだけで、ファイルI/Oを待たない。キューが上限に達した場合は
+    破棄する（LLMの処理を遅らせない）。保存先: {base_dir}/{run_id}/{連番}_{種類}_{モデル}_{情報源}{拡張子}
+    成功時の応答はLLM_ARTIFACT_SAMPLE_RATEの割合だけ保存し、検証エラー時の出力は常に保存する。
+    """
+
+    def __init__(
+        self,
+        base_dir: Path | None = None,
+        enabled: bool | None = None,
+        sample_rate: float | None = None,
+        max_pending: int | None = None,
+    ):
+        self._base_dir = base_dir
+        self._enabled = enabled
+        self._sample_rate = sample_rate
+        self._max_pending = max_pending
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.stats = ArtifactStats()
+        self._sequence = itertools.count(1)
+        self._queue: queue.Queue | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def base_dir(self) -> Path:
+        return Path(self._base_dir or getattr(settings, "LLM_ARTIFACT_DIR", settings.BASE_DIR / "outputs"))
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled if self._enabled is not None else getattr(settings, "LLM_ARTIFACTS_ENABLED", True)
+
+    @property
+    def sample_rate(self) -> float:
+        return self._sample_rate if self._sample_rate is not None else getattr(settings, "LLM_ARTIFACT_SAMPLE_RATE", 1.0)
+
+    def start_run(self, run_id: str) -> None:
+        """以降の出力を実行IDごとのディレクトリに保存"""
+        self.run_id = run_id
+        self._sequence = itertools.count(1)
+
+    def write_response(self, model: str, label: str, text: str) -> Path | None:
+        """構造化出力に成功した応答を保存（サンプリング対象）"""
+        if self.enabled and random.random() >= self.sample_rate:
+            self.stats.sampled_out += 1
+            return None
+        return self.submit("response", model, label, text, ".json")
+
+    def write_invalid(self, model: str, label: str, text: str) -> Path | None:
+        """検証エラーになった出力を保存"""
+        return self.submit("validation_error", model, label, text, ".txt")
+
+    def submit(self, kind: str, model: str, label: str, text: str, suffix: str) -> Path | None:
+        """
+        書き込み待ちのキューに積み、保存先のパスを返す
+
+        無効な場合・キューが上限に達した場合は保存せずNoneを返す。
+        """
+        if not self.enabled:
+            return None
+        path = self.base_dir / self.run_id / f"{next(self._sequence):04d}_{kind}_{model}_{label}{suffix}"
+        try:
+            self._ensure_worker().put_nowait((path, text))
+        except queue.Full:
+            self.stats.dropped += 1
+            logger.warning(f"デバッグ出力の書き込み待ちが上限に達したため破棄: {path.name}")
+            return None
+        return path
+
+    def _ensure_worker(self) -> queue.Queue:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                max_pending = self._max_pending or getattr(settings, "LLM_ARTIFACT_MAX_PENDING", 100)
+                self._queue = queue.Queue(maxsize=max_pending)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name="artifact-writer", daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def _run(self, pending: queue.Queue) -> None:
+        while True:
+            item = pending.get()
+            if item is None:
+                pending.task_done()
+                return
+            path, text = item
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(text, encoding="utf-8")
+                self.stats.written += 1
+            except OSError as e:
+                self.stats.failed += 1
+                logger.warning(f"デバッグ出力の保存に失敗: {path} - {e}")
+            finally:
+                pending.task_done()
+
+    def flush(self) -> None:
+        """書き込み待ちの出力を全て保存し終えるまで待つ"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self, timeout: float = 30.0) -> None:
+        """
+        書き込み待ちの出力を保存してスレッドを終了（実行の終了時に呼ぶ。次の書き込みで再開する）
+
+        書き込みが詰まっている場合もtimeout秒で打ち切る（スレッドはデーモンのため終了処理を妨げない）。
+        """
+        with self._lock:
+            thread, pending = self._thread, self._queue
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            pending.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning(f"デバッグ出力の書き込み待ちが解消しないため、保存を待たずに終了: 残り{pending.qsize()}件")
+            return
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("デバッグ出力の保存が時間内に終わらないため、保存を待たずに終了")
+
+
+# プロセス全体で共有する書き込みスレッド
+artifact_writer = ArtifactWriter()
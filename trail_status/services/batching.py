@@ -0,0 +1,109 @@
+import logging
+from dataclasses import dataclass
+
+from .llm_client import LlmConfig
+from .llm_stats import LlmStats
+from .schema import TrailConditionSchemaAi, TrailConditionSchemaBatchList, TrailConditionSchemaList
+from .token_estimator import estimate_tokens
+from .types import ModelDataSingle
+
+logger = logging.getLogger(__name__)
+
+BATCH_SECTION_PREFIX = "# 情報源ID: "
+
+BATCH_INSTRUCTION = (
+    "以下は複数の情報源のデータです。「# 情報源ID: n」の見出しごとに、そのセクションの【指示】に従って"
+    "【データ】から登山道状況を抽出してください。各セクションの指示は同じセクションのデータにのみ適用し、"
+    "全てのレコードのsource_idには抽出元のセクションの情報源IDを必ず設定してください。"
+)
+
+
+@dataclass
+class BatchItem:
+    """まとめて解析する候補の情報源（情報源ごとの設定・入力テキストを持つLlmConfig）"""
+
+    source_data: ModelDataSingle
+    config: LlmConfig
+
+    @property
+    def estimated_tokens(self) -> int:
+        """情報源ごとに変わる部分（サイト固有プロンプト + データ）の推定トークン数"""
+        return estimate_tokens(self.config.site_prompt, self.config.model) + estimate_tokens(
+            self.config.data, self.config.model
+        )
+
+
+def batch_key(config: LlmConfig) -> tuple:
+    """同じ呼び出しにまとめられる条件（モデル・生成設定・テンプレートの有無が同じ）"""
+    return (config.model, config.temperature, config.thinking_budget, config.use_template)
+
+
+def plan_batches(items: list[BatchItem], max_tokens: int, max_sources: int) -> list[list[BatchItem]]:
+    """
+    まとめて解析するグループを作成（順序を保って先頭から詰める）
+
+    推定トークン数の合計がmax_tokens、情報源数がmax_sourcesを超えないようにする。
+    単独でmax_tokensを超える情報源は1件のグループとする（従来どおり単独で解析）。
+    """
+    batches: list[list[BatchItem]] = []
+    open_batches: dict[tuple, tuple[list[BatchItem], int]] = {}
+    for item in items:
+        tokens = item.estimated_tokens
+        if tokens > max_tokens:
+            batches.append([item])
+            continue
+        key = batch_key(item.config)
+        batch, total = open_batches.get(key, (None, 0))
+        if batch is None or total + tokens > max_tokens or len(batch) >= max_sources:
+            batch, total = [], 0
+            batches.append(batch)
+        batch.append(item)
+        open_batches[key] = (batch, total + tokens)
+    return batches
+
+
+def build_batch_config(items: list[BatchItem]) -> LlmConfig:
+    """情報源ごとの指示とデータを見出し付きのセクションにまとめた1回分の設定"""
+    sections = []
+    for item in items:
+        source_data = item.source_data
+        sections.append(
+            f"{BATCH_SECTION_PREFIX}{source_data['id']}（{source_data['name']}）\n\n"
+            f"【指示】\n{item.config.site_prompt}\n\n【データ】\n{item.config.data}"
+        )
+    return items[0].config.model_copy(
+        update={
+            "site_prompt": BATCH_INSTRUCTION,
+            "data": "\n\n".join(sections),
+            "prompt_filename": ",".join(item.config.prompt_filename or "" for item in items),
+            "batch_source_ids": [item.source_data["id"] for item in items],
+        }
+    )
+
+
+def split_batch_result(
+    result: TrailConditionSchemaBatchList, source_ids: list[int]
+) -> dict[int, TrailConditionSchemaList]:
+    """まとめて解析した結果を情報源ごとに振り分ける（対象外の情報源IDのレコードは除外）"""
+    records: dict[int, list[TrailConditionSchemaAi]] = {source_id: [] for source_id in source_ids}
+    for record in result.trail_condition_records:
+        if record.source_id not in records:
+            logger.warning(f"対象外の情報源IDのレコードを除外: {record.source_id} - {record.title}")
+            continue
+        records[record.source_id].append(TrailConditionSchemaAi.model_validate(record.model_dump(exclude={"source_id"})))
+    return {
+        source_id: TrailConditionSchemaList(trail_condition_records=source_records)
+        for source_id, source_records in records.items()
+    }
+
+
+def attribute_stats(items: list[BatchItem], llm_stats: LlmStats) -> list[LlmStats]:
+    """まとめた呼び出しのトークン数・料金を、情報源ごとの入力の推定トークン数で按分"""
+    weights = [item.estimated_tokens for item in items]
+    total = sum(weights) or 1
+    attributed = []
+    for weight in weights:
+        stats = llm_stats.scaled(weight / total)
+        stats.batch_size = len(items)
+        attributed.append(stats)
+    return attributed
@@ -0,0 +1,69 @@
+import hashlib
+from dataclasses import dataclass, field
+
+# 抽出テキストは1行が1つの段落・表の行・リスト項目になる
+TABLE_ROW_PREFIX = "|"
+OMISSION_MARK = "…"
+
+
+def split_blocks(text: str) -> list[str]:
+    """抽出テキストをブロック（空行を除く各行）に分割"""
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def hash_block(block: str) -> str:
+    """ブロックのハッシュ値（SHA256の先頭16文字。保存容量を抑えるため短縮）"""
+    return hashlib.sha256(block.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class BlockDiff:
+    """前回取得時のブロックハッシュとの比較結果"""
+
+    blocks: list[str]
+    hashes: list[str]
+    changed: list[int] = field(default_factory=list)  # 追加・変更されたブロックの位置
+
+    @property
+    def changed_ratio(self) -> float:
+        return len(self.changed) / len(self.blocks) if self.blocks else 0.0
+
+
+def diff_blocks(text: str, previous_hashes: list[str] | None) -> BlockDiff:
+    """
+    ブロック単位で変更を検出
+
+    前回のどのブロックとも一致しないブロックを変更ありとする（位置の移動・削除は変更とみなさない）。
+    """
+    blocks = split_blocks(text)
+    hashes = [hash_block(block) for block in blocks]
+    previous = set(previous_hashes or [])
+    changed = [i for i, block_hash in enumerate(hashes) if block_hash not in previous]
+    return BlockDiff(blocks=blocks, hashes=hashes, changed=changed)
+
+
+def render_changed_blocks(diff: BlockDiff, context: int = 1) -> str:
+    """
+    変更ブロックと最小限の前後関係だけを抜き出したテキストを作成
+
+    各変更ブロックの直前 context 行（見出しや日付の行であることが多い）と、表の行であれば表のヘッダー行を含める。
+    連続しない箇所の間には省略記号の行を挟む。
+    """
+    selected: set[int] = set()
+    for i in diff.changed:
+        selected.update(range(max(i - context, 0), i + 1))
+        if diff.blocks[i].startswith(TABLE_ROW_PREFIX):
+            header = i
+            while header > 0 and diff.blocks[header - 1].startswith(TABLE_ROW_PREFIX):
+                header -= 1
+            # ヘッダー行と区切り行（|---|）
+            selected.update(j for j in (header, header + 1) if j < i)
+
+    lines = []
+    previous_index = None
+    for i in sorted(selected):
+        if previous_index is not None and i != previous_index + 1:
+            lines.append(OMISSION_MARK)
+        lines.append(diff.blocks[i])
+        previous_index = i
+    return "\n".join(lines)
@@ -0,0 +1,112 @@
+import dataclasses
+import logging
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from .llm_client import LlmConfig
+from .llm_stats import LlmFee, TokenStats
+from .token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceededError(Exception):
+    """実行全体の予算（料金・入力トークン数）に達したため、LLM呼び出しを行わない"""
+
+
+@dataclass
+class Reservation:
+    """送信前に見積もった1回分の呼び出しの消費量"""
+
+    input_tokens: int
+    cost: float
+
+
+@dataclass
+class RunBudget:
+    """
+    1回の実行（trail_sync）全体のLLM予算
+
+    呼び出しの前に見積もりを確保（reserve）し、応答後に実際の消費量で精算（settle）する。
+    実績と確保中の見積もりの合計が上限を超える呼び出しは送信しない。
+    上限がNoneの項目は制限しない。
+    """
+
+    max_cost: float | None = None  # 料金の上限（ドル）
+    max_input_tokens: int | None = None  # 入力トークン数の上限
+    spent_cost: float = 0.0
+    spent_input_tokens: int = 0
+    reserved_cost: float = 0.0
+    reserved_input_tokens: int = 0
+    rejected: int = 0  # 予算超過で送信しなかった呼び出し数
+
+    @property
+    def limited(self) -> bool:
+        return self.max_cost is not None or self.max_input_tokens is not None
+
+    @staticmethod
+    def estimate(config: LlmConfig) -> Reservation:
+        """プロンプトと入力テキストから1回分の入力トークン数・料金を見積もる（出力は設定値を見込む）"""
+        input_tokens = estimate_tokens(config.full_prompt, config.model) + estimate_tokens(config.data, config.model)
+        output_tokens = getattr(settings, "LLM_RATE_LIMIT_OUTPUT_RESERVE", 2000)
+        fee = LlmFee(config.model)
+        cost = fee.calculate(input_tokens, "input") + fee.calculate(output_tokens, "output")
+        return Reservation(input_tokens=input_tokens, cost=cost)
+
+    def reserve(self, config: LlmConfig) -> Reservation:
+        """
+        呼び出し前に見積もりを確保
+
+        Raises:
+            BudgetExceededError: 確保すると上限を超える場合
+        """
+        reservation = self.estimate(config)
+        projected_cost = self.spent_cost + self.reserved_cost + reservation.cost
+        projected_tokens = self.spent_input_tokens + self.reserved_input_tokens + reservation.input_tokens
+        if self.max_cost is not None and projected_cost > self.max_cost:
+            self.rejected += 1
+            raise BudgetExceededError(
+                f"料金の上限に達するため送信しません（見込み: ${projected_cost:.4f} / 上限: ${self.max_cost:.4f}）"
+            )
+        if self.max_input_tokens is not None and projected_tokens > self.max_input_tokens:
+            self.rejected += 1
+            raise BudgetExceededError(
+                f"入力トークン数の上限に達するため送信しません（見込み: {projected_tokens} / 上限: {self.max_input_tokens}）"
+            )
+        self.reserved_cost += reservation.cost
+        self.reserved_input_tokens += reservation.input_tokens
+        return reservation
+
+    def settle(self, reservation: Reservation, token_stats: TokenStats | None) -> None:
+        """確保した見積もりを解放し、実際の消費量を加算（呼び出しが失敗した場合はNone）"""
+        self.reserved_cost -= reservation.cost
+        self.reserved_input_tokens -= reservation.input_tokens
+        if token_stats is not None:
+            self.spent_cost += token_stats.total_fee
+            self.spent_input_tokens += token_stats.input_tokens or 0
+
+    def charge(self, cost: float) -> None:
+        """トークン統計の無い消費（キャンセルした呼び出しの見積もりなど）を加算"""
+        self.spent_cost += cost
+
+    def to_dict(self) -> dict:
+        return {
+            field.name: getattr(self, field.name)
+            for field in dataclasses.fields(self)
+            if not field.name.startswith("reserved_")
+        }
+
+    def __str__(self):
+        return (
+            f"料金: ${self.spent_cost:.4f}"
+            + (f" / ${self.max_cost:.4f}" if self.max_cost is not None else "")
+            + f", 入力トークン: {self.spent_input_tokens}"
+            + (f" / {self.max_input_tokens}" if self.max_input_tokens is not None else "")
+            + f", 予算超過で未送信: {self.rejected}回"
+        )
+
+
+def estimate_input_cost(config: LlmConfig) -> float:
+    """プロンプトと入力テキストの送信分の料金の見積もり（入力トークン数はRunBudget.estimateと同じ見積もり）"""
+    return LlmFee(config.model).calculate(RunBudget.estimate(config).input_tokens, "input")
@@ -0,0 +1,102 @@
+import logging
+
+from .blocks import TABLE_ROW_PREFIX, split_blocks
+from .schema import TrailConditionSchemaList
+from .text_utils import normalize_text
+from .token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# _merge_page_textsが付けるページ見出し
+SECTION_PREFIX = "## "
+
+
+def split_into_chunks(text: str, max_tokens: int, model: str | None = None) -> list[str]:
+    """
+    抽出テキストをトークン数の上限以内のチャンクに分割
+
+    ブロック（段落・表の行）の途中では切らない。表の途中で分割した場合は次のチャンクの先頭に表のヘッダー行を、
+    ページ見出しの後で分割した場合は見出しを繰り返し、各チャンクが単独で解釈できるようにする。
+    1ブロックで上限を超える場合はそのブロックだけのチャンクとする。
+    """
+    if estimate_tokens(text, model) <= max_tokens:
+        return [text]
+    blocks = split_blocks(text)
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    section: str | None = None  # 直近のページ見出し
+    table_header: list[str] = []  # 直近の表のヘッダー行と区切り行
+
+    for i, block in enumerate(blocks):
+        is_table_row = block.startswith(TABLE_ROW_PREFIX)
+        if block.startswith(SECTION_PREFIX):
+            section = block
+        if is_table_row and (i == 0 or not blocks[i - 1].startswith(TABLE_ROW_PREFIX)):
+            table_header = blocks[i : i + 2]
+        elif not is_table_row:
+            table_header = []
+
+        block_tokens = estimate_tokens(block, model) + 1  # 改行分
+        if current and current_tokens + block_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            # 次のチャンクの文脈（ページ見出し・表のヘッダー）
+            current = []
+            if section and block != section:
+                current.append(section)
+            if is_table_row and block not in table_header:
+                current.extend(table_header)
+            current_tokens = sum(estimate_tokens(line, model) + 1 for line in current)
+        current.append(block)
+        current_tokens += block_tokens
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str | None = None) -> str:
+    """
+    先頭からブロック単位でトークン数の上限まで残し、残りを切り捨てる
+
+    登山道情報のページは新しい情報が先頭にあることが多いため、末尾を切り捨てる。
+    """
+    if estimate_tokens(text, model) <= max_tokens:
+        return text
+    kept: list[str] = []
+    total = 0
+    for block in split_blocks(text):
+        block_tokens = estimate_tokens(block, model) + 1
+        if total + block_tokens > max_tokens:
+            break
+        kept.append(block)
+        total += block_tokens
+    return "\n".join(kept)
+
+
+def record_key(record) -> tuple[str, str, str]:
+    """同一の登山道状況とみなすキー（山名・登山道名・タイトルを正規化）"""
+    return (
+        normalize_text(record.mountain_name_raw),
+        normalize_text(record.trail_name),
+        normalize_text(record.title),
+    )
+
+
+def merge_results(results: list[TrailConditionSchemaList]) -> TrailConditionSchemaList:
+    """チャンクごとの抽出結果を結合し、重複するレコードを除く（先に出現したものを残す）"""
+    merged = []
+    seen = set()
+    for result in results:
+        for record in result.trail_condition_records:
+            key = record_key(record)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(record)
+
+    total = sum(len(result.trail_condition_records) for result in results)
+    if total != len(merged):
+        logger.debug(f"チャンク間の重複レコードを除外: {total - len(merged)}件")
+    return TrailConditionSchemaList(trail_condition_records=merged)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("process", "thread", "inline")
+
+
+class ExtractionExecutor:
+    """
+    trafilatura抽出・ハッシュ計算などCPU負荷の高い処理をイベントループ外で実行する
+
+    kind:
+        process: ProcessPoolExecutor（コア数に応じてスケール。ページごとにHTMLと抽出設定をpickleして渡すため、
+            大きなページが多い場合のみ有利。スレッドが動いている親プロセスをforkするとデッドロックし得るため、
+            ワーカーはforkserver（使えない環境ではspawn）で起動する）
+        thread: ThreadPoolExecutor（lxmlはGILを一部解放する。既定）
+        inline: イベントループ上で同期実行（従来動作・デバッグ用）
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int | None = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"サポートされていない実行方式: {kind}（{', '.join(EXECUTOR_KINDS)}のいずれか）")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Executor | None = None
+
+    @classmethod
+    def from_settings(cls, kind: str | None = None, max_workers: int | None = None) -> "ExtractionExecutor":
+        """Django設定から生成（引数はCLI指定による上書き）"""
+        return cls(
+            kind=kind or getattr(settings, "EXTRACT_EXECUTOR", "thread"),
+            max_workers=max_workers or getattr(settings, "EXTRACT_MAX_WORKERS", None),
+        )
+
+    def _get_executor(self) -> Executor:
+        """プールは初回使用時に生成"""
+        if self._executor is None:
+            if self.kind == "process":
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context(method)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="extract")
+            logger.debug(f"抽出ワーカープール生成: {self.kind} (workers: {self.max_workers})")
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        関数をワーカーで実行して結果を待つ
+
+        Args:
+            func: モジュールレベルの関数（processの場合はpickle可能であること）
+        """
+        if self.kind == "inline":
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), partial(func, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __repr__(self):
+        return f"ExtractionExecutor(kind={self.kind!r}, max_workers={self.max_workers})"
+
+
+class LoopBlockMonitor:
+    """
+    イベントループのブロック時間を計測する（一定間隔のsleepが予定より遅れた分をブロックとみなす）
+
+    使用例:
+        async with LoopBlockMonitor() as monitor:
+            ...
+        logger.info(monitor)
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.01):
+        self.interval = interval
+        self.threshold = threshold  # これ未満の遅延はスケジューリング誤差として無視
+        self.blocked_time: float = 0.0
+        self.max_block: float = 0.0
+        self.block_count: int = 0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - expected
+            if lag >= self.threshold:
+                self.blocked_time += lag
+                self.max_block = max(self.max_block, lag)
+                self.block_count += 1
+
+    async def __aenter__(self) -> "LoopBlockMonitor":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def to_dict(self) -> dict:
+        return {"blocked_time": self.blocked_time, "max_block": self.max_block, "block_count": self.block_count}
+
+    def __repr__(self):
+        return (
+            f"LoopBlockMonitor(blocked={self.blocked_time:.2f}s, max_block={self.max_block:.2f}s, "
+            f"count={self.block_count})"
+        )
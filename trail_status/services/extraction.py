@@ -0,0 +1,132 @@
+import copy
+import dataclasses
+import hashlib
+import importlib.util
+import json
+import logging
+from dataclasses import dataclass, field
+
+from lxml import html as lxml_html
+from trafilatura.utils import load_html
+
+from .prompt_registry import prompt_registry
+
+logger = logging.getLogger(__name__)
+
+# trafilaturaの抽出モード（no_fallbackはtrafilatura 2.0でfastに統合された旧名）
+EXTRACTION_MODES = ("default", "fast", "precision", "recall", "no_fallback")
+
+
+def is_css_supported() -> bool:
+    """CSSセレクタによる領域指定に必要なcssselectがインストールされているか"""
+    return importlib.util.find_spec("cssselect") is not None
+
+
+@dataclass(frozen=True)
+class ExtractionProfile:
+    """
+    情報源ごとのテキスト抽出設定（プロンプトファイルの extraction: セクション）
+
+    ワーカープロセスに渡すため、pickle可能な値のみを持つ。
+    """
+
+    xpath: str = ""  # 抽出対象の領域（XPath）
+    css: str = ""  # 抽出対象の領域（CSSセレクタ。cssselectが必要）
+    exclude: tuple[str, ...] = field(default_factory=tuple)  # 抽出前に取り除く要素（XPath）
+    mode: str = "default"
+    include_tables: bool = True
+    include_links: bool = True
+
+    def __post_init__(self):
+        if self.mode not in EXTRACTION_MODES:
+            raise ValueError(f"サポートされていない抽出モード: {self.mode}（{', '.join(EXTRACTION_MODES)}のいずれか）")
+        if self.css and not is_css_supported():
+            raise ValueError(f"CSSセレクタの指定にはcssselectが必要です（uv sync --extra css でインストールしてください）: {self.css}")
+
+    @property
+    def has_region(self) -> bool:
+        return bool(self.xpath or self.css)
+
+    @property
+    def digest(self) -> str:
+        """設定内容のSHA256（前回と異なれば保存済みの生データハッシュ・検証子を使わずに抽出し直す）"""
+        data = json.dumps(dataclasses.asdict(self), ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_dict(cls, data: dict | None) -> "ExtractionProfile":
+        data = data or {}
+        exclude = data.get("exclude") or ()
+        return cls(
+            xpath=data.get("xpath", ""),
+            css=data.get("css", ""),
+            exclude=(exclude,) if isinstance(exclude, str) else tuple(exclude),
+            mode=data.get("mode", "default"),
+            include_tables=data.get("include_tables", True),
+            include_links=data.get("include_links", True),
+        )
+
+    @classmethod
+    def from_prompt_file(cls, filename: str) -> "ExtractionProfile":
+        """
+        プロンプトファイルの extraction: セクションから読み込み（ファイル・セクションが無ければデフォルト）
+
+        Args:
+            filename: プロンプトファイル名（例：001_okutama_vc.yaml）
+        """
+        try:
+            bundle = prompt_registry.get(filename)
+        except FileNotFoundError:
+            return cls()
+        return cls.from_dict(bundle.extraction)
+
+    def trafilatura_options(self) -> dict:
+        """trafilatura.extractに渡すキーワード引数"""
+        options = {
+            "include_tables": self.include_tables,
+            "include_links": self.include_links,
+            "fast": self.mode in ("fast", "no_fallback"),
+            "favor_precision": self.mode == "precision",
+            "favor_recall": self.mode == "recall",
+        }
+        if self.exclude:
+            options["prune_xpath"] = list(self.exclude)
+        return options
+
+
+DEFAULT_PROFILE = ExtractionProfile()
+
+
+def select_region(html: str, profile: ExtractionProfile, url: str | None = None):
+    """
+    抽出対象の領域だけを含む文書を作成
+
+    Returns:
+        lxmlの要素（領域が指定されていない・見つからない場合はNoneを返し、呼び出し側で文書全体を使う）
+    """
+    if not profile.has_region:
+        return None
+
+    tree = load_html(html)
+    if tree is None:
+        return None
+
+    if profile.xpath:
+        elements = tree.xpath(profile.xpath)
+    else:
+        from lxml.cssselect import CSSSelector
+
+        elements = CSSSelector(profile.css)(tree)
+
+    elements = [element for element in elements if isinstance(element, lxml_html.HtmlElement)]
+    if not elements:
+        logger.warning(f"抽出対象の領域が見つかりません。文書全体を使用します: {profile.xpath or profile.css} URL: {url}")
+        return None
+
+    # 選択した要素だけを持つ文書を組み立てる（元の木構造は変更しない）
+    region = lxml_html.Element("html")
+    body = lxml_html.Element("body")
+    region.append(body)
+    for element in elements:
+        body.append(copy.deepcopy(element))
+    return region
@@ -0,0 +1,161 @@
+import asyncio
+import dataclasses
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+from .extraction import ExtractionProfile
+from .fetcher import FetchResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FetchCacheStats:
+    """取得キャッシュの利用状況"""
+
+    fetches: int = 0  # 実際に取得した回数
+    hits: int = 0  # 取得済みの結果を再利用した回数
+    coalesced: int = 0  # 取得中の同じリクエストに相乗りした回数
+    disk_hits: int = 0  # 前回以前の実行で保存した結果を再利用した回数
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    def __str__(self):
+        return f"取得: {self.fetches}回, 再利用: {self.hits}回, 相乗り: {self.coalesced}回, ディスク: {self.disk_hits}回"
+
+
+class FetchCache:
+    """
+    実行単位の取得キャッシュ（同一URLを指す複数の情報源で取得・抽出を共有する）
+
+    - 本文を取得・抽出した結果は (URL, 抽出設定) 単位で共有し、前回の状態に関わらず再利用する
+      （変更判定は各情報源の前回ハッシュとの比較で行われるため）
+    - 304・生データ一致の結果は本文を持たないため、同じ検証子・前回ハッシュを持つリクエストにのみ共有する
+    - 取得中の同一リクエストは1つのFutureを共有する
+    - FETCH_CACHE_TTL > 0 の場合は本文の結果をディスクに保存し、有効期限内は次回以降の実行でも再利用する
+    """
+
+    def __init__(self, ttl: float = 0, cache_dir: Path | None = None):
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir or getattr(settings, "FETCH_CACHE_DIR", settings.BASE_DIR / "fetch_cache"))
+        self.stats = FetchCacheStats()
+        self._full_results: dict[tuple, FetchResult] = {}
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "FetchCache":
+        return cls(ttl=overrides.get("ttl", getattr(settings, "FETCH_CACHE_TTL", 0)))
+
+    def clear(self) -> None:
+        """実行ごとの状態を破棄（Futureはイベントループに紐付くため、実行をまたいで保持しない）"""
+        self._full_results.clear()
+        self._inflight.clear()
+        self.stats = FetchCacheStats()
+
+    async def get_or_fetch(
+        self,
+        url: str,
+        fetch: Callable[[], Awaitable[FetchResult]],
+        etag: str | None = None,
+        last_modified: str | None = None,
+        raw_hash: str | None = None,
+        profile: ExtractionProfile | None = None,
+    ) -> FetchResult:
+        """
+        キャッシュ済みの結果を返すか、fetchを呼び出して取得
+
+        Args:
+            fetch: 実際の取得処理（スケジューラの待機を含む。相乗り・再利用時は呼ばれない）
+        """
+        shared_key = (url, profile)
+        if shared_key in self._full_results:
+            self.stats.hits += 1
+            logger.debug(f"取得キャッシュを再利用: {url}")
+            return self._full_results[shared_key]
+
+        request_key = (url, profile, etag or "", last_modified or "", raw_hash or "")
+        future = self._inflight.get(request_key)
+        if future is not None:
+            self.stats.coalesced += 1
+            logger.debug(f"取得中のリクエストに相乗り: {url}")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[request_key] = future
+        try:
+            result = await self._load_from_disk(url, profile) if self.ttl > 0 else None
+            if result is not None:
+                self.stats.disk_hits += 1
+            else:
+                self.stats.fetches += 1
+                result = await fetch()
+                if self._is_shareable(result) and self.ttl > 0:
+                    await self._save_to_disk(result, profile)
+        except BaseException as e:
+            # 失敗は共有しない（待機中のリクエストには例外を伝え、後続は再取得できるようにする）
+            self._inflight.pop(request_key, None)
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # 待機者がいない場合の未取得例外の警告を抑止
+            raise
+
+        if self._is_shareable(result):
+            self._full_results[shared_key] = result
+        future.set_result(result)
+        return result
+
+    @staticmethod
+    def _is_shareable(result: FetchResult) -> bool:
+        """本文を抽出済みの結果のみ、前回の状態が異なるリクエストにも共有できる"""
+        return not result.not_modified and not result.raw_unchanged
+
+    def _path_for(self, url: str, profile: ExtractionProfile | None) -> Path:
+        key = hashlib.sha256(f"{url}\n{profile!r}".encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json.gz"
+
+    async def _load_from_disk(self, url: str, profile: ExtractionProfile | None) -> FetchResult | None:
+        path = self._path_for(url, profile)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            data = await asyncio.to_thread(lambda: json.loads(gzip.decompress(path.read_bytes())))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"取得キャッシュの読み込みに失敗: {url} - {e}")
+            return None
+        logger.debug(f"取得キャッシュ（ディスク）を再利用: {url}")
+        # 生データは保存しない（スナップショットは取得時に保存済み）
+        return FetchResult(**data, raw_content=b"", fetch_time=0.0, extract_time=0.0)
+
+    async def _save_to_disk(self, result: FetchResult, profile: ExtractionProfile | None) -> None:
+        data = dataclasses.asdict(result)
+        for field in ("raw_content", "fetch_time", "extract_time"):
+            data.pop(field)
+        try:
+            await asyncio.to_thread(self._write, self._path_for(result.url, profile), data)
+        except OSError as e:
+            logger.warning(f"取得キャッシュの保存に失敗: {result.url} - {e}")
+
+    @staticmethod
+    def _write(path: Path, data: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(json.dumps(data, ensure_ascii=False).encode("utf-8")))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
@@ -1,73 +1,247 @@
 import hashlib
 import logging
+import time
+from dataclasses import dataclass
 from typing import Optional
 
 import httpx
 import trafilatura
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from .executor import ExtractionExecutor
+from .extraction import DEFAULT_PROFILE, ExtractionProfile, select_region
+from .http_client import get_http_settings, read_limited
 
 logger = logging.getLogger(__name__)
 
 
-class DataFetcher:
-    def __init__(self):
-        self.headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) ..."}
+def fetch_retrying() -> AsyncRetrying:
+    """
+    取得のリトライ方針。
 
-    @retry(
+    ホストごとの取得枠・間隔を試行ごとに確保し直せるよう、DataFetcher.fetch自体は1回だけ取得し、
+    呼び出し側で `await fetch_retrying()(fetch_once)` のように枠の確保と取得をまとめて再試行する。
+    """
+    return AsyncRetrying(
         stop=stop_after_attempt(3),  # 3回リトライ
         wait=wait_exponential(multiplier=1, min=2, max=10),  # 指数バックオフ（2s, 4s, 8s...）
         retry=retry_if_exception_type((httpx.HTTPError, httpx.ConnectError)),
         reraise=True,  # 3回失敗したら最後のエラーを投げる
     )
-    async def fetch_text(self, client: httpx.AsyncClient, url: str) -> str:
-        """
-        単一のURLからテキストを取得。リトライとロギング付き。
+
+
+# ワーカープロセスからも呼べるようモジュールレベルで定義
+def extract_text(html: str, url: str | None = None, profile: ExtractionProfile | None = None) -> str:
+    """
+    HTMLから本文のみを抽出（メニューやフッターを自動で削る）
+
+    Args:
+        html: HTML文字列
+        url: ログ出力用のURL
+        profile: 情報源ごとの抽出設定（領域指定があればその部分木のみを解析）
+
+    Returns:
+        str: 抽出テキスト（抽出できない場合は空文字）
+    """
+    profile = profile or DEFAULT_PROFILE
+    document = select_region(html, profile, url)
+    if document is None:
+        document = html
+
+    # デフォルトでは表（登山情報の核心）と詳細PDFへのリンクなどを維持
+    content = trafilatura.extract(document, **profile.trafilatura_options())
+    if content is None:
+        logger.warning(f"Trafilaturaがコンテンツの抽出に失敗しました。生のテキストを出力します。URL: {url}")
+        content = trafilatura.html2txt(document)
+    return content or ""
+
+
+def hash_text(text: str) -> str:
+    """抽出テキストのSHA256ハッシュ値（64文字）を計算"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def legacy_content_hash(html: str) -> str:
+    """
+    従来の変更検知ハッシュ（ページ全体からリンクなしで抽出したテキストのSHA256）
+
+    現在のハッシュはLLM入力と同じ抽出結果（リンク付き・抽出設定あり）から計算するため、
+    従来の方式で保存されたハッシュとは一致しない。移行後最初の実行での比較にのみ使う。
+    """
+    normalized_content = trafilatura.extract(html, include_comments=False, include_tables=True)
+    return hash_text(normalized_content or "")
+
+
+def extract_and_hash(html: str, url: str | None = None, profile: ExtractionProfile | None = None) -> tuple[str, str]:
+    """抽出とハッシュ計算をまとめて実行（ワーカーへの往復を1回にする）"""
+    text = extract_text(html, url, profile)
+    return text, hash_text(text)
+
+
+@dataclass
+class FetchResult:
+    """1回のHTTP取得結果（ハッシュ計算とLLM入力で同じ抽出結果を共有する）"""
+
+    url: str
+    raw_content: bytes
+    html: str
+    text: str
+    content_hash: str
+    fetch_time: float
+    extract_time: float
+    etag: str = ""
+    last_modified: str = ""
+    not_modified: bool = False  # 304 Not Modified（本文・抽出なし）
+    raw_hash: str = ""  # 生バイト列のハッシュ
+    raw_unchanged: bool = False  # 生バイト列が前回と一致（抽出なし）
+
+    @property
+    def scraped_length(self) -> int:
+        return len(self.html)
+
+
+class DataFetcher:
+    def __init__(self, max_response_bytes: int | None = None, executor: ExtractionExecutor | None = None):
+        # User-Agent等の共通ヘッダーはcreate_http_client()で生成したクライアント側に設定済み
+        self.headers: dict[str, str] = {}
+        self.max_response_bytes = max_response_bytes or get_http_settings()["HTTP_MAX_RESPONSE_BYTES"]
+        # 抽出処理の実行先（省略時はイベントループ上で同期実行）
+        self.executor = executor or ExtractionExecutor("inline")
+
+    async def fetch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        raw_hash: str | None = None,
+        profile: ExtractionProfile | None = None,
+    ) -> FetchResult:
         """
-        logger.debug(f"テキスト取得開始: {url}")
+        単一のURLを1回だけ取得し、テキスト抽出とハッシュ計算まで行う（リトライは呼び出し側でfetch_retrying()を使う）。
+        前回の検証子があれば条件付きGETを送り、304の場合は本文取得・抽出を行わない。
+        生バイト列のハッシュが前回と一致する場合もtrafilaturaによる抽出を省略する。
 
-        try:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-
-            # HTMLから本文のみを抽出（メニューやフッターを自動で削る）
-            content = trafilatura.extract(
-                response.text,
-                include_tables=True,  # 登山情報の核心（表）を維持
-                include_links=True,  # 詳細PDFへのリンクなどを維持
-            )
-            if content is None:
-                logger.warning(f"Trafilaturaがコンテンツの抽出に失敗しました。生のテキストを出力します。URL: {url}")
-                content = trafilatura.html2txt(response.text)
+        Args:
+            client: 共有のhttpxクライアント
+            url: 取得対象URL
+            etag: 前回レスポンスのETag（If-None-Matchとして送信）
+            last_modified: 前回レスポンスのLast-Modified（If-Modified-Sinceとして送信）
+            raw_hash: 前回レスポンス生バイト列のハッシュ値
+            profile: 情報源ごとの抽出設定
 
-            logger.debug(f"テキスト取得成功: {url} (抽出文字数: {len(content or '')})")
-            return content or ""
+        Returns:
+            FetchResult: 生バイト列・HTML・抽出テキスト・ハッシュ・所要時間
+        """
+        logger.debug(f"取得開始: {url}")
 
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        try:
+            start_time = time.perf_counter()
+            # 本文はサイズ上限を確認しながらストリーミングで読み込む
+            response = await client.send(client.build_request("GET", url, headers=headers), stream=True)
+            try:
+                # httpxは3xxでもraise_for_statusで例外となるため、304は先に判定
+                if response.status_code == httpx.codes.NOT_MODIFIED:
+                    fetch_time = time.perf_counter() - start_time
+                    logger.debug(f"304 Not Modified: {url} ({fetch_time:.2f}秒)")
+                    return FetchResult(
+                        url=url,
+                        raw_content=b"",
+                        html="",
+                        text="",
+                        content_hash="",
+                        fetch_time=fetch_time,
+                        extract_time=0.0,
+                        etag=response.headers.get("ETag", etag or ""),
+                        last_modified=response.headers.get("Last-Modified", last_modified or ""),
+                        not_modified=True,
+                    )
+                response.raise_for_status()
+                raw_content = await read_limited(response, self.max_response_bytes)
+            finally:
+                await response.aclose()
+            fetch_time = time.perf_counter() - start_time
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error occurred: {e.response.status_code} for {url}")
             raise
-        except Exception as e:
+        except Exception:
             logger.exception(f"Unexpected error fetching {url}")
             raise
 
+        html = raw_content.decode(response.encoding or "utf-8", errors="replace")
+        new_etag = response.headers.get("ETag", "")
+        new_last_modified = response.headers.get("Last-Modified", "")
+
+        # 1段目: 生バイト列のハッシュ（一致すればlxmlのパースを丸ごと省略）
+        new_raw_hash = hashlib.sha256(raw_content).hexdigest()
+        if raw_hash and new_raw_hash == raw_hash:
+            logger.debug(f"生データ変更なし: {url} - ハッシュ: {new_raw_hash[:8]}... ({fetch_time:.2f}秒)")
+            return FetchResult(
+                url=url,
+                raw_content=raw_content,
+                html=html,
+                text="",
+                content_hash="",
+                fetch_time=fetch_time,
+                extract_time=0.0,
+                etag=new_etag,
+                last_modified=new_last_modified,
+                raw_hash=new_raw_hash,
+                raw_unchanged=True,
+            )
+
+        # 2段目: 正規化テキストのハッシュ
+        start_time = time.perf_counter()
+        text, content_hash = await self.executor.run(extract_and_hash, html, url, profile)
+        extract_time = time.perf_counter() - start_time
+
+        logger.debug(f"取得成功: {url} (抽出文字数: {len(text)}, 取得: {fetch_time:.2f}秒, 抽出: {extract_time:.2f}秒)")
+        return FetchResult(
+            url=url,
+            raw_content=raw_content,
+            html=html,
+            text=text,
+            content_hash=content_hash,
+            fetch_time=fetch_time,
+            extract_time=extract_time,
+            etag=new_etag,
+            last_modified=new_last_modified,
+            raw_hash=new_raw_hash,
+        )
+
+    async def fetch_text(self, client: httpx.AsyncClient, url: str) -> str:
+        """
+        単一のURLからテキストを取得。リトライとロギング付き。
+        """
+        result = await fetch_retrying()(self.fetch, client, url)
+        return result.text
+
+    def extract_text(self, html: str, url: str | None = None) -> str:
+        """HTMLから本文のみを抽出（同期版）"""
+        return extract_text(html, url)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """抽出テキストのSHA256ハッシュ値（64文字）を計算"""
+        return hash_text(text)
+
     def calculate_content_hash(self, html: str) -> str:
         """
         HTMLからtrafilaturaで抽出した内容のハッシュ値を計算
-        
+
         Args:
             html: HTML文字列
-            
+
         Returns:
             str: SHA256ハッシュ値（64文字）
         """
-        # trafilaturaで正規化されたテキストを抽出
-        normalized_content = trafilatura.extract(html, include_comments=False, include_tables=True)
-        
-        if not normalized_content:
-            # 抽出できない場合は空文字列として扱う
-            normalized_content = ""
-        
-        # UTF-8エンコードしてハッシュ計算
-        return hashlib.sha256(normalized_content.encode('utf-8')).hexdigest()
+        return self.hash_text(self.extract_text(html))
 
     def has_content_changed(self, html: str, previous_hash: Optional[str]) -> tuple[bool, str]:
         """
@@ -81,15 +255,28 @@ class DataFetcher:
             tuple[bool, str]: (変更フラグ, 新しいハッシュ値)
         """
         current_hash = self.calculate_content_hash(html)
+        return self.is_hash_changed(current_hash, previous_hash), current_hash
 
+    @staticmethod
+    def is_hash_changed(current_hash: str, previous_hash: Optional[str]) -> bool:
+        """
+        計算済みハッシュと前回ハッシュを比較
+
+        Args:
+            current_hash: 今回のハッシュ値
+            previous_hash: 前回のハッシュ値（None/空文字の場合は初回）
+
+        Returns:
+            bool: 変更フラグ
+        """
         # 初回スクレイピングまたはハッシュが異なる場合は変更あり
-        has_changed = previous_hash is None or current_hash != previous_hash
+        has_changed = not previous_hash or current_hash != previous_hash
 
-        if previous_hash is None:
+        if not previous_hash:
             logger.debug(f"初回スクレイピング - ハッシュ: {current_hash[:8]}...")
         elif has_changed:
             logger.debug(f"コンテンツ変更検知 - 旧: {previous_hash[:8]}... 新: {current_hash[:8]}...")
         else:
             logger.debug(f"コンテンツ変更なし - ハッシュ: {current_hash[:8]}...")
 
-        return has_changed, current_hash
+        return has_changed
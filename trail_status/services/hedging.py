@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import math
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 主モデル → 応答が遅い場合に同じリクエストを送る副モデル
+DEFAULT_LLM_HEDGE_MODELS = {
+    "deepseek-reasoner": "gemini-2.5-flash",
+    "deepseek-chat": "gemini-2.5-flash",
+}
+
+
+def percentile_of(values: list[float], p: float) -> float:
+    """p（0〜100）パーセンタイル（線形補間）"""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+@dataclass
+class HedgePolicy:
+    """
+    LLM呼び出しのヘッジ方針
+
+    主モデルの応答が直近の実行時間のpercentileパーセンタイルを過ぎても返らない場合、副モデルにも同じリクエストを送り、
+    先に検証を通った応答を採用する。履歴がmin_samples件に満たないモデルはdefault_delay秒を待つ（Noneならヘッジしない）。
+    """
+
+    models: dict[str, str] = field(default_factory=lambda: dict(DEFAULT_LLM_HEDGE_MODELS))
+    percentile: float = 90
+    min_samples: int = 10
+    default_delay: float | None = None
+    latencies: dict[str, list[float]] = field(default_factory=dict)  # モデル → 直近の実行時間（秒）
+
+    @classmethod
+    def from_settings(cls, latencies: dict[str, list[float]] | None = None) -> "HedgePolicy":
+        return cls(
+            models=getattr(settings, "LLM_HEDGE_MODELS", DEFAULT_LLM_HEDGE_MODELS),
+            percentile=getattr(settings, "LLM_HEDGE_PERCENTILE", cls.percentile),
+            min_samples=getattr(settings, "LLM_HEDGE_MIN_SAMPLES", cls.min_samples),
+            default_delay=getattr(settings, "LLM_HEDGE_DEFAULT_DELAY", cls.default_delay),
+            latencies=latencies or {},
+        )
+
+    def secondary_for(self, model: str) -> str | None:
+        secondary = self.models.get(model)
+        return secondary if secondary and secondary != model else None
+
+    def delay_for(self, model: str) -> float | None:
+        """副モデルに送るまでの待ち時間（秒）。ヘッジしない場合はNone"""
+        if self.secondary_for(model) is None:
+            return None
+        history = self.latencies.get(model) or []
+        if len(history) < self.min_samples:
+            return self.default_delay
+        return percentile_of(history, self.percentile)
+
+
+@dataclass
+class HedgeOutcome:
+    result: Any
+    hedged: bool = False  # 副モデルにもリクエストを送ったか
+    secondary_won: bool = False  # 副モデルの応答を採用したか
+    loser_result: Any = None  # 採用しなかった側も完了していた場合の結果（キャンセルした場合はNone）
+
+
+async def race_with_hedge(
+    primary: Callable[[], Awaitable[Any]], secondary: Callable[[], Awaitable[Any]], delay: float
+) -> HedgeOutcome:
+    """
+    主リクエストがdelay秒以内に終わらなければ副リクエストも開始し、先に成功した方を採用してもう一方をキャンセル
+
+    片方が失敗した場合はもう一方の完了を待つ。両方失敗した場合は主リクエストの例外を送出する。
+    """
+    primary_task = asyncio.create_task(primary())
+    tasks = {primary_task}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return HedgeOutcome(result=primary_task.result())
+
+        logger.info(f"主モデルの応答が{delay:.1f}秒を超えたため、副モデルにも送信します")
+        secondary_task = asyncio.create_task(secondary())
+        tasks.add(secondary_task)
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if not succeeded:
+                continue
+            # 同時に完了した場合は主リクエストを優先
+            winner = primary_task if primary_task in succeeded else succeeded[0]
+            loser = secondary_task if winner is primary_task else primary_task
+            loser_result = loser.result() if loser in succeeded else None
+            return HedgeOutcome(
+                result=winner.result(),
+                hedged=True,
+                secondary_won=winner is secondary_task,
+                loser_result=loser_result,
+            )
+        raise primary_task.exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
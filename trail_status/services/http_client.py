@@ -0,0 +1,112 @@
+import importlib.util
+import logging
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 設定が無い場合のデフォルト値（キー: Django設定名）
+DEFAULT_HTTP_SETTINGS = {
+    "HTTP_USER_AGENT": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) ...",
+    "HTTP_USE_HTTP2": False,
+    "HTTP_MAX_CONNECTIONS": 20,
+    "HTTP_MAX_KEEPALIVE_CONNECTIONS": 10,
+    "HTTP_KEEPALIVE_EXPIRY": 30.0,
+    "HTTP_CONNECT_TIMEOUT": 5.0,
+    "HTTP_READ_TIMEOUT": 20.0,
+    "HTTP_WRITE_TIMEOUT": 10.0,
+    "HTTP_POOL_TIMEOUT": 10.0,
+    "HTTP_MAX_RESPONSE_BYTES": 10 * 1024 * 1024,
+    "HTTP_FOLLOW_REDIRECTS": True,
+}
+
+
+class ResponseTooLargeError(Exception):
+    """レスポンスサイズが上限を超えた（リトライ対象外）"""
+
+
+def get_http_settings(**overrides) -> dict:
+    """
+    HTTP_*のDjango設定をデフォルト値とマージして取得
+
+    Args:
+        **overrides: 設定名をキーとした上書き（Noneは設定値を使用）
+    """
+    conf = {key: getattr(settings, key, default) for key, default in DEFAULT_HTTP_SETTINGS.items()}
+    conf.update({k: v for k, v in overrides.items() if v is not None})
+    return conf
+
+
+def create_http_client(**overrides) -> httpx.AsyncClient:
+    """
+    設定に基づく共有httpxクライアントを生成（取得・パイプライン・クローラで共用）
+
+    同じクライアントを使い回すことで、同一ホストへの接続が情報源をまたいで再利用される。
+
+    Args:
+        **overrides: HTTP_*設定の上書き（例: HTTP_READ_TIMEOUT=10.0）
+
+    Returns:
+        httpx.AsyncClient: 接続プール・タイムアウト・ヘッダー設定済みのクライアント
+
+    Raises:
+        ValueError: HTTP_USE_HTTP2が有効でh2がインストールされていない場合
+    """
+    conf = get_http_settings(**overrides)
+
+    http2 = conf["HTTP_USE_HTTP2"]
+    if http2 and importlib.util.find_spec("h2") is None:
+        raise ValueError("HTTP/2の使用にはh2が必要です（uv sync --extra http2 でインストールしてください）")
+
+    limits = httpx.Limits(
+        max_connections=conf["HTTP_MAX_CONNECTIONS"],
+        max_keepalive_connections=conf["HTTP_MAX_KEEPALIVE_CONNECTIONS"],
+        keepalive_expiry=conf["HTTP_KEEPALIVE_EXPIRY"],
+    )
+    timeout = httpx.Timeout(
+        connect=conf["HTTP_CONNECT_TIMEOUT"],
+        read=conf["HTTP_READ_TIMEOUT"],
+        write=conf["HTTP_WRITE_TIMEOUT"],
+        pool=conf["HTTP_POOL_TIMEOUT"],
+    )
+    logger.debug(f"HTTPクライアント生成 - http2: {http2}, limits: {limits}, timeout: {timeout}")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        timeout=timeout,
+        headers={"User-Agent": conf["HTTP_USER_AGENT"]},
+        follow_redirects=conf["HTTP_FOLLOW_REDIRECTS"],
+    )
+
+
+async def read_limited(response: httpx.Response, max_bytes: int | None) -> bytes:
+    """
+    ストリーミングレスポンスを上限バイト数まで読み込む
+
+    Args:
+        response: stream=Trueで取得したレスポンス
+        max_bytes: 上限バイト数（None/0は無制限）
+
+    Returns:
+        bytes: レスポンス本文
+
+    Raises:
+        ResponseTooLargeError: 上限を超えた場合（残りは読み込まずに接続を閉じる）
+    """
+    if max_bytes:
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            await response.aclose()
+            raise ResponseTooLargeError(f"レスポンスサイズが上限を超えています: {content_length} > {max_bytes} bytes")
+
+    chunks = []
+    total = 0
+    async for chunk in response.aiter_bytes():
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            await response.aclose()
+            raise ResponseTooLargeError(f"レスポンスサイズが上限を超えています: >{max_bytes} bytes ({response.url})")
+        chunks.append(chunk)
+    return b"".join(chunks)
@@ -0,0 +1,135 @@
+import dataclasses
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+from .llm_client import LlmConfig
+from .llm_stats import TokenStats
+from .prompt_registry import prompt_registry
+from .schema import TrailConditionSchemaList
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LlmCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+    def __str__(self):
+        return f"ヒット: {self.hits}回, ミス: {self.misses}回"
+
+
+def cache_key(config: LlmConfig) -> str:
+    """モデル・プロンプト・出力スキーマ・生成設定・入力テキストから決まるキャッシュキー"""
+    payload = {
+        "model": config.model,
+        "prompt": config.full_prompt,
+        "schema": prompt_registry.json_schema(config.response_schema),
+        "temperature": config.temperature,
+        "thinking_budget": config.thinking_budget,
+        "data": config.data,
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """
+    LLM応答のディスクキャッシュ（同じ入力に対するAPI呼び出しを省略する）
+
+    検証済みのJSONと元のトークン統計を保存する。有効期限（ttl）を過ぎたものは使わず、
+    件数が上限（max_entries）を超えたら古いものから上限の9割まで削除する（件数は保存のたびに数え直さず、
+    初回の保存時に1回だけ数えて以降は追加した件数を加える）。
+    保存先: {base_dir}/{key[:2]}/{key}.json.gz
+    """
+
+    SUFFIX = ".json.gz"
+
+    def __init__(self, base_dir: Path | None = None, ttl: float | None = None, max_entries: int | None = None):
+        self.base_dir = Path(base_dir or getattr(settings, "LLM_CACHE_DIR", settings.BASE_DIR / "llm_cache"))
+        self.ttl = ttl if ttl is not None else getattr(settings, "LLM_CACHE_TTL", 30 * 24 * 60 * 60)
+        self.max_entries = max_entries or getattr(settings, "LLM_CACHE_MAX_ENTRIES", 1000)
+        self.stats = LlmCacheStats()
+        self._entry_count: int | None = None  # おおよその保存件数（別プロセスの追加・削除は反映しない）
+
+    def path_for(self, key: str) -> Path:
+        return self.base_dir / key[:2] / f"{key}{self.SUFFIX}"
+
+    def get(self, config: LlmConfig) -> tuple[TrailConditionSchemaList, TokenStats] | None:
+        """キャッシュ済みの応答（検証済みデータ, トークン統計）を取得（無ければNone）"""
+        path = self.path_for(cache_key(config))
+        try:
+            if self.ttl and time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                raise FileNotFoundError(path)
+            entry = json.loads(gzip.decompress(path.read_bytes()))
+            validated_data = prompt_registry.adapter(config.response_schema).validate_json(entry["response"])
+            token_stats = TokenStats(**entry["token_stats"])
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"LLMキャッシュの読み込みに失敗: {path} - {e}")
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        logger.info(f"LLMキャッシュヒット: {config.model} ({config.prompt_filename})")
+        return validated_data, token_stats
+
+    def put(self, config: LlmConfig, validated_data: TrailConditionSchemaList, token_stats: TokenStats) -> None:
+        entry = {
+            "response": validated_data.model_dump_json(),
+            "token_stats": {
+                "input_tokens": token_stats.input_tokens,
+                "thoughts_tokens": token_stats.thoughts_tokens,
+                "pure_output_tokens": token_stats.pure_output_tokens,
+                "input_letter_count": token_stats.input_letter_count,
+                "output_letter_count": token_stats.output_letter_count,
+                "model": token_stats.model_name,
+                "prompt_cache_hit_tokens": token_stats.prompt_cache_hit_tokens,
+            },
+        }
+        path = self.path_for(cache_key(config))
+        is_new = not path.exists()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8")))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        if self._entry_count is None:
+            self._entry_count = sum(1 for _ in self._entry_paths())
+        elif is_new:
+            self._entry_count += 1
+        if self._entry_count > self.max_entries:
+            self._evict()
+
+    def _entry_paths(self):
+        return self.base_dir.glob(f"*/*{self.SUFFIX}")
+
+    def _evict(self) -> None:
+        """上限を超えたら古いものから削除（次の削除までに上限の1割分を追加できるよう余裕を残す）"""
+        paths = list(self._entry_paths())
+        keep = self.max_entries - self.max_entries // 10
+        paths.sort(key=lambda path: path.stat().st_mtime)
+        removed = paths[: max(len(paths) - keep, 0)]
+        for path in removed:
+            path.unlink(missing_ok=True)
+        self._entry_count = len(paths) - len(removed)
+        logger.debug(f"LLMキャッシュを削除: {len(removed)}件")
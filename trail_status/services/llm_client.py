@@ -1,32 +1,29 @@
 import asyncio
-import json
 import logging
 import os
-import sys
+import time
 from abc import ABC, abstractmethod
-from pathlib import Path
 
-import yaml
 from django.conf import settings
 from pydantic import BaseModel, Field, ValidationError, computed_field
 
+from .artifacts import artifact_label, artifact_writer
+from .llm_registry import llm_client_registry
 from .llm_stats import TokenStats
-from .schema import TrailConditionSchemaList
+from .prompt_registry import prompt_registry
+from .rate_limiter import is_rate_limit_error, llm_rate_limiters, parse_retry_after
+from .schema import (
+    TrailConditionSchemaAi,
+    TrailConditionSchemaBatchAi,
+    TrailConditionSchemaBatchList,
+    TrailConditionSchemaList,
+)
+from .stream_parser import RecordStreamParser, StreamStructureError
+from .token_estimator import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
 
-# ヘルパー関数
-def get_sample_dir() -> Path:
-    """sampleディレクトリのパスを取得"""
-    return settings.BASE_DIR / "trail_status" / "services" / "sample"
-
-
-def get_prompts_dir() -> Path:
-    """promptsディレクトリのパスを取得"""
-    return settings.BASE_DIR / "trail_status" / "services" / "prompts"
-
-
 class LlmConfig(BaseModel):
     site_prompt: str = Field(default="", description="サイト固有プロンプト")
     use_template: bool = Field(default=True, description="template.yamlを使用するか")
@@ -36,7 +33,10 @@ class LlmConfig(BaseModel):
         default=0.0, ge=0, le=2.0, description="生成ごとの揺らぎの幅（※ deepseek-reasonerでは無視される）"
     )
     thinking_budget: int = Field(default=5000, ge=-1, le=15000, description="Geminiの思考予算（トークン数）")
-    prompt_filename: str | None = Field(defalut=None, description="LLMエラー処理での識別用ファイルネーム")
+    prompt_filename: str | None = Field(default=None, description="LLMエラー処理での識別用ファイルネーム")
+    batch_source_ids: list[int] | None = Field(
+        default=None, description="複数の情報源をまとめて解析する場合の情報源ID（レコードごとにsource_idを出力させる）"
+    )
 
     @computed_field
     @property
@@ -49,6 +49,21 @@ class LlmConfig(BaseModel):
             parts.append(self.site_prompt)
         return "\n\n".join(parts) if parts else ""
 
+    @property
+    def response_schema(self) -> type[TrailConditionSchemaList] | type[TrailConditionSchemaBatchList]:
+        """LLMに出力させるJSONのスキーマ"""
+        return TrailConditionSchemaBatchList if self.batch_source_ids else TrailConditionSchemaList
+
+    @property
+    def record_schema(self) -> type[TrailConditionSchemaAi]:
+        """出力の1レコードのスキーマ（ストリーミング時の逐次検証用）"""
+        return TrailConditionSchemaBatchAi if self.batch_source_ids else TrailConditionSchemaAi
+
+    @property
+    def template_prompt(self) -> str:
+        """全情報源で共通のテンプレート部分（use_template=Falseの場合は空文字）"""
+        return self._load_template() if self.use_template else ""
+
     @computed_field
     @property
     def api_key(self) -> str:
@@ -81,14 +96,7 @@ class LlmConfig(BaseModel):
         Raises:
             FileNotFoundError: ファイルが存在しない場合
         """
-        prompts_dir = get_prompts_dir()
-        prompt_path = prompts_dir / filename
-
-        if not prompt_path.exists():
-            raise FileNotFoundError(f"プロンプトファイルが見つかりません: {prompt_path}")
-
-        config = yaml.safe_load(prompt_path.read_text(encoding="utf-8"))
-        return config.get("config", {})
+        return prompt_registry.get(filename).config
 
     @classmethod
     def from_file(cls, prompt_filename: str, data: str, **cli_overrides):
@@ -103,8 +111,9 @@ class LlmConfig(BaseModel):
         Returns:
             LlmConfig: 設定がマージされたインスタンス
         """
-        file_config = cls.load_config(prompt_filename)
-        site_prompt = cls.load_prompt(prompt_filename)
+        bundle = prompt_registry.get(prompt_filename)
+        file_config = bundle.config
+        site_prompt = bundle.require_prompt()
 
         # CLI > promptファイル > デフォルト の優先度
         # Noneの場合はPydanticデフォルト値を使用するため、引数から除外
@@ -149,23 +158,12 @@ class LlmConfig(BaseModel):
             FileNotFoundError: ファイルが存在しない場合
             ValueError: プロンプトが設定されていない場合
         """
-        prompts_dir = get_prompts_dir()
-        prompt_path = prompts_dir / filename
-
-        if not prompt_path.exists():
-            raise FileNotFoundError(f"プロンプトファイルが見つかりません: {prompt_path}")
-
-        config = yaml.safe_load(prompt_path.read_text(encoding="utf-8"))
-
-        if "prompt" not in config:
-            raise ValueError(f"プロンプトが設定されていません: {prompt_path}")
-
-        return config["prompt"]
+        return prompt_registry.get(filename).require_prompt()
 
     @staticmethod
     def _load_template() -> str:
-        """template.yamlを読み込み"""
-        return LlmConfig.load_prompt("template.yaml")
+        """template.yamlを読み込み（解析済みのものを再利用）"""
+        return prompt_registry.template()
 
     def __repr__(self) -> str:
         """デバッグ用に重要な情報を表示"""
@@ -181,20 +179,77 @@ class LlmConfig(BaseModel):
 
 
 class ConversationalAi(ABC):
-    def __init__(self, config: LlmConfig):
+    def __init__(self, config: LlmConfig, api_key: str | None = None):
+        """
+        Args:
+            config: LLM設定
+            api_key: APIキー（省略時はconfig.api_keyで環境変数から取得。APIを呼ばない代替クライアントは空文字を渡す）
+        """
         self.model: str = config.model
         self.temperature: float = config.temperature
         self.prompt: str = config.full_prompt  # full_promptを使用
         self.data: str = config.data
-        self.api_key: str = config.api_key
+        self.api_key: str = config.api_key if api_key is None else api_key
         self.thinking_budget: int = config.thinking_budget
         self.prompt_filename: str | None = config.prompt_filename
         self._config: LlmConfig | None = config
+        self.queue_time: float = 0.0  # レート制限による順番待ちの合計時間（秒）
+        # ストリーミング受信（LLM_STREAMING_ENABLED）。受信途中で完成したレコードを1件ずつ検証する
+        self.streaming: bool = getattr(settings, "LLM_STREAMING_ENABLED", False)
+        self.first_record_time: float | None = None  # 送信から最初のレコードを受信するまでの時間（秒）
+        self._stream_parser: RecordStreamParser | None = None
 
     @abstractmethod
     async def generate(self) -> tuple[dict, TokenStats]:
         pass
 
+    async def call_with_rate_limit(self, request, prompt_text: str):
+        """
+        プロバイダ単位の流量制御の下でAPIを呼び出す
+
+        上限を超える呼び出しは順番待ちさせ、429を受けた場合はRetry-After（無ければ指数バックオフ）の間
+        同じプロバイダへの全ての呼び出しを止めてからやり直す。
+
+        Args:
+            request: API呼び出しのコルーチンを返す関数
+            prompt_text: 送信するテキスト（トークン数の見積もり用）
+        """
+        limiter = llm_rate_limiters.get(self.model)
+        estimated_tokens = estimate_tokens(prompt_text, self.model) + getattr(
+            settings, "LLM_RATE_LIMIT_OUTPUT_RESERVE", 2000
+        )
+        max_retries = getattr(settings, "LLM_RATE_LIMIT_MAX_RETRIES", 5)
+
+        for i in range(max_retries + 1):
+            self.queue_time += await limiter.acquire(estimated_tokens)
+            try:
+                return await request()
+            except Exception as e:
+                if not is_rate_limit_error(e) or i == max_retries:
+                    raise
+                retry_after = parse_retry_after(e) or 2 ** (i + 1)
+                logger.warning(f"{self.model}のレート制限に達しました。{retry_after:.1f}秒後にリトライします。")
+                limiter.pause(retry_after)
+            finally:
+                limiter.release()
+
+    def start_stream_parser(self) -> RecordStreamParser:
+        """送信直前に呼び、受信したレコードを検証するパーサーを用意（最初のレコードまでの時間も計測）"""
+        start = time.monotonic()
+
+        def on_record(record: TrailConditionSchemaAi) -> None:
+            if self.first_record_time is None:
+                self.first_record_time = time.monotonic() - start
+                logger.info(f"{self.model}から最初のレコードを受信（{self.first_record_time:.2f}秒）")
+
+        self._stream_parser = RecordStreamParser(on_record, record_schema=self._config.record_schema)
+        return self._stream_parser
+
+    @property
+    def partial_response_text(self) -> str:
+        """ストリーミング受信を途中で打ち切った場合の受信済みテキスト"""
+        return self._stream_parser.text if self._stream_parser is not None else ""
+
     # サーバーエラーとバリデーションエラー時のみリトライ
     async def handle_server_error(self, i, max_retries):
         if i < max_retries - 1:
@@ -235,61 +290,112 @@ class ConversationalAi(ABC):
         logger.error(f"詳細: {e}")
         raise
 
-    def validate_response(self, response_text):
-        # デバッグ用：サンプル出力を保存
-        sample_path = get_sample_dir() / f"{self.model}_sample.json"
-        sample_path.write_text(response_text, encoding="utf-8")
+    @property
+    def artifact_label(self) -> str:
+        return artifact_label(self.prompt_filename, self._config.batch_source_ids)
 
+    def validate_response(self, response_text):
         try:
-            validated_data = TrailConditionSchemaList.model_validate_json(response_text)
+            validated_data = prompt_registry.adapter(self._config.response_schema).validate_json(response_text)
             logger.info(f"{self.model}が構造化出力に成功")
         except ValidationError as e:
             raise e
+        # デバッグ用：検証に成功した応答のみサンプル出力として保存（失敗時はsave_invalid_dataで別に保存）
+        artifact_writer.write_response(self.model, self.artifact_label, response_text)
         return validated_data
 
     def save_invalid_data(self, response_text):
-        # エラー時の出力保存
-        from datetime import datetime
+        # エラー時の出力保存（バックグラウンドで書き込み）
+        error_file = artifact_writer.write_invalid(self.model, self.artifact_label, response_text)
+        if error_file is not None:
+            logger.error(f"{error_file}へ出力を保存します。")
 
-        output_dir = settings.BASE_DIR / "outputs"
-        output_dir.mkdir(exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        error_file = output_dir / f"validation_error_{self.model}_{timestamp}.txt"
-        error_file.write_text(response_text, encoding="utf-8")
+class DeepseekClient(ConversationalAi):
+    @property
+    def system_prompt_for_deepseek(self) -> str:
+        """
+        全情報源で共通の静的な部分（出力スキーマの指示 + テンプレート）
 
-        logger.error(f"{error_file}へ出力を保存しました。")
+        DeepSeekのプレフィックスキャッシュは先頭から一致する部分に効くため、情報源ごとに変わる
+        サイト固有プロンプト・データより前に置き、内容を毎回同一に保つ。
+        """
+        statement = prompt_registry.schema_statement(self._config.response_schema)
+        return statement + self._config.template_prompt
 
+    @property
+    def user_prompt_for_deepseek(self) -> str:
+        """情報源ごとに変わる部分（サイト固有プロンプト + データ）"""
+        site_prompt = self._config.site_prompt
+        return (site_prompt + "\n\n" if site_prompt else "") + self.data
+
+    @property
+    def messages_for_deepseek(self) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system_prompt_for_deepseek},
+            {"role": "user", "content": self.user_prompt_for_deepseek},
+        ]
 
-class DeepseekClient(ConversationalAi):
     @property
     def prompt_for_deepseek(self):
-        STATEMENT = f"【重要】次の行から示す要請はこのPydanticモデルに合うJSONで出力してください: {TrailConditionSchemaList.model_json_schema()}\n"
-        return STATEMENT + self.prompt + self.data
+        """送信するプロンプト全体（文字数の集計用）"""
+        return self.system_prompt_for_deepseek + self.user_prompt_for_deepseek
+
+    async def _stream_deepseek(self, client) -> tuple[str, object]:
+        """ストリーミングで受信し、レコードを受信順に検証（構造が崩れた時点で受信を打ち切る）"""
+        parser = self.start_stream_parser()
+        stream = await client.chat.completions.create(
+            model=self.model,
+            temperature=self.temperature,
+            messages=self.messages_for_deepseek,
+            response_format={"type": "json_object"},
+            stream=True,
+            stream_options={"include_usage": True},  # 最後のチャンクで使用量を受け取る
+        )
+        usage = None
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parser.feed(chunk.choices[0].delta.content)
+        finally:
+            await stream.close()
+        return parser.text, usage
 
     async def generate(self) -> tuple[TrailConditionSchemaList, TokenStats]:
-        from openai import AsyncOpenAI
-
         logger.info(f"{self.model}の応答を待っています。")
         logger.debug(f"LlmConfig詳細： \n{self._config}")
         logger.debug(f"APIキー: ...{self.api_key[-5:]}")
 
-        client = AsyncOpenAI(api_key=self.api_key, base_url="https://api.deepseek.com")
+        # 接続プールを全情報源で共有するクライアント
+        client = llm_client_registry.openai(self.api_key)
 
         max_retries = 3
         for i in range(max_retries):
             try:
-                response = await client.chat.completions.create(
-                    model=self.model,
-                    temperature=self.temperature,
-                    messages=[{"role": "user", "content": self.prompt_for_deepseek}],
-                    response_format={"type": "json_object"},
-                    stream=False,
-                )
-                generated_text = response.choices[0].message.content
+                if self.streaming:
+                    generated_text, usage = await self.call_with_rate_limit(
+                        lambda: self._stream_deepseek(client), self.prompt_for_deepseek
+                    )
+                else:
+                    response = await self.call_with_rate_limit(
+                        lambda: client.chat.completions.create(
+                            model=self.model,
+                            temperature=self.temperature,
+                            messages=self.messages_for_deepseek,
+                            response_format={"type": "json_object"},
+                            stream=False,
+                        ),
+                        self.prompt_for_deepseek,
+                    )
+                    generated_text = response.choices[0].message.content
+                    usage = response.usage
                 validated_data = super().validate_response(generated_text)
                 break
-            except ValidationError:
+            except (ValidationError, StreamStructureError):
+                if self.streaming:
+                    generated_text = self.partial_response_text
                 await super().validation_error(i, max_retries, generated_text)
             except Exception as e:
                 # https://api-docs.deepseek.com/quick_start/error_codes
@@ -314,20 +420,24 @@ class DeepseekClient(ConversationalAi):
                     super().handle_unexpected_error(e)
 
         # 純粋なoutput_tokensを計算
-        thoughts_tokens = getattr(response.usage.completion_tokens_details, "reasoning_tokens", 0) or 0
-        output_tokens = response.usage.completion_tokens - thoughts_tokens
+        thoughts_tokens = getattr(usage.completion_tokens_details, "reasoning_tokens", 0) or 0
+        output_tokens = usage.completion_tokens - thoughts_tokens
+        # DeepSeek独自の使用量フィールド（プレフィックスキャッシュから読まれた入力トークン数）
+        cache_hit_tokens = getattr(usage, "prompt_cache_hit_tokens", 0)
 
         stats = TokenStats(
-            response.usage.prompt_tokens,
+            usage.prompt_tokens,
             thoughts_tokens,
             output_tokens,
             len(self.prompt_for_deepseek),
             len(generated_text),
             self.model,
+            prompt_cache_hit_tokens=cache_hit_tokens if isinstance(cache_hit_tokens, int) else 0,
         )
+        logger.debug(f"プレフィックスキャッシュ: ヒット{stats.prompt_cache_hit_tokens}, ミス{stats.prompt_cache_miss_tokens}")
 
         logger.debug(f"トータルトークン（from TokenStats）： {stats.total_tokens}")
-        logger.debug(f"トータルトークンカウント： {response.usage.total_tokens}")
+        logger.debug(f"トータルトークンカウント： {usage.total_tokens}")
 
         return validated_data, stats
 
@@ -337,35 +447,69 @@ class GeminiClient(ConversationalAi):
     def prompt_for_gemini(self):
         return self.prompt + "\n" + self.data
 
-    async def generate(self) -> tuple[TrailConditionSchemaList, TokenStats]:
-        from google import genai
+    def _generate_content_config(self):
         from google.genai import types
+
+        return types.GenerateContentConfig(
+            temperature=self.temperature,
+            response_mime_type="application/json",  # 構造化出力
+            response_json_schema=prompt_registry.json_schema(self._config.response_schema),
+            thinking_config=types.ThinkingConfig(thinking_budget=self.thinking_budget),
+        )
+
+    async def _stream_gemini(self, client) -> tuple[str, object]:
+        """ストリーミングで受信し、レコードを受信順に検証（構造が崩れた時点で受信を打ち切る）"""
+        parser = self.start_stream_parser()
+        stream = await client.aio.models.generate_content_stream(
+            model=self.model, contents=self.prompt_for_gemini, config=self._generate_content_config()
+        )
+        usage_metadata = None
+        try:
+            async for chunk in stream:
+                if chunk.usage_metadata is not None:
+                    usage_metadata = chunk.usage_metadata  # 最後のチャンクが応答全体の使用量
+                if chunk.text:
+                    parser.feed(chunk.text)
+        finally:
+            await stream.aclose()
+        return parser.text, usage_metadata
+
+    async def generate(self) -> tuple[TrailConditionSchemaList, TokenStats]:
         from google.genai.errors import ClientError, ServerError
 
         logger.info(f"{self.model}の応答を待っています。")
         logger.debug(f"LlmConfig詳細： \n{self._config}")
         logger.debug(f"APIキー: ...{self.api_key[-5:]}")
 
-        # api_key引数なしでも、環境変数"GEMNI_API_KEY"の値を勝手に参照するが、可読性のため代入
-        client = genai.Client()
+        # 接続プールを全情報源で共有するクライアント
+        client = llm_client_registry.genai(self.api_key)
 
         max_retries = 3
         for i in range(max_retries):
+            response_text = ""
             try:
-                response = await client.aio.models.generate_content(  # リクエスト
-                    model=self.model,
-                    contents=self.prompt_for_gemini,
-                    config=types.GenerateContentConfig(
-                        temperature=self.temperature,
-                        response_mime_type="application/json",  # 構造化出力
-                        response_json_schema=TrailConditionSchemaList.model_json_schema(),
-                        thinking_config=types.ThinkingConfig(thinking_budget=self.thinking_budget),
-                    ),
-                )
-                validated_data = super().validate_response(response.text)
+                if self.streaming:
+                    response_text, usage_metadata = await self.call_with_rate_limit(
+                        lambda: self._stream_gemini(client), self.prompt_for_gemini
+                    )
+                else:
+                    response = await self.call_with_rate_limit(
+                        lambda: client.aio.models.generate_content(  # リクエスト
+                            model=self.model,
+                            contents=self.prompt_for_gemini,
+                            config=self._generate_content_config(),
+                        ),
+                        self.prompt_for_gemini,
+                    )
+                    self._log_parts(response)
+                    response_text = response.text
+                    usage_metadata = response.usage_metadata
+                validated_data = super().validate_response(response_text)
                 break
-            except ValidationError:
-                await super().validation_error(i, max_retries, response.text)
+            except (ValidationError, StreamStructureError):
+                if self.streaming:
+                    response_text = self.partial_response_text
+                await super().validation_error(i, max_retries, response_text)
             except ServerError:
                 await super().handle_server_error(i, max_retries)
             except ClientError as e:
@@ -373,6 +517,22 @@ class GeminiClient(ConversationalAi):
             except Exception as e:
                 super().handle_unexpected_error(e)
 
+        stats = TokenStats(
+            usage_metadata.prompt_token_count,
+            getattr(usage_metadata, "thoughts_token_count", 0) or 0,  # Noneが返ってきた場合のフォールバック
+            usage_metadata.candidates_token_count,
+            len(self.prompt),
+            len(response_text),
+            self.model,
+        )
+
+        logger.debug(f"トータルトークン（from TokenStats）： {stats.total_tokens}")
+        logger.debug(f"トータルトークンカウント： {usage_metadata.total_token_count}")
+
+        return validated_data, stats
+
+    @staticmethod
+    def _log_parts(response) -> None:
         for part in response.candidates[0].content.parts:
             if not part.text:
                 continue
@@ -383,20 +543,6 @@ class GeminiClient(ConversationalAi):
                 logger.debug("## **Answer:**")
                 logger.debug(part.text)
 
-        stats = TokenStats(
-            response.usage_metadata.prompt_token_count,
-            getattr(response.usage_metadata, "thoughts_token_count", 0) or 0,  # Noneが返ってきた場合のフォールバック
-            response.usage_metadata.candidates_token_count,
-            len(self.prompt),
-            len(response.text),
-            self.model,
-        )
-
-        logger.debug(f"トータルトークン（from TokenStats）： {stats.total_tokens}")
-        logger.debug(f"トータルトークンカウント： {response.usage_metadata.total_token_count}")
-
-        return validated_data, stats
-
 
 # テスト用コードは削除されました
 # テスト実行は以下のコマンドを使用してください:
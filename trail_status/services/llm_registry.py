@@ -0,0 +1,109 @@
+import asyncio
+import logging
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+DEFAULT_LLM_HTTP_SETTINGS = {
+    "LLM_MAX_CONNECTIONS": 20,  # 接続プールの最大接続数（プロバイダ・APIキーごと）
+    "LLM_MAX_KEEPALIVE_CONNECTIONS": 10,  # キープアライブで保持する接続数
+    "LLM_KEEPALIVE_EXPIRY": 60.0,  # キープアライブの有効期限（秒）
+    "LLM_TIMEOUT": 600.0,  # 応答待ちタイムアウト（秒。推論モデルは応答に時間がかかる）
+}
+
+
+def get_llm_http_settings() -> dict:
+    """LLM APIクライアントの接続設定（Django設定で上書き可能）"""
+    return {name: getattr(settings, name, default) for name, default in DEFAULT_LLM_HTTP_SETTINGS.items()}
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    config = get_llm_http_settings()
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config["LLM_MAX_CONNECTIONS"],
+            max_keepalive_connections=config["LLM_MAX_KEEPALIVE_CONNECTIONS"],
+            keepalive_expiry=config["LLM_KEEPALIVE_EXPIRY"],
+        ),
+        timeout=config["LLM_TIMEOUT"],
+    )
+
+
+class LlmClientRegistry:
+    """
+    プロセス全体で共有するLLM APIクライアント（プロバイダ・APIキー単位）
+
+    情報源ごとにクライアントを生成するとTLSセッション・接続プールが毎回破棄されるため、
+    1つのクライアントを全情報源・同じイベントループ上の複数回の実行で再利用する。
+    接続はイベントループに紐付くため、別のループから要求された場合は作り直す。
+    """
+
+    def __init__(self):
+        # (プロバイダ, APIキー) → (イベントループ, SDKクライアント, 自前で生成したhttpxクライアント)
+        self._clients: dict[tuple[str, str], tuple[asyncio.AbstractEventLoop, object, httpx.AsyncClient]] = {}
+
+    def _get(self, provider: str, api_key: str, factory):
+        loop = asyncio.get_running_loop()
+        key = (provider, api_key)
+        entry = self._clients.get(key)
+        if entry is not None and entry[0] is loop and not loop.is_closed():
+            return entry[1]
+
+        if entry is not None:
+            logger.debug(f"イベントループが変わったため{provider}クライアントを再生成します")
+        http_client = _create_http_client()
+        client = factory(http_client)
+        self._clients[key] = (loop, client, http_client)
+        logger.debug(f"{provider}クライアント生成（APIキー: ...{api_key[-5:]}）")
+        return client
+
+    def openai(self, api_key: str, base_url: str = DEEPSEEK_BASE_URL):
+        """OpenAI互換API（DeepSeek）のクライアント"""
+        from openai import AsyncOpenAI
+
+        return self._get(
+            f"openai:{base_url}",
+            api_key,
+            lambda http_client: AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client),
+        )
+
+    def genai(self, api_key: str):
+        """Gemini APIのクライアント"""
+        from google import genai
+        from google.genai import types
+
+        return self._get(
+            "genai",
+            api_key,
+            lambda http_client: genai.Client(
+                api_key=api_key, http_options=types.HttpOptions(httpx_async_client=http_client)
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """現在のイベントループ上のクライアントを閉じる（コマンド終了時など）"""
+        loop = asyncio.get_running_loop()
+        for key, (client_loop, _, http_client) in list(self._clients.items()):
+            if client_loop.is_closed():
+                # 終了済みのループのクライアントは閉じられないため破棄のみ
+                del self._clients[key]
+                continue
+            if client_loop is not loop:
+                continue
+            del self._clients[key]
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                logger.warning(f"LLMクライアントの切断に失敗: {key[0]} - {e}")
+        logger.debug("LLMクライアントを閉じました")
+
+    def __len__(self):
+        return len(self._clients)
+
+
+# プロセス全体で共有するレジストリ
+llm_client_registry = LlmClientRegistry()
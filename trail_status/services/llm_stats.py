@@ -1,3 +1,4 @@
+import copy
 import logging
 from abc import ABC, abstractmethod
 
@@ -13,6 +14,7 @@ class TokenStats:
         input_letter_count: int,
         output_letter_count: int,
         model: str,
+        prompt_cache_hit_tokens: int = 0,
     ):
         self.input_tokens = input_tokens
         self.thoughts_tokens = thoughts_tokens
@@ -20,6 +22,8 @@ class TokenStats:
         self.input_letter_count = input_letter_count
         self.output_letter_count = output_letter_count
         self.model_name = model
+        # 入力のうちプロバイダのプレフィックスキャッシュから読まれたトークン数（割引料金）
+        self.prompt_cache_hit_tokens = prompt_cache_hit_tokens or 0
         # 遅延計算用のキャッシュ
         self._input_fee = None
         self._thoughts_fee = None
@@ -30,10 +34,21 @@ class TokenStats:
         total = self.input_tokens + self.thoughts_tokens + self.pure_output_tokens
         return total
 
+    @property
+    def prompt_cache_miss_tokens(self) -> int:
+        return max((self.input_tokens or 0) - self.prompt_cache_hit_tokens, 0)
+
+    @property
+    def prompt_cache_hit_rate(self) -> float:
+        return self.prompt_cache_hit_tokens / self.input_tokens if self.input_tokens else 0.0
+
     @property
     def input_fee(self) -> float:
         if self._input_fee is None:
-            self._input_fee = LlmFee(self.model_name).calculate(self.input_tokens, "input")
+            fee = LlmFee(self.model_name)
+            self._input_fee = fee.calculate(self.prompt_cache_miss_tokens, "input") + fee.calculate(
+                self.prompt_cache_hit_tokens, "input_cache_hit"
+            )
         return self._input_fee
 
     @property
@@ -52,6 +67,31 @@ class TokenStats:
     def total_fee(self) -> float:
         return self.input_fee + self.thoughts_fee + self.pure_output_fee
 
+    @classmethod
+    def combine(cls, stats_list: list["TokenStats"]) -> "TokenStats":
+        """複数回の呼び出し（チャンク分割時など）のトークン統計を合算"""
+        return cls(
+            input_tokens=sum(stats.input_tokens or 0 for stats in stats_list),
+            thoughts_tokens=sum(stats.thoughts_tokens or 0 for stats in stats_list),
+            pure_output_tokens=sum(stats.pure_output_tokens or 0 for stats in stats_list),
+            input_letter_count=sum(stats.input_letter_count for stats in stats_list),
+            output_letter_count=sum(stats.output_letter_count for stats in stats_list),
+            model=stats_list[0].model_name,
+            prompt_cache_hit_tokens=sum(stats.prompt_cache_hit_tokens for stats in stats_list),
+        )
+
+    def scaled(self, ratio: float) -> "TokenStats":
+        """一部分（複数の情報源をまとめた呼び出しのうち1情報源分など）に按分したトークン統計"""
+        return TokenStats(
+            input_tokens=round((self.input_tokens or 0) * ratio),
+            thoughts_tokens=round((self.thoughts_tokens or 0) * ratio),
+            pure_output_tokens=round((self.pure_output_tokens or 0) * ratio),
+            input_letter_count=round(self.input_letter_count * ratio),
+            output_letter_count=round(self.output_letter_count * ratio),
+            model=self.model_name,
+            prompt_cache_hit_tokens=round(self.prompt_cache_hit_tokens * ratio),
+        )
+
     def __repr__(self):
         return f"{self.__class__.__name__}({self.__dict__})"
 
@@ -59,6 +99,8 @@ class TokenStats:
         return {
             "model": self.model_name,
             "input_tokens": self.input_tokens,
+            "prompt_cache_hit_tokens": self.prompt_cache_hit_tokens,
+            "prompt_cache_miss_tokens": self.prompt_cache_miss_tokens,
             "thoughts_tokens": self.thoughts_tokens,
             "output_tokens": self.pure_output_tokens,
             "input_letter_count": self.input_letter_count,
@@ -81,22 +123,69 @@ class LlmStats:
         self.retry_count: int = 0
         self.queue_time: float = None
         self.response_time: float = None
+        self.chunk_count: int = 1  # 大きなページを分割して呼び出した回数
+        self.first_record_time: float = None  # ストリーミング時、最初のレコードを受信するまでの時間
+        self.batch_size: int = 1  # 複数の情報源をまとめて呼び出した場合の情報源数（料金は按分）
 
         # 品質メトリクス
         self.validation_success: bool = True
         self.extraction_count: int = 0
         self.error_count: int = 0
 
+        # キャッシュ済みの応答を再利用した場合はAPIを呼んでいないため料金は0
+        self.cache_hit: bool = False
+
+        # ヘッジ（主モデルが遅い場合に副モデルにも送信）
+        self.hedged: bool = False
+        self.hedge_won: bool = False  # 副モデルの応答を採用したか
+        self.hedge_extra_cost: float = 0.0  # 採用しなかった側の料金
+
         # 将来の拡張用 (コメントアウト)
-        # self.cache_hit: bool = False
         # self.confidence_score: float = None
         # self.model_version: str = None
 
     # TokenStatsへの便利なアクセス (必要最小限)
     @property
     def total_fee(self) -> float:
-        """総コスト"""
-        return self.token_stats.total_fee
+        """総コスト（キャッシュヒット時は0。ヘッジで採用しなかった側の料金を含む）"""
+        return 0.0 if self.cache_hit else self.token_stats.total_fee + self.hedge_extra_cost
+
+    def scaled(self, ratio: float) -> "LlmStats":
+        """一部分に按分したメトリクス（トークン数・料金のみ按分し、その他の項目はそのまま引き継ぐ）"""
+        stats = copy.copy(self)
+        stats.token_stats = self.token_stats.scaled(ratio)
+        stats.hedge_extra_cost = self.hedge_extra_cost * ratio
+        return stats
+
+    @classmethod
+    def combine(cls, stats_list: list["LlmStats"]) -> "LlmStats":
+        """
+        並行した複数回の呼び出し（チャンク分割時など）のメトリクスを合算
+
+        トークン統計・料金は実際にAPIを呼んだ分のみ（全てキャッシュヒットなら料金0）。
+        時間は並行実行のため最大値（最初のレコードまでの時間は最小値）とする。
+        """
+        fresh_stats = [stats.token_stats for stats in stats_list if not stats.cache_hit]
+        combined = cls(TokenStats.combine(fresh_stats or [stats.token_stats for stats in stats_list]))
+        combined.cache_hit = not fresh_stats
+
+        def non_null(name: str) -> list:
+            return [getattr(stats, name) for stats in stats_list if getattr(stats, name) is not None]
+
+        combined.execution_time = max(non_null("execution_time"), default=None)
+        combined.queue_time = max(non_null("queue_time"), default=None)
+        combined.response_time = max(non_null("response_time"), default=None)
+        combined.first_record_time = min(non_null("first_record_time"), default=None)
+        combined.retry_count = sum(stats.retry_count for stats in stats_list)
+        combined.chunk_count = sum(stats.chunk_count for stats in stats_list)
+        combined.batch_size = max(stats.batch_size for stats in stats_list)
+        combined.validation_success = all(stats.validation_success for stats in stats_list)
+        combined.extraction_count = sum(stats.extraction_count for stats in stats_list)
+        combined.error_count = sum(stats.error_count for stats in stats_list)
+        combined.hedged = any(stats.hedged for stats in stats_list)
+        combined.hedge_won = any(stats.hedge_won for stats in stats_list)
+        combined.hedge_extra_cost = sum(stats.hedge_extra_cost for stats in stats_list)
+        return combined
 
     def to_dict(self) -> dict:
         """辞書形式で全メトリクスを取得"""
@@ -111,6 +200,9 @@ class LlmStats:
             "validation_success": self.validation_success,
             "extraction_count": self.extraction_count,
             "error_count": self.error_count,
+            "chunk_count": self.chunk_count,
+            "first_record_time": self.first_record_time,
+            "batch_size": self.batch_size,
         }
 
         # None値と意味のない0値を除外
@@ -122,6 +214,13 @@ class LlmStats:
         # validation_successは常に保持
         result["validation_success"] = self.validation_success
 
+        result["cache_hit"] = self.cache_hit
+        result["hedged"] = self.hedged
+        if self.hedged:
+            result["hedge_won"] = self.hedge_won
+            result["hedge_extra_cost"] = self.hedge_extra_cost
+        result["total_fee"] = self.total_fee
+
         return result
 
     def __repr__(self):
@@ -168,6 +267,10 @@ class LlmFee(BaseLlmFee):
         return self._model_list
 
     def calculate(self, tokens: int | None, token_type: str) -> float:
+        """
+        Args:
+            token_type: "input" / "input_cache_hit"（プレフィックスキャッシュから読まれた入力） / "thoughts" / "output"
+        """
         token_type = "output" if token_type == "thoughts" else token_type
         tokens = 0 if not tokens else tokens
         if self.model not in self.model_list:
@@ -180,9 +283,15 @@ class LlmFee(BaseLlmFee):
 
             if token_type == "output":
                 dollar_per_1M_tokens = base_fee["output"]
+            elif token_type == "input_cache_hit":
+                dollar_per_1M_tokens = base_fee["input(cache_hit)"]
             else:
                 dollar_per_1M_tokens = base_fee["input(cache_miss)"]
 
+        # Geminiはキャッシュ割引の料金表が無いため通常の入力料金で試算
+        elif token_type == "input_cache_hit":
+            return self.calculate(tokens, "input")
+
         elif self.model == "gemini-2.5-flash":
             dollar_per_1M_tokens = self.fees[self.model][token_type]
 
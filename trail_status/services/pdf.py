@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from django.conf import settings
+
+from .executor import ExtractionExecutor
+from .http_client import read_limited
+from .scheduler import PolitenessScheduler
+
+logger = logging.getLogger(__name__)
+
+# trafilatura（include_links=True）の出力はMarkdown形式のリンク: [テキスト](URL)
+LINK_PATTERN = re.compile(r"\]\(([^)\s]+)\)")
+
+
+def find_pdf_links(text: str, base_url: str, limit: int | None = None) -> list[str]:
+    """
+    抽出テキスト中のPDFリンクを絶対URLで列挙（出現順・重複なし）
+
+    Args:
+        text: trafilaturaの抽出テキスト
+        base_url: 相対リンクの解決に使うページURL
+        limit: 最大件数
+    """
+    links = []
+    for match in LINK_PATTERN.finditer(text):
+        url = urljoin(base_url, match.group(1))
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.path.lower().endswith(".pdf"):
+            continue
+        if url not in links:
+            links.append(url)
+        if limit and len(links) >= limit:
+            break
+    return links
+
+
+def is_pdf_supported() -> bool:
+    """PDFテキスト抽出に必要なpypdfがインストールされているか"""
+    return importlib.util.find_spec("pypdf") is not None
+
+
+# ワーカープロセスからも呼べるようモジュールレベルで定義
+def extract_pdf_text(raw_content: bytes) -> str:
+    """
+    PDFからテキストを抽出（pypdfが必要）
+
+    Raises:
+        ImportError: pypdfがインストールされていない場合
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(raw_content))
+    pages = [page.extract_text() or "" for page in reader.pages]
+    return "\n".join(page.strip() for page in pages if page.strip())
+
+
+class PdfCache:
+    """
+    PDFテキストのキャッシュ（URL単位。ETag/Last-Modifiedと生データハッシュを保持）
+
+    保存先: {base_dir}/{sha256(url)}.json
+    """
+
+    def __init__(self, base_dir: Path | None = None):
+        self.base_dir = Path(base_dir or getattr(settings, "PDF_CACHE_DIR", settings.BASE_DIR / "pdf_cache"))
+
+    def path_for(self, url: str) -> Path:
+        return self.base_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> dict | None:
+        path = self.path_for(url)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"PDFキャッシュの読み込みに失敗: {url} - {e}")
+            return None
+
+    def put(self, url: str, entry: dict) -> None:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(url)
+        fd, tmp_name = tempfile.mkstemp(dir=self.base_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"url": url, **entry}, f, ensure_ascii=False)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+class PdfFollower:
+    """
+    ページ内のPDFリンクを取得してテキスト化する任意ステージ
+
+    取得はPolitenessSchedulerの制限内で並行に行い、テキスト抽出はExtractionExecutorで実行する。
+    キャッシュのETag/Last-Modifiedで条件付きGETを送り、304または生データハッシュ一致なら
+    ダウンロード・パースを省略してキャッシュのテキストを使う。
+    """
+
+    def __init__(
+        self,
+        scheduler: PolitenessScheduler,
+        executor: ExtractionExecutor,
+        cache: PdfCache | None = None,
+        max_per_source: int | None = None,
+        max_bytes: int | None = None,
+    ):
+        self.scheduler = scheduler
+        self.executor = executor
+        self.cache = cache or PdfCache()
+        self.max_per_source = max_per_source or getattr(settings, "PDF_MAX_PER_SOURCE", 5)
+        self.max_bytes = max_bytes or getattr(settings, "PDF_MAX_BYTES", 20 * 1024 * 1024)
+
+    async def fetch_texts(self, client: httpx.AsyncClient, text: str, base_url: str) -> list[tuple[str, str]]:
+        """
+        抽出テキスト中のPDFリンクを取得してテキスト化
+
+        Returns:
+            list[tuple[str, str]]: (PDFのURL, テキスト)。取得・抽出に失敗したPDFは含まない
+        """
+        urls = find_pdf_links(text, base_url, self.max_per_source)
+        if not urls:
+            return []
+
+        logger.info(f"PDFリンクを取得: {base_url} ({len(urls)}件)")
+        results = await asyncio.gather(*(self._fetch_one(client, url) for url in urls), return_exceptions=True)
+
+        texts = []
+        for url, result in zip(urls, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"PDF取得・抽出失敗（スキップ）: {url} - {result}")
+            elif result.strip():
+                texts.append((url, result))
+        return texts
+
+    async def _fetch_one(self, client: httpx.AsyncClient, url: str) -> str:
+        cached = await asyncio.to_thread(self.cache.get, url)
+
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self.scheduler.slot(url, client):
+            response = await client.send(client.build_request("GET", url, headers=headers), stream=True)
+            try:
+                if response.status_code == httpx.codes.NOT_MODIFIED and cached:
+                    logger.debug(f"PDF 304 Not Modified（キャッシュ使用）: {url}")
+                    return cached["text"]
+                response.raise_for_status()
+                raw_content = await read_limited(response, self.max_bytes)
+            finally:
+                await response.aclose()
+
+        raw_hash = hashlib.sha256(raw_content).hexdigest()
+        if cached and cached.get("raw_hash") == raw_hash:
+            logger.debug(f"PDF内容変更なし（キャッシュ使用）: {url}")
+            text = cached["text"]
+        else:
+            text = await self.executor.run(extract_pdf_text, raw_content)
+            logger.debug(f"PDFテキスト抽出: {url} (抽出文字数: {len(text)})")
+
+        entry = {
+            "etag": response.headers.get("ETag", ""),
+            "last_modified": response.headers.get("Last-Modified", ""),
+            "raw_hash": raw_hash,
+            "text": text,
+        }
+        await asyncio.to_thread(self.cache.put, url, entry)
+        return text
@@ -1,37 +1,158 @@
 import asyncio
 import logging
+from collections.abc import Callable
+from contextlib import AsyncExitStack
 
 import httpx
+from django.conf import settings
 
-from .fetcher import DataFetcher
-from .llm_client import DeepseekClient, GeminiClient, LlmConfig
-from .llm_stats import LlmStats
+from .blocks import diff_blocks, render_changed_blocks
+from .batching import BatchItem, attribute_stats, build_batch_config, plan_batches, split_batch_result
+from .budget import RunBudget, estimate_input_cost
+from .chunker import merge_results, split_into_chunks, truncate_to_tokens
+from .executor import ExtractionExecutor, LoopBlockMonitor
+from .extraction import DEFAULT_PROFILE, ExtractionProfile
+from .fetch_cache import FetchCache
+from .fetcher import DataFetcher, FetchResult, fetch_retrying, legacy_content_hash
+from .hedging import HedgeOutcome, HedgePolicy, race_with_hedge
+from .http_client import create_http_client
+from .llm_cache import LlmResponseCache
+from .llm_client import ConversationalAi, DeepseekClient, GeminiClient, LlmConfig
+from .llm_stats import LlmStats, TokenStats
+from .pdf import PdfFollower, is_pdf_supported
+from .scheduler import PolitenessScheduler
 from .schema import TrailConditionSchemaList
+from .snapshot import SnapshotStore
+from .token_estimator import estimate_tokens
 from .types import ModelDataSingle, UpdatedDataList, UpdatedDataSingle
 
 logger = logging.getLogger(__name__)
 
+# DataSourceのURLフィールド（url2は任意）
+URL_SLOTS = ("url1", "url2")
+
+
+def url_state_prefix(slot: str) -> str:
+    """URLごとの取得状態フィールドの接頭辞（url1は接頭辞なし、url2は"url2_"）"""
+    return "" if slot == "url1" else f"{slot}_"
+
+
+def attribute_record_urls(ai_result: TrailConditionSchemaList, page_texts: list[tuple[str, str]]) -> list[str]:
+    """
+    レコードごとの取得元URL（LLMに渡したページのうち、タイトル・登山道名を原文のまま含むページ）
+
+    1ページのみの場合はそのURL。どのページにも見つからない場合は先頭のページのURLとする。
+    """
+    if not page_texts:
+        return []
+    if len(page_texts) == 1:
+        return [page_texts[0][0]] * len(ai_result.trail_condition_records)
+
+    def compact(text: str) -> str:
+        return "".join(text.split())
+
+    compact_pages = [(url, compact(text)) for url, text in page_texts]
+    record_urls = []
+    for record in ai_result.trail_condition_records:
+        url = page_texts[0][0]
+        for key in (compact(record.title), compact(record.trail_name)):
+            matches = [page_url for page_url, text in compact_pages if key and key in text]
+            if len(matches) == 1:
+                url = matches[0]
+                break
+        record_urls.append(url)
+    return record_urls
+
 
 class TrailConditionPipeline:
     """登山道状況の自動処理パイプライン（純粋async処理）"""
 
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        scheduler: PolitenessScheduler | None = None,
+        executor: ExtractionExecutor | None = None,
+        snapshot_store: SnapshotStore | None = None,
+        save_snapshots: bool | None = None,
+        fetcher: DataFetcher | None = None,
+        llm_client_factory: Callable[[LlmConfig], ConversationalAi] | None = None,
+        follow_pdf: bool | None = None,
+        fetch_cache: FetchCache | None = None,
+        llm_cache: LlmResponseCache | None = None,
+        budget: RunBudget | None = None,
+        batch: bool | None = None,
+        hedge_policy: HedgePolicy | None = None,
+    ):
+        self.scheduler = scheduler or PolitenessScheduler.from_settings()
+        self.executor = executor or ExtractionExecutor.from_settings()
+        # リプレイ時は保存済みスナップショットを返すfetcher・ローカルのLLM代替を差し込む
+        self.fetcher = fetcher or DataFetcher(executor=self.executor)
+        self.llm_client_factory = llm_client_factory or self._create_ai_client
+        self.loop_monitor = LoopBlockMonitor()
+        # 同一URLを指す情報源間で取得・抽出を共有
+        self.fetch_cache = fetch_cache or FetchCache.from_settings()
+        # 同じ入力に対するLLM応答の再利用（LLM_CACHE_ENABLED / --llm-cache の場合のみ。--no-llm-cache で無効）
+        if llm_cache is None and getattr(settings, "LLM_CACHE_ENABLED", False):
+            llm_cache = LlmResponseCache()
+        self.llm_cache = llm_cache
+        # 実行全体のLLM予算（--max-cost / --max-input-tokens。指定しなければ制限なし）
+        self.budget = budget or RunBudget()
+        # 取得ページの保存先（SNAPSHOT_ENABLED=False / save_snapshots=Falseの場合は保存しない）
+        if save_snapshots is None:
+            save_snapshots = snapshot_store is not None or getattr(settings, "SNAPSHOT_ENABLED", False)
+        if snapshot_store is None and save_snapshots:
+            snapshot_store = SnapshotStore()
+        self.snapshot_store = snapshot_store if save_snapshots else None
+        # ページ内のPDFリンクも取得してLLM入力に加える（PDF_FOLLOW_ENABLED / --follow-pdf）
+        if follow_pdf is None:
+            follow_pdf = getattr(settings, "PDF_FOLLOW_ENABLED", False)
+        if follow_pdf and not is_pdf_supported():
+            raise ValueError("PDFリンクの取得にはpypdfが必要です（uv sync --extra pdf でインストールしてください）")
+        self.pdf_follower = PdfFollower(self.scheduler, self.executor) if follow_pdf else None
+        # 小さな情報源を1回のLLM呼び出しにまとめる（LLM_BATCH_ENABLED / --batch）
+        self.batch = getattr(settings, "LLM_BATCH_ENABLED", False) if batch is None else batch
+        # 応答が遅い場合に副モデルにも同じリクエストを送る（LLM_HEDGE_ENABLED / --hedge）
+        if hedge_policy is None and getattr(settings, "LLM_HEDGE_ENABLED", False):
+            hedge_policy = HedgePolicy.from_settings()
+        self.hedge_policy = hedge_policy
+
+    async def process_source_data(
+        self, source_data_list: list[ModelDataSingle], ai_model: str, client: httpx.AsyncClient | None = None
+    ) -> UpdatedDataList:
+        """
+        ソースデータリストを並行処理（Django ORM一切なし）
 
-    async def process_source_data(self, source_data_list: list[ModelDataSingle], ai_model: str) -> UpdatedDataList:
-        """ソースデータリストを並行処理（Django ORM一切なし）"""
+        Args:
+            source_data_list: 処理対象のソースデータ
+            ai_model: 使用するAIモデル（Noneはプロンプトファイル設定またはデフォルト）
+            client: 共有httpxクライアント（省略時は設定から生成し、処理後に閉じる）
+        """
         logger.info(f"パイプライン処理開始 - 対象: {len(source_data_list)}件, モデル: {ai_model or 'デフォルト'}")
 
-        async with httpx.AsyncClient() as client:
-            tasks = []
-            for source_data in source_data_list:
-                # コア処理
-                task = self.process_single_source_data(client, source_data, ai_model)
-                tasks.append(task)
+        self.fetch_cache.clear()
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(self.loop_monitor)
+            if client is None:
+                client = await stack.enter_async_context(create_http_client())
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if self.batch:
+                results = await self._process_batched(client, source_data_list, ai_model)
+            else:
+                tasks = []
+                for source_data in source_data_list:
+                    # コア処理
+                    task = self.process_single_source_data(client, source_data, ai_model)
+                    tasks.append(task)
+
+                results = await asyncio.gather(*tasks, return_exceptions=True)
 
         logger.info(f"パイプライン処理完了 - 処理件数: {len(results)}")
+        logger.info(f"取得スケジューラ: {self.scheduler.stats}")
+        logger.info(f"取得キャッシュ: {self.fetch_cache.stats}")
+        if self.llm_cache is not None:
+            logger.info(f"LLMキャッシュ: {self.llm_cache.stats}")
+        if self.budget.limited:
+            logger.info(f"LLM予算: {self.budget}")
+        logger.info(f"イベントループのブロック: {self.loop_monitor} (抽出: {self.executor})")
         return list(zip(source_data_list, results))
 
     # コア処理
@@ -39,101 +160,511 @@ class TrailConditionPipeline:
         self, client: httpx.AsyncClient, source_data: ModelDataSingle, ai_model: str
     ) -> UpdatedDataSingle:
         """単一ソースデータの処理パイプライン（純粋async）"""
+        try:
+            result, scraped_text = await self._prepare_source_data(client, source_data)
+            if scraped_text is None:
+                return result
+            return await self._analyze_source_data(source_data, result, scraped_text, ai_model)
+
+        except Exception as e:
+            logger.error(f"処理エラー: {source_data['name']} - {str(e)}")
+            return {"error": str(e)}
+
+    async def _prepare_source_data(
+        self, client: httpx.AsyncClient, source_data: ModelDataSingle
+    ) -> tuple[UpdatedDataSingle, str | None]:
+        """
+        取得・変更判定からLLMに送るテキストの作成まで
+
+        Returns:
+            tuple: (処理結果, LLMに送るテキスト)。LLM処理が不要な場合（変更なし・エラー）はテキストがNoneで、
+                処理結果がそのまま最終結果となる
+        """
         logger.debug(f"処理開始: {source_data['name']} (ID: {source_data['id']})")
 
-        try:
-            # 1. スクレイピング
-            scraped_html = await self._fetch_raw_content(client, source_data["url1"])
-            if not scraped_html.strip():
-                logger.warning(f"スクレイピング結果が空: {source_data['name']}")
-                return {"error": "スクレイピング結果が空でした"}
-
-            # 2. ハッシュベース変更検知
-            fetcher = DataFetcher()
-            content_changed, new_hash = fetcher.has_content_changed(scraped_html, source_data.get("content_hash"))
-            
-            if not content_changed:
-                logger.info(f"コンテンツ変更なし（ソースID: {source_data['id']}）- LLM処理をスキップ")
-                return {
-                    "success": True, 
-                    "content_changed": False, 
-                    "new_hash": new_hash,
-                    "scraped_length": len(scraped_html),
-                }
-
-            # 3. trafilaturaでテキスト抽出
-            scraped_text = await self._extract_text_content(client, source_data["url1"])
-            if not scraped_text.strip():
-                logger.warning(f"テキスト抽出結果が空: {source_data['name']}")
-                return {"error": "テキスト抽出結果が空でした"}
-
-            # 4. AI解析（コンテンツ変更時のみ）
-            logger.info(f"AI解析開始: {source_data['name']} - モデル: {ai_model or 'デフォルト'}")
-            config, ai_result, stats = await self._analyze_with_ai(source_data, scraped_text, ai_model)
-            logger.info(f"AI解析完了: {source_data['name']} - コスト: ${stats.total_fee:.4f}, 実行時間: {stats.execution_time:.2f}秒")
+        # 1. スクレイピング（設定された全URLを並行取得。URLごとに条件付きGET・ハッシュ判定）
+        slots = [slot for slot in URL_SLOTS if source_data.get(slot)]
+        # 情報源ごとの抽出設定（プロンプトファイルの extraction: セクション）
+        profile = await asyncio.to_thread(
+            ExtractionProfile.from_prompt_file, self._get_prompt_filename_from_data(source_data)
+        )
+        fetched = await asyncio.gather(
+            *(self._fetch_page(client, source_data, slot, profile) for slot in slots), return_exceptions=True
+        )
+        # 取得に失敗したURLはエラーを記録して前回の状態を維持し、取得できたURLのみで処理を続ける
+        pages = {}
+        fetch_results = {}
+        for slot, outcome in zip(slots, fetched):
+            if isinstance(outcome, Exception):
+                logger.warning(f"ページ取得失敗: {source_data['name']} ({source_data[slot]}) - {outcome}")
+                pages[slot] = {"url": source_data[slot], "error": str(outcome)}
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                pages[slot], fetch_results[slot] = outcome
+        if not fetch_results:
+            raise next(outcome for outcome in fetched if isinstance(outcome, Exception))
+        # 変更ありで抽出結果が空のページも、取得失敗と同様にそのURLのみエラーとして前回の状態を維持
+        for slot, fetch_result in list(fetch_results.items()):
+            if pages[slot]["content_changed"] and not fetch_result.text.strip():
+                logger.warning(f"テキスト抽出結果が空: {source_data['name']} ({fetch_result.url})")
+                pages[slot] = {"url": source_data[slot], "error": "テキスト抽出結果が空でした"}
+                del fetch_results[slot]
+        if not fetch_results:
+            return {"error": "テキスト抽出結果が空でした"}, None
+        fetched_slots = [slot for slot in slots if slot in fetch_results]
+        scraped_length = sum(pages[slot]["scraped_length"] for slot in fetched_slots)
 
+        # 2. 変更のあったページのみを変更ありとして扱う
+        changed_slots = [slot for slot in fetched_slots if pages[slot]["content_changed"]]
+
+        # 3. 変更のあったページから、追加・変更されたブロックのテキストを選ぶ
+        page_texts = []
+        for slot in changed_slots:
+            text = self._select_changed_text(source_data, slot, pages[slot], fetch_results[slot])
+            if text.strip():
+                page_texts.append((fetch_results[slot].url, text))
+
+        if not page_texts:
+            not_modified = all(pages[slot].get("not_modified") for slot in fetched_slots)
+            if not_modified:
+                reason = "304 Not Modified"
+            elif changed_slots:
+                reason = "追加・変更ブロックなし"
+            else:
+                reason = "コンテンツ変更なし"
+            logger.info(f"{reason}（ソースID: {source_data['id']}）- LLM処理をスキップ")
             return {
                 "success": True,
-                "content_changed": True,
-                "new_hash": new_hash,
-                "scraped_length": len(scraped_html),
-                "extracted_trail_conditions": ai_result,  # TrailConditionSchemaListのまま
-                "stats": stats,  # LlmStatsオブジェクト
-                "config": config,  # LlmConfigオブジェクト
-            }
+                "content_changed": False,
+                "not_modified": not_modified,
+                "pages": pages,
+                "scraped_length": scraped_length,
+            }, None
 
-        except Exception as e:
-            logger.error(f"処理エラー: {source_data['name']} - {str(e)}")
-            return {"error": str(e)}
+        # 変更のあったページのテキストを1つの文書にまとめる
+        scraped_text = self._merge_page_texts(page_texts)
+        if self.pdf_follower is not None:
+            scraped_text = await self._append_pdf_texts(client, scraped_text, page_texts)
 
-    async def _fetch_raw_content(self, client: httpx.AsyncClient, url: str) -> str:
-        """生HTMLのスクレイピング（ハッシュ計算用）"""
-        fetcher = DataFetcher()
-        try:
-            response = await client.get(url, headers=fetcher.headers)
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            logger.error(f"HTMLスクレイピング失敗 - URL: {url}, エラー: {e}")
-            raise
+        result = {
+            "success": True,
+            "content_changed": True,
+            "pages": pages,
+            "scraped_length": scraped_length,
+            "changed_slots": changed_slots,
+            "page_texts": page_texts,  # レコードの取得元URLの判定用
+        }
+        return result, scraped_text
+
+    async def _analyze_source_data(
+        self, source_data: ModelDataSingle, result: UpdatedDataSingle, scraped_text: str, ai_model: str | None
+    ) -> UpdatedDataSingle:
+        """4. AI解析（コンテンツ変更時のみ・全ページまとめて1回）"""
+        logger.info(
+            f"AI解析開始: {source_data['name']} - モデル: {ai_model or 'デフォルト'}, "
+            f"対象ページ: {result['changed_slots']}"
+        )
+        config, ai_result, stats = await self._analyze_with_ai(source_data, scraped_text, ai_model)
+        return self._analyzed_result(source_data, result, config, ai_result, stats)
+
+    @staticmethod
+    def _analyzed_result(
+        source_data: ModelDataSingle,
+        result: UpdatedDataSingle,
+        config: LlmConfig,
+        ai_result: TrailConditionSchemaList,
+        stats: LlmStats,
+    ) -> UpdatedDataSingle:
+        logger.info(f"AI解析完了: {source_data['name']} - コスト: ${stats.total_fee:.4f}, 実行時間: {stats.execution_time:.2f}秒")
+        page_texts = result.pop("page_texts", [])
+        return {
+            **result,
+            "extracted_trail_conditions": ai_result,  # TrailConditionSchemaListのまま
+            "record_urls": attribute_record_urls(ai_result, page_texts),  # レコードごとの取得元URL
+            "stats": stats,  # LlmStatsオブジェクト
+            "config": config,  # LlmConfigオブジェクト
+        }
+
+    async def _process_batched(
+        self, client: httpx.AsyncClient, source_data_list: list[ModelDataSingle], ai_model: str | None
+    ) -> list[UpdatedDataSingle | BaseException]:
+        """
+        全情報源の取得・変更判定を終えてから、LLM処理が必要な小さな情報源をまとめて解析
+
+        まとめられない情報源（大きなページ・1件だけのグループ）は従来どおり単独で解析する。
+        """
+
+        async def prepare(source_data):
+            try:
+                return await self._prepare_source_data(client, source_data)
+            except Exception as e:
+                logger.error(f"処理エラー: {source_data['name']} - {str(e)}")
+                return {"error": str(e)}, None
+
+        prepared = await asyncio.gather(*(prepare(source_data) for source_data in source_data_list))
+        results: list[UpdatedDataSingle | BaseException] = [result for result, _ in prepared]
+
+        items = []
+        index_of = {}  # 情報源ID → 結果の位置
+        for index, (source_data, (_, scraped_text)) in enumerate(zip(source_data_list, prepared)):
+            if scraped_text is None:
+                continue
+            try:
+                config = self._load_llm_config(source_data, scraped_text, ai_model)
+            except ValueError as e:
+                results[index] = {"error": str(e)}
+                continue
+            items.append(BatchItem(source_data, config))
+            index_of[source_data["id"]] = index
+
+        batches = plan_batches(
+            items,
+            max_tokens=getattr(settings, "LLM_BATCH_MAX_TOKENS", 6000),
+            max_sources=getattr(settings, "LLM_BATCH_MAX_SOURCES", 8),
+        )
+
+        async def analyze_single(item: BatchItem) -> None:
+            index = index_of[item.source_data["id"]]
+            try:
+                results[index] = await self._analyze_source_data(
+                    item.source_data, results[index], item.config.data, ai_model
+                )
+            except Exception as e:
+                logger.error(f"処理エラー: {item.source_data['name']} - {str(e)}")
+                results[index] = {"error": str(e)}
+
+        async def analyze_batch(batch: list[BatchItem]) -> None:
+            names = [item.source_data["name"] for item in batch]
+            logger.info(f"AI解析開始（{len(batch)}件まとめて）: {names}")
+            try:
+                per_source = await self._analyze_batch(batch)
+            except Exception as e:
+                logger.error(f"処理エラー（まとめて解析）: {names} - {str(e)}")
+                for item in batch:
+                    results[index_of[item.source_data["id"]]] = {"error": str(e)}
+                return
+            for item, (ai_result, stats) in zip(batch, per_source):
+                index = index_of[item.source_data["id"]]
+                results[index] = self._analyzed_result(item.source_data, results[index], item.config, ai_result, stats)
+
+        await asyncio.gather(
+            *(analyze_single(batch[0]) if len(batch) == 1 else analyze_batch(batch) for batch in batches)
+        )
+        return results
+
+    async def _analyze_batch(self, batch: list[BatchItem]) -> list[tuple[TrailConditionSchemaList, LlmStats]]:
+        """複数の情報源を1回のLLM呼び出しで解析し、結果とトークン数・料金を情報源ごとに振り分ける"""
+        batch_config = build_batch_config(batch)
+        ai_result, llm_stats = await self._generate(batch_config)
+        per_source = split_batch_result(ai_result, batch_config.batch_source_ids)
+        stats_list = attribute_stats(batch, llm_stats)
+        return [(per_source[item.source_data["id"]], stats) for item, stats in zip(batch, stats_list)]
+
+    async def _fetch_page(
+        self,
+        client: httpx.AsyncClient,
+        source_data: ModelDataSingle,
+        slot: str,
+        profile: ExtractionProfile | None = None,
+    ) -> tuple[dict, FetchResult]:
+        """
+        1ページを取得して変更判定
+
+        Args:
+            slot: "url1" / "url2"（前回の状態は {prefix}content_hash 等のキーから取得）
+            profile: 情報源ごとの抽出設定
+
+        Returns:
+            tuple[dict, FetchResult]: (ページごとの新しい状態, 取得結果)
+        """
+        url = source_data[slot]
+        prefix = url_state_prefix(slot)
+        previous_hash = source_data.get(f"{prefix}content_hash") or ""
+        previous_raw_hash = source_data.get(f"{prefix}raw_content_hash") or ""
+        previous_block_hashes = source_data.get(f"{prefix}block_hashes") or []
+
+        etag = source_data.get(f"{prefix}etag")
+        last_modified = source_data.get(f"{prefix}last_modified")
+
+        # 抽出設定が前回と異なる（または未保存の）場合、304・生データ一致でも抽出を省略できないため、
+        # 前回の生データハッシュ・検証子を使わずに取得・抽出し直す（変更判定は抽出結果のハッシュで行う）
+        extraction_digest = (profile or DEFAULT_PROFILE).digest
+        skip_raw_hash = previous_raw_hash
+        if source_data.get(f"{prefix}extraction_digest") != extraction_digest:
+            if previous_raw_hash or etag or last_modified:
+                logger.info(f"抽出設定が前回と異なるため抽出し直します: {url}")
+            skip_raw_hash, etag, last_modified = "", None, None
+
+        async def fetch_once() -> FetchResult:
+            async with self.scheduler.slot(url, client):
+                return await self.fetcher.fetch(
+                    client, url, etag=etag, last_modified=last_modified, raw_hash=skip_raw_hash, profile=profile
+                )
+
+        async def fetch() -> FetchResult:
+            # リトライ待ちの間は枠を解放し、再試行のたびにホストごとの取得間隔を守って枠を確保し直す
+            return await fetch_retrying()(fetch_once)
+
+        # 同じURLを他の情報源が取得済み・取得中であれば結果を共有
+        fetch_result = await self.fetch_cache.get_or_fetch(
+            url, fetch, etag=etag, last_modified=last_modified, raw_hash=skip_raw_hash, profile=profile
+        )
 
-    async def _extract_text_content(self, client: httpx.AsyncClient, url: str) -> str:
-        """テキスト抽出（AI解析用）- DataFetcherのリトライロジック活用"""
-        fetcher = DataFetcher()
-        return await fetcher.fetch_text(client, url)
+        page = {
+            "url": url,
+            "etag": fetch_result.etag,
+            "last_modified": fetch_result.last_modified,
+            "scraped_length": fetch_result.scraped_length,
+            "extraction_digest": extraction_digest,
+        }
+
+        # 304 Not Modified: 本文取得・抽出なしで変更なし扱い
+        if fetch_result.not_modified:
+            logger.debug(f"304 Not Modified: {url}")
+            return {
+                **page,
+                "content_changed": False,
+                "not_modified": True,
+                "new_hash": previous_hash,
+                "new_raw_hash": previous_raw_hash,
+                "block_hashes": previous_block_hashes,
+            }, fetch_result
+
+        if not fetch_result.html.strip():
+            raise ValueError(f"スクレイピング結果が空でした: {url}")
+
+        # スナップショット保存（再抽出・プロンプト検証・LLM出力の調査用）
+        # 生データが前回と同じであれば前回のスナップショットがあるため、保存・紐付けを行わない
+        if fetch_result.raw_hash != previous_raw_hash:
+            page.update(await self._save_snapshot(fetch_result))
+
+        # ハッシュベース変更検知
+        # 生バイト列が一致すれば抽出なしで変更なし、異なればLLMに渡すテキストと同じ抽出結果のハッシュで判定
+        if fetch_result.raw_unchanged:
+            new_hash = previous_hash
+            content_changed = False
+        else:
+            new_hash = fetch_result.content_hash
+            content_changed = self.fetcher.is_hash_changed(new_hash, previous_hash)
+            # 生データハッシュが未保存 = 従来の方式でハッシュを保存した情報源。従来の方式でも比較し、
+            # 一致すれば変更なしとして新しい方式のハッシュに置き換える（移行直後の全件LLM再処理を防ぐ）
+            if content_changed and previous_hash and not previous_raw_hash:
+                if await self.executor.run(legacy_content_hash, fetch_result.html) == previous_hash:
+                    logger.info(f"従来方式のハッシュと一致したため変更なし扱い: {url}")
+                    content_changed = False
+
+        return {
+            **page,
+            "content_changed": content_changed,
+            "new_hash": new_hash,
+            "new_raw_hash": fetch_result.raw_hash,
+            "block_hashes": previous_block_hashes,  # 変更時は_select_changed_textで更新
+        }, fetch_result
+
+    def _select_changed_text(
+        self, source_data: ModelDataSingle, slot: str, page: dict, fetch_result: FetchResult
+    ) -> str:
+        """
+        LLMに送るテキストを選び、ページ状態のブロックハッシュを更新
+
+        前回のブロックハッシュがあり、変更ブロックの割合がBLOCK_DIFF_MAX_RATIO以下であれば
+        追加・変更されたブロックと前後関係のみを返す。それ以外はページ全体を返す。
+        追加・変更ブロックが無い（削除・並べ替えのみの）場合は空文字を返す。
+        """
+        previous_block_hashes = source_data.get(f"{url_state_prefix(slot)}block_hashes") or []
+        diff = diff_blocks(fetch_result.text, previous_block_hashes)
+        page["block_hashes"] = diff.hashes
+        page["changed_blocks"] = len(diff.changed)
+
+        if not getattr(settings, "BLOCK_DIFF_ENABLED", True) or not previous_block_hashes:
+            return fetch_result.text
+        if diff.changed_ratio > getattr(settings, "BLOCK_DIFF_MAX_RATIO", 0.5):
+            logger.debug(f"変更ブロックが多いためページ全体を送信: {fetch_result.url} ({len(diff.changed)}/{len(diff.blocks)})")
+            return fetch_result.text
+
+        logger.info(f"変更ブロックのみ送信: {fetch_result.url} ({len(diff.changed)}/{len(diff.blocks)}ブロック)")
+        return render_changed_blocks(diff, context=getattr(settings, "BLOCK_DIFF_CONTEXT", 1))
+
+    @staticmethod
+    def _merge_page_texts(page_texts: list[tuple[str, str]]) -> str:
+        """複数ページのテキスト（URL, テキスト）を見出し付きで1つの文書にまとめる（1ページのみの場合はそのまま）"""
+        if len(page_texts) == 1:
+            return page_texts[0][1]
+        sections = [f"## 【ページ{i}】 {url}\n\n{text}" for i, (url, text) in enumerate(page_texts, 1)]
+        return "\n\n".join(sections)
+
+    async def _append_pdf_texts(
+        self, client: httpx.AsyncClient, scraped_text: str, page_texts: list[tuple[str, str]]
+    ) -> str:
+        """LLMに送るページテキストからリンクされたPDFのテキストを見出し付きで末尾に追加"""
+        pdf_lists = await asyncio.gather(
+            *(self.pdf_follower.fetch_texts(client, text, url) for url, text in page_texts)
+        )
+        sections = []
+        seen = set()
+        for pdf_url, pdf_text in (item for pdf_list in pdf_lists for item in pdf_list):
+            if pdf_url in seen:
+                continue
+            seen.add(pdf_url)
+            sections.append(f"## 【PDF】 {pdf_url}\n\n{pdf_text}")
+        if not sections:
+            return scraped_text
+        logger.info(f"PDFテキストを追加: {len(sections)}件")
+        return "\n\n".join([scraped_text, *sections])
+
+    async def _save_snapshot(self, fetch_result: FetchResult) -> dict:
+        """取得した生データをスナップショットとして保存（失敗してもパイプラインは継続）"""
+        if self.snapshot_store is None or not fetch_result.raw_content:
+            return {}
+        try:
+            snapshot_hash = await asyncio.to_thread(
+                self.snapshot_store.put, fetch_result.raw_content, fetch_result.raw_hash or None
+            )
+        except OSError as e:
+            logger.warning(f"スナップショット保存失敗: {fetch_result.url} - {e}")
+            return {}
+        return {
+            "snapshot_hash": snapshot_hash,
+            "snapshot_url": fetch_result.url,
+            "snapshot_size": len(fetch_result.raw_content),
+        }
 
     async def _analyze_with_ai(
         self, source_data: ModelDataSingle, scraped_text: str, ai_model: str | None
     ) -> tuple[LlmConfig, TrailConditionSchemaList, LlmStats]:
         """AI解析処理"""
+        prompt_filename = self._get_prompt_filename_from_data(source_data)
+        config = self._load_llm_config(source_data, scraped_text, ai_model)
+
+        # 異常に大きなページで実行全体の時間・料金を使い切らないよう、情報源ごとの入力に上限を設ける
+        max_source_tokens = getattr(settings, "LLM_MAX_INPUT_TOKENS_PER_SOURCE", 0)
+        estimated_tokens = estimate_tokens(scraped_text, config.model)
+        if max_source_tokens and estimated_tokens > max_source_tokens:
+            logger.warning(
+                f"入力が上限を超えるため末尾を切り捨てます: ID {source_data['id']} {prompt_filename} "
+                f"（推定{estimated_tokens}トークン / 上限{max_source_tokens}トークン）"
+            )
+            scraped_text = truncate_to_tokens(scraped_text, max_source_tokens, config.model)
+            config = config.model_copy(update={"data": scraped_text})
+
+        max_tokens = getattr(settings, "LLM_CHUNK_MAX_TOKENS", 8000)
+        chunks = []
+        if getattr(settings, "LLM_CHUNK_ENABLED", False):
+            chunks = split_into_chunks(scraped_text, max_tokens, config.model)
+        if len(chunks) <= 1:
+            ai_result, llm_stats = await self._generate(config)
+            return config, ai_result, llm_stats
+
+        # 大きなページはチャンクごとに並行して解析し、結果を結合
+        logger.info(f"チャンク分割: {prompt_filename} - {len(chunks)}件（上限{max_tokens}トークン）")
+        results = await asyncio.gather(
+            *(self._generate(config.model_copy(update={"data": chunk})) for chunk in chunks)
+        )
+        ai_result = merge_results([result for result, _ in results])
+        # トークン統計・料金は実際にAPIを呼んだチャンク分のみ（全チャンクがキャッシュヒットなら料金0）
+        llm_stats = LlmStats.combine([stats for _, stats in results])
+
+        return config, ai_result, llm_stats
+
+    async def _generate(self, config: LlmConfig) -> tuple[TrailConditionSchemaList, LlmStats]:
+        """1回分のLLM呼び出し（応答キャッシュがあれば再利用。ヘッジ有効時は遅い場合に副モデルにも送る）"""
         import time
 
-        prompt_filename = self._get_prompt_filename_from_data(source_data)
+        cached = await asyncio.to_thread(self.llm_cache.get, config) if self.llm_cache is not None else None
+        if cached is not None:
+            ai_result, token_stats = cached
+            llm_stats = LlmStats(token_stats)
+            llm_stats.execution_time = 0.0
+            llm_stats.cache_hit = True
+            return ai_result, llm_stats
 
+        delay = self.hedge_policy.delay_for(config.model) if self.hedge_policy is not None else None
+        if delay is None:
+            outcome = HedgeOutcome(result=await self._call_llm(config))
+        else:
+            secondary_config = config.model_copy(update={"model": self.hedge_policy.secondary_for(config.model)})
+            start_time = time.time()
+            outcome = await race_with_hedge(
+                lambda: self._call_llm(config), lambda: self._call_llm(secondary_config), delay
+            )
+            hedge_time = time.time() - start_time
+        winner_config, ai_result, token_stats, ai_client, execution_time = outcome.result
+
+        # 副モデルの応答を採用した場合も、次回の検索に使う要求時の設定（主モデル）で保存する
+        if self.llm_cache is not None:
+            try:
+                await asyncio.to_thread(self.llm_cache.put, config, ai_result, token_stats)
+            except OSError as e:
+                logger.warning(f"LLMキャッシュ保存失敗: {config.prompt_filename} - {e}")
+
+        # LlmStatsでラップして実行時間を追加
+        llm_stats = LlmStats(token_stats)
+        llm_stats.execution_time = execution_time
+        llm_stats.queue_time = ai_client.queue_time  # レート制限による順番待ち
+        llm_stats.first_record_time = ai_client.first_record_time  # ストリーミング時のみ
+
+        if outcome.hedged:
+            # 採用しなかった側の料金（キャンセルした場合は送信済みの入力分を見積もる）
+            loser_config = config if outcome.secondary_won else secondary_config
+            if outcome.loser_result is not None:
+                extra_cost = outcome.loser_result[2].total_fee
+                cost_label = "追加コスト"
+            else:
+                extra_cost = estimate_input_cost(loser_config)
+                cost_label = "追加コスト（入力分の推定値）"
+                self.budget.charge(extra_cost)
+            llm_stats.execution_time = hedge_time  # 主リクエストの送信から応答採用までの時間
+            llm_stats.hedged = True
+            llm_stats.hedge_won = outcome.secondary_won
+            llm_stats.hedge_extra_cost = extra_cost
+            logger.info(
+                f"ヘッジ: {winner_config.model}の応答を採用（{config.prompt_filename}）- {cost_label}: ${extra_cost:.4f}"
+            )
+
+        return ai_result, llm_stats
+
+    async def _call_llm(
+        self, config: LlmConfig
+    ) -> tuple[LlmConfig, TrailConditionSchemaList, TokenStats, ConversationalAi, float]:
+        """
+        LLMを1回呼び出す（予算に達する場合はBudgetExceededErrorで送信しない）
+
+        Returns:
+            tuple: (呼び出した設定, 検証済みデータ, トークン統計, AIクライアント, 実行時間)
+        """
+        import time
+
+        reservation = self.budget.reserve(config)
+        token_stats = None
         try:
-            config = LlmConfig.from_file(prompt_filename, data=scraped_text, model=ai_model)
+            ai_client = self.llm_client_factory(config)
+
+            # 実行時間測定
+            start_time = time.time()
+            ai_result, token_stats = await ai_client.generate()
+            execution_time = time.time() - start_time
+        finally:
+            self.budget.settle(reservation, token_stats)
+        return config, ai_result, token_stats, ai_client, execution_time
+
+    def _load_llm_config(self, source_data: ModelDataSingle, scraped_text: str, ai_model: str | None) -> LlmConfig:
+        prompt_filename = self._get_prompt_filename_from_data(source_data)
+        try:
+            return LlmConfig.from_file(prompt_filename, data=scraped_text, model=ai_model)
         except FileNotFoundError:
             logger.error(f"プロンプトファイルが見つかりません: {prompt_filename}")
             raise ValueError(f"プロンプトファイルが見つかりません: {prompt_filename}")
 
-        # AIクライアントの選択
+    @staticmethod
+    def _create_ai_client(config: LlmConfig) -> ConversationalAi:
+        """モデル名からAIクライアントを選択"""
         if config.model.startswith("deepseek"):
-            ai_client = DeepseekClient(config)
+            return DeepseekClient(config)
         elif config.model.startswith("gemini"):
-            ai_client = GeminiClient(config)
+            return GeminiClient(config)
         else:
-            raise ValueError(f"サポートされていないモデル: {ai_model}")
-
-        # 実行時間測定
-        start_time = time.time()
-        ai_result, token_stats = await ai_client.generate()
-        execution_time = time.time() - start_time
-
-        # LlmStatsでラップして実行時間を追加
-        llm_stats = LlmStats(token_stats)
-        llm_stats.execution_time = execution_time
-
-        return config, ai_result, llm_stats
+            raise ValueError(f"サポートされていないモデル: {config.model}")
 
     def _get_prompt_filename_from_data(self, source_data: ModelDataSingle) -> str:
         """ソースデータからプロンプトファイル名を取得"""
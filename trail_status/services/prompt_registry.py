@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from pydantic import BaseModel, TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_FILENAME = "template.yaml"
+
+
+def get_prompts_dir() -> Path:
+    """promptsディレクトリのパスを取得"""
+    return settings.BASE_DIR / "trail_status" / "services" / "prompts"
+
+
+@dataclass(frozen=True)
+class PromptBundle:
+    """1つのプロンプトファイルを解析した結果"""
+
+    filename: str
+    digest: str  # ファイル内容のSHA256
+    prompt: str | None  # prompt: セクション
+    config: dict = field(default_factory=dict)  # config: セクション
+    extraction: dict = field(default_factory=dict)  # extraction: セクション
+
+    def require_prompt(self) -> str:
+        if self.prompt is None:
+            raise ValueError(f"プロンプトが設定されていません: {self.filename}")
+        return self.prompt
+
+
+class PromptRegistry:
+    """
+    プロンプトファイルの解析結果と出力スキーマをプロセス全体で共有する
+
+    ファイルは初回に1回だけ読み込んでYAMLを解析し、以降は更新日時・サイズが変わった場合のみ読み直す
+    （内容のハッシュが同じなら解析し直さない）。抽出処理のスレッドからも呼ばれるためロックで保護する。
+    """
+
+    def __init__(self, prompts_dir: Path | None = None):
+        self._prompts_dir = prompts_dir
+        self._bundles: dict[Path, tuple[tuple[int, int], PromptBundle]] = {}
+        self._lock = threading.Lock()
+        self._schema_statements: dict[type[BaseModel], str] = {}
+        self._json_schemas: dict[type[BaseModel], dict] = {}
+        self._adapters: dict[type[BaseModel], TypeAdapter] = {}
+
+    @property
+    def prompts_dir(self) -> Path:
+        return self._prompts_dir or get_prompts_dir()
+
+    def get(self, filename: str) -> PromptBundle:
+        """
+        プロンプトファイルの解析結果を取得
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+        """
+        path = self.prompts_dir / filename
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"プロンプトファイルが見つかりません: {path}") from None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._bundles.get(path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if cached is not None and cached[1].digest == digest:
+                bundle = cached[1]
+            else:
+                bundle = self._parse(filename, raw, digest)
+                logger.debug(f"プロンプトファイルを読み込み: {filename}")
+            self._bundles[path] = (signature, bundle)
+            return bundle
+
+    @staticmethod
+    def _parse(filename: str, raw: bytes, digest: str) -> PromptBundle:
+        data = yaml.safe_load(raw.decode("utf-8")) or {}
+        if not isinstance(data, dict):
+            raise ValueError(f"プロンプトファイルの形式が不正です: {filename}")
+        return PromptBundle(
+            filename=filename,
+            digest=digest,
+            prompt=data.get("prompt"),
+            config=data.get("config") or {},
+            extraction=data.get("extraction") or {},
+        )
+
+    def template(self) -> str:
+        """全情報源で共通のテンプレート（template.yaml）"""
+        return self.get(TEMPLATE_FILENAME).require_prompt()
+
+    def json_schema(self, schema: type[BaseModel]) -> dict:
+        """出力スキーマのJSON Schema（生成済みのものを再利用。呼び出し側で変更しないこと）"""
+        if schema not in self._json_schemas:
+            self._json_schemas[schema] = schema.model_json_schema()
+        return self._json_schemas[schema]
+
+    def schema_statement(self, schema: type[BaseModel]) -> str:
+        """出力スキーマをプロンプトに埋め込む指示文"""
+        if schema not in self._schema_statements:
+            self._schema_statements[schema] = (
+                f"【重要】次の行から示す要請はこのPydanticモデルに合うJSONで出力してください: {self.json_schema(schema)}\n"
+            )
+        return self._schema_statements[schema]
+
+    def adapter(self, schema: type[BaseModel]) -> TypeAdapter:
+        """出力の検証に使うTypeAdapter（検証器の構築を1回にする）"""
+        if schema not in self._adapters:
+            self._adapters[schema] = TypeAdapter(schema)
+        return self._adapters[schema]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bundles.clear()
+
+
+# プロセス全体で共有するレジストリ
+prompt_registry = PromptRegistry()
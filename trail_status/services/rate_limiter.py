@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# プロバイダ・モデルごとの上限（キーはモデル名の接頭辞。最も長く一致するものを使う）
+DEFAULT_LLM_RATE_LIMITS = {
+    "deepseek": {"rpm": 60, "tpm": 1_000_000, "concurrency": 10},
+    "gemini": {"rpm": 60, "tpm": 1_000_000, "concurrency": 10},
+}
+
+
+class TokenBucket:
+    """一定速度で補充されるトークンバケット（容量 = 1分あたりの上限）"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60  # 1秒あたりの補充量
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """amountを消費できるまでの待ち時間（秒）。容量を超える要求は満タンになれば通す"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class LlmRateLimiter:
+    """
+    プロバイダ・モデル単位のLLM呼び出しの流量制御
+
+    1分あたりのリクエスト数（rpm）・トークン数（tpm）と同時実行数を超える呼び出しは、失敗させずに順番待ちさせる。
+    429を受けた場合はRetry-Afterの間、全ての呼び出しを止める。
+    """
+
+    def __init__(self, rpm: float, tpm: float, concurrency: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = asyncio.Semaphore(concurrency)
+        self.paused_until = 0.0  # time.monotonic()基準
+
+    async def acquire(self, estimated_tokens: int) -> float:
+        """
+        呼び出し枠を確保（release()で同時実行枠を返すこと）
+
+        Args:
+            estimated_tokens: 送信前に見積もったトークン数
+
+        Returns:
+            float: 順番待ちした時間（秒）
+        """
+        start = time.monotonic()
+        await self.concurrency.acquire()
+        try:
+            while True:
+                wait = max(
+                    self.paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(estimated_tokens),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        return time.monotonic() - start
+
+    def release(self) -> None:
+        self.concurrency.release()
+
+    def pause(self, seconds: float) -> None:
+        """レート制限を受けたため、指定秒数は新しい呼び出しを開始しない"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(error: Exception) -> float | None:
+    """例外に含まれるHTTPレスポンスのRetry-Afterヘッダー（秒数またはHTTP日付）を秒数で取得"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """429（レート制限）のエラーか（openaiはstatus_code、google-genaiはcodeに格納）"""
+    return 429 in (getattr(error, "status_code", None), getattr(error, "code", None))
+
+
+class LlmRateLimiterRegistry:
+    """
+    LLM_RATE_LIMITSのキー（プロバイダまたはモデル）単位で流量制御を共有する
+
+    例: "deepseek"のみ設定されていれば、deepseek-chatとdeepseek-reasonerは同じ上限を共有する。
+    asyncioの同期プリミティブはイベントループに紐付くため、ループごとに作り直す。
+    """
+
+    def __init__(self):
+        self._limiters: dict[str, tuple[asyncio.AbstractEventLoop, LlmRateLimiter]] = {}
+
+    @staticmethod
+    def limits_for(model: str) -> tuple[str, dict]:
+        """モデル名に最も長く一致する設定（キー, 上限）"""
+        limits = getattr(settings, "LLM_RATE_LIMITS", DEFAULT_LLM_RATE_LIMITS)
+        matches = [prefix for prefix in limits if model.startswith(prefix)]
+        if not matches:
+            raise ValueError(f"レート制限が設定されていないモデル: {model}")
+        key = max(matches, key=len)
+        return key, limits[key]
+
+    def get(self, model: str) -> LlmRateLimiter:
+        loop = asyncio.get_running_loop()
+        key, limits = self.limits_for(model)
+        entry = self._limiters.get(key)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, LlmRateLimiter(limits["rpm"], limits["tpm"], limits["concurrency"]))
+            self._limiters[key] = entry
+        return entry[1]
+
+
+# プロセス全体で共有するレジストリ
+llm_rate_limiters = LlmRateLimiterRegistry()
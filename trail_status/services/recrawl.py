@@ -0,0 +1,101 @@
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecrawlPolicy:
+    """変更頻度から次回の取得時刻を決める方針"""
+
+    min_interval: float = 60 * 60  # 最短の取得間隔（秒）
+    max_interval: float = 7 * 24 * 60 * 60  # 最長の取得間隔（秒）
+    history_limit: int = 50  # これを超えたら統計を半分に減衰させ、最近の傾向を重視する
+    max_growth: float = 2.0  # 1回の取得で延ばせる間隔の上限（これまでの平均取得間隔に対する倍率）
+
+    @classmethod
+    def from_settings(cls) -> "RecrawlPolicy":
+        return cls(
+            min_interval=getattr(settings, "RECRAWL_MIN_INTERVAL", cls.min_interval),
+            max_interval=getattr(settings, "RECRAWL_MAX_INTERVAL", cls.max_interval),
+            history_limit=getattr(settings, "RECRAWL_HISTORY_LIMIT", cls.history_limit),
+            max_growth=getattr(settings, "RECRAWL_MAX_GROWTH", cls.max_growth),
+        )
+
+
+def estimate_change_rate(check_count: float, change_count: float, observed_seconds: float) -> float | None:
+    """
+    観測した取得・変更回数からページの変更頻度（回/秒）を推定
+
+    一定間隔で取得したときに「前回から変更あり」となった回数をもとに、ポアソン過程の変更率を推定する
+    （取得間に複数回変更されても1回としか観測できないことを補正する推定量）。
+
+    Returns:
+        float | None: 変更率（観測が無い場合はNone）
+    """
+    if check_count <= 0 or observed_seconds <= 0:
+        return None
+    change_count = min(change_count, check_count)
+    check_interval = observed_seconds / check_count
+    return -math.log((check_count - change_count + 0.5) / (check_count + 0.5)) / check_interval
+
+
+def next_interval(
+    check_count: float, change_count: float, observed_seconds: float, policy: RecrawlPolicy
+) -> timedelta:
+    """
+    次回取得までの間隔（平均変更間隔を最短・最長の範囲に収める。観測が無ければ最短）
+
+    変更が観測されていない間は推定変更率が0になるため、間隔はこれまでの平均取得間隔の
+    max_growth倍までしか延ばさない（1回変更が無かっただけで最長の間隔にならないようにする）。
+    """
+    rate = estimate_change_rate(check_count, change_count, observed_seconds)
+    if rate is None:
+        return timedelta(seconds=policy.min_interval)
+    seconds = 1 / rate if rate > 0 else policy.max_interval
+    seconds = min(seconds, observed_seconds / check_count * policy.max_growth)
+    return timedelta(seconds=min(max(seconds, policy.min_interval), policy.max_interval))
+
+
+@dataclass
+class RecrawlState:
+    """情報源ごとの変更統計と次回取得時刻（DataSourceの各フィールドに対応）"""
+
+    check_count: float
+    change_count: float
+    stats_since: datetime | None
+    next_due_at: datetime | None = None
+
+    def record(self, changed: bool, now: datetime, policy: RecrawlPolicy) -> "RecrawlState":
+        """
+        今回の取得結果を統計に加え、次回取得時刻を更新した新しい状態を返す
+
+        Args:
+            changed: 前回の取得から内容が変わっていたか
+            now: 今回の取得時刻
+        """
+        if self.stats_since is None:
+            # 初回の取得は比較対象が無いため、観測の起点とするだけ
+            return RecrawlState(0, 0, now, now + next_interval(0, 0, 0, policy))
+
+        stats_since = self.stats_since
+        check_count = self.check_count + 1
+        change_count = self.change_count + (1 if changed else 0)
+        observed = (now - stats_since).total_seconds()
+
+        if check_count > policy.history_limit:
+            # 統計を半分に減衰（観測期間も半分にして変更率を保ったまま古い履歴の重みを下げる）
+            check_count /= 2
+            change_count /= 2
+            observed /= 2
+            stats_since = now - timedelta(seconds=observed)
+
+        interval = next_interval(check_count, change_count, observed, policy)
+        logger.debug(
+            f"次回取得まで{interval} (取得: {check_count:.1f}回, 変更: {change_count:.1f}回, 観測: {observed:.0f}秒)"
+        )
+        return RecrawlState(check_count, change_count, stats_since, now + interval)
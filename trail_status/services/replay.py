@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import time
+from pathlib import Path
+
+import httpx
+from trafilatura.utils import decode_file
+
+from .executor import ExtractionExecutor
+from .extraction import ExtractionProfile
+from .fetcher import DataFetcher, FetchResult, extract_and_hash
+from .llm_client import ConversationalAi, LlmConfig
+from .llm_stats import TokenStats
+from .schema import TrailConditionSchemaList
+from .token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+EMPTY_RESPONSE = '{"trail_condition_records": []}'
+
+
+def load_snapshot_dir(snapshot_dir: Path) -> dict[int, dict[str, bytes]]:
+    """
+    スナップショットディレクトリを読み込み
+
+    ファイル名は {source_id}.html（URL①）または {source_id}_2.html（URL②）。.gz圧縮も可（例: 1.html, 002_2.html.gz）
+
+    Returns:
+        dict[int, dict[str, bytes]]: ソースID → {"url1"/"url2": 生データ}
+    """
+    pages: dict[int, dict[str, bytes]] = {}
+    for path in sorted(Path(snapshot_dir).iterdir()):
+        name = path.name
+        if name.endswith(".html.gz"):
+            raw = gzip.decompress(path.read_bytes())
+        elif name.endswith(".html"):
+            raw = path.read_bytes()
+        else:
+            continue
+        stem, _, page_no = name.split(".", 1)[0].partition("_")
+        if not stem.isdigit() or page_no not in ("", "1", "2"):
+            logger.warning(f"ソースIDとして解釈できないファイルをスキップ: {path}")
+            continue
+        slot = "url2" if page_no == "2" else "url1"
+        pages.setdefault(int(stem), {})[slot] = raw
+    return pages
+
+
+class ReplayFetcher(DataFetcher):
+    """保存済みスナップショットを返すfetcher（ネットワークアクセスなし）"""
+
+    def __init__(self, pages: dict[str, bytes], executor: ExtractionExecutor | None = None):
+        """
+        Args:
+            pages: URL → 生データ
+        """
+        super().__init__(executor=executor)
+        self.pages = pages
+
+    async def fetch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        raw_hash: str | None = None,
+        profile: ExtractionProfile | None = None,
+    ) -> FetchResult:
+        """検証子・前回ハッシュは無視し、常に抽出まで行う（ベンチマーク・再現用）"""
+        if url not in self.pages:
+            raise FileNotFoundError(f"リプレイ用スナップショットがありません: {url}")
+
+        raw_content = self.pages[url]
+        html = decode_file(raw_content)
+
+        start_time = time.perf_counter()
+        text, content_hash = await self.executor.run(extract_and_hash, html, url, profile)
+        extract_time = time.perf_counter() - start_time
+
+        return FetchResult(
+            url=url,
+            raw_content=raw_content,
+            html=html,
+            text=text,
+            content_hash=content_hash,
+            fetch_time=0.0,
+            extract_time=extract_time,
+            raw_hash=hashlib.sha256(raw_content).hexdigest(),
+        )
+
+
+class ReplayLlmClient(ConversationalAi):
+    """
+    APIを呼ばないローカルのLLM代替（リプレイ・ベンチマーク用）
+
+    固定のJSON応答（省略時は空リスト）を指定した遅延の後に返す。
+    """
+
+    def __init__(self, config: LlmConfig, response_text: str | None = None, latency: float = 0.0):
+        # APIキーは不要なため、環境変数からの取得を省略する
+        super().__init__(config, api_key="")
+        self.response_text = response_text or EMPTY_RESPONSE
+        self.latency = latency
+
+    @classmethod
+    def factory(cls, fixture_path: str | None = None, latency: float = 0.0):
+        """パイプラインのllm_client_factoryとして渡す生成関数"""
+        response_text = Path(fixture_path).read_text(encoding="utf-8") if fixture_path else None
+        return lambda config: cls(config, response_text=response_text, latency=latency)
+
+    async def generate(self) -> tuple[TrailConditionSchemaList, TokenStats]:
+        logger.info(f"{self.model}（ローカル代替）の応答を返します。")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        validated_data = self._config.response_schema.model_validate_json(self.response_text)
+
+        input_text = self.prompt + self.data
+        stats = TokenStats(
+            estimate_tokens(input_text, self.model),  # 実APIと同じ見積もりでトークン数の目安とする
+            0,
+            estimate_tokens(self.response_text, self.model),
+            len(input_text),
+            len(self.response_text),
+            self.model,
+        )
+        return validated_data, stats
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerStats:
+    """取得スケジューラのメトリクス（待ち行列の深さ・待ち時間）"""
+
+    def __init__(self):
+        self.request_count: int = 0
+        self.queue_depth: int = 0
+        self.max_queue_depth: int = 0
+        self.total_wait_time: float = 0.0
+        self.max_wait_time: float = 0.0
+        self.host_wait_time: dict[str, float] = {}
+
+    @property
+    def average_wait_time(self) -> float:
+        return self.total_wait_time / self.request_count if self.request_count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "request_count": self.request_count,
+            "max_queue_depth": self.max_queue_depth,
+            "total_wait_time": self.total_wait_time,
+            "average_wait_time": self.average_wait_time,
+            "max_wait_time": self.max_wait_time,
+            "host_wait_time": dict(self.host_wait_time),
+        }
+
+    def __repr__(self):
+        return (
+            f"SchedulerStats(requests={self.request_count}, max_queue_depth={self.max_queue_depth}, "
+            f"avg_wait={self.average_wait_time:.2f}s, max_wait={self.max_wait_time:.2f}s)"
+        )
+
+
+class _HostState:
+    """ホスト単位の同時接続数とリクエスト間隔の管理"""
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.next_allowed_at: float = 0.0
+        self.crawl_delay: float | None = None
+        self.robots_checked: bool = False
+
+
+class PolitenessScheduler:
+    """
+    全体の同時実行数上限とホスト単位の接続数・リクエスト間隔を守る取得スケジューラ
+
+    使用例:
+        async with scheduler.slot(url, client):
+            response = await client.get(url)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        per_host_concurrency: int = 2,
+        per_host_interval: float = 1.0,
+        respect_crawl_delay: bool = True,
+        user_agent: str = "*",
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_interval = per_host_interval
+        self.respect_crawl_delay = respect_crawl_delay
+        self.user_agent = user_agent
+        self.stats = SchedulerStats()
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._hosts: dict[str, _HostState] = {}
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "PolitenessScheduler":
+        """Django設定から生成（引数で上書き可能、Noneは設定値を使用）"""
+        kwargs = {
+            "max_concurrency": getattr(settings, "FETCH_MAX_CONCURRENCY", 10),
+            "per_host_concurrency": getattr(settings, "FETCH_PER_HOST_CONCURRENCY", 2),
+            "per_host_interval": getattr(settings, "FETCH_PER_HOST_INTERVAL", 1.0),
+            "respect_crawl_delay": getattr(settings, "FETCH_RESPECT_CRAWL_DELAY", True),
+        }
+        kwargs.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**kwargs)
+
+    @asynccontextmanager
+    async def slot(self, url: str, client: httpx.AsyncClient | None = None):
+        """
+        URLのホストに対する取得枠を確保する（待ち時間をメトリクスに記録）
+
+        Args:
+            url: 取得対象URL
+            client: Crawl-delay取得（robots.txt）に使うクライアント
+        """
+        parts = urlsplit(url)
+        host = parts.netloc
+        state = self._hosts.setdefault(host, _HostState(self.per_host_concurrency))
+
+        self.stats.queue_depth += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.stats.queue_depth)
+        start_time = time.perf_counter()
+        queued = True
+        try:
+            # ホスト枠 → リクエスト間隔 → 全体枠の順に確保（1ホストの待機で全体枠を占有しない）
+            async with state.semaphore:
+                if self.respect_crawl_delay and client is not None:
+                    await self._load_crawl_delay(state, f"{parts.scheme}://{host}", client)
+                await self._wait_for_interval(state)
+                async with self._global:
+                    self.stats.queue_depth -= 1
+                    queued = False
+                    self._record_wait(host, time.perf_counter() - start_time)
+                    yield
+        finally:
+            # 枠の確保前にキャンセル・例外となった場合も待ち行列から外す
+            if queued:
+                self.stats.queue_depth -= 1
+
+    def _record_wait(self, host: str, wait_time: float) -> None:
+        self.stats.request_count += 1
+        self.stats.total_wait_time += wait_time
+        self.stats.max_wait_time = max(self.stats.max_wait_time, wait_time)
+        self.stats.host_wait_time[host] = self.stats.host_wait_time.get(host, 0.0) + wait_time
+        if wait_time >= 1.0:
+            logger.debug(f"取得待ち: {host} ({wait_time:.2f}秒, 待ち行列: {self.stats.queue_depth})")
+
+    async def _wait_for_interval(self, state: _HostState) -> None:
+        """同一ホストへのリクエスト開始間隔を確保"""
+        interval = max(self.per_host_interval, state.crawl_delay or 0.0)
+        async with state.lock:
+            now = time.monotonic()
+            wait = max(0.0, state.next_allowed_at - now)
+            state.next_allowed_at = max(now, state.next_allowed_at) + interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _load_crawl_delay(self, state: _HostState, base_url: str, client: httpx.AsyncClient) -> None:
+        """robots.txtのCrawl-delayをホストごとに1回だけ取得"""
+        async with state.lock:
+            if state.robots_checked:
+                return
+            state.robots_checked = True
+            try:
+                # robots.txtの取得も全体の同時実行数に含める
+                async with self._global:
+                    response = await client.get(f"{base_url}/robots.txt")
+                if response.status_code != httpx.codes.OK:
+                    return
+                parser = RobotFileParser()
+                parser.parse(response.text.splitlines())
+                delay = parser.crawl_delay(self.user_agent)
+                if delay:
+                    state.crawl_delay = float(delay)
+                    logger.info(f"Crawl-delayを適用: {base_url} ({state.crawl_delay}秒)")
+            except Exception as e:
+                logger.debug(f"robots.txtの取得に失敗（Crawl-delayなしで続行）: {base_url} - {e}")
@@ -44,3 +44,13 @@ class TrailConditionSchemaInternal(TrailConditionSchemaAi):
 
 class TrailConditionSchemaList(BaseModel):
     trail_condition_records: list[TrailConditionSchemaAi] = Field(description="登山道状況のリスト")
+
+
+class TrailConditionSchemaBatchAi(TrailConditionSchemaAi):
+    source_id: int = Field(description="このレコードを抽出したセクションの情報源ID（見出しの番号）")
+
+
+class TrailConditionSchemaBatchList(BaseModel):
+    """複数の情報源をまとめて1回で解析する場合の出力（レコードごとに情報源IDを持つ）"""
+
+    trail_condition_records: list[TrailConditionSchemaBatchAi] = Field(description="登山道状況のリスト")
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_snapshot_dir() -> Path:
+    """スナップショット保存ディレクトリのパスを取得"""
+    return Path(getattr(settings, "SNAPSHOT_DIR", settings.BASE_DIR / "snapshots"))
+
+
+class SnapshotStore:
+    """
+    取得したページ生データのコンテンツアドレス型ストア
+
+    SHA256ハッシュをキーにgzip圧縮して保存する（同一内容は1回だけ保存）。
+    保存先: {base_dir}/{hash[:2]}/{hash}.gz
+    """
+
+    SUFFIX = ".gz"
+
+    def __init__(self, base_dir: Path | None = None):
+        self.base_dir = Path(base_dir) if base_dir else get_snapshot_dir()
+
+    @staticmethod
+    def hash_content(raw_content: bytes) -> str:
+        return hashlib.sha256(raw_content).hexdigest()
+
+    def path_for(self, content_hash: str) -> Path:
+        return self.base_dir / content_hash[:2] / f"{content_hash}{self.SUFFIX}"
+
+    def exists(self, content_hash: str) -> bool:
+        return self.path_for(content_hash).exists()
+
+    def put(self, raw_content: bytes, content_hash: str | None = None) -> str:
+        """
+        生データを保存（既に同じハッシュがあれば書き込まない）
+
+        Args:
+            raw_content: レスポンス生バイト列
+            content_hash: 計算済みのSHA256（省略時は計算）
+
+        Returns:
+            str: 保存キー（SHA256）
+        """
+        content_hash = content_hash or self.hash_content(raw_content)
+        path = self.path_for(content_hash)
+        if path.exists():
+            # 更新時刻だけ進める（GCで保持期間内として扱われるように）
+            path.touch()
+            logger.debug(f"スナップショット保存済み: {content_hash[:8]}...")
+            return content_hash
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 一時ファイルに書いてからリネーム（並行書き込みでも壊れたファイルを残さない）
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(raw_content))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        logger.debug(f"スナップショット保存: {content_hash[:8]}... ({len(raw_content)} bytes)")
+        return content_hash
+
+    def get(self, content_hash: str) -> bytes:
+        """
+        生データを読み込み
+
+        Raises:
+            FileNotFoundError: スナップショットが存在しない場合
+        """
+        path = self.path_for(content_hash)
+        if not path.exists():
+            raise FileNotFoundError(f"スナップショットが見つかりません: {content_hash}")
+        return gzip.decompress(path.read_bytes())
+
+    def delete(self, content_hash: str) -> bool:
+        path = self.path_for(content_hash)
+        if path.exists():
+            path.unlink()
+            return True
+        return False
+
+    def iter_hashes(self):
+        """保存済みの全ハッシュを列挙"""
+        if not self.base_dir.exists():
+            return
+        for path in self.base_dir.glob(f"*/*{self.SUFFIX}"):
+            yield path.name.removesuffix(self.SUFFIX)
+
+    def size_of(self, content_hash: str) -> int:
+        """圧縮後のファイルサイズ"""
+        path = self.path_for(content_hash)
+        return path.stat().st_size if path.exists() else 0
+
+    def modified_at(self, content_hash: str) -> float:
+        """最終更新時刻（UNIX時間）"""
+        path = self.path_for(content_hash)
+        return path.stat().st_mtime if path.exists() else 0.0
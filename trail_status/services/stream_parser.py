@@ -0,0 +1,135 @@
+import json
+import logging
+from collections.abc import Callable
+
+from .schema import TrailConditionSchemaAi
+
+logger = logging.getLogger(__name__)
+
+RECORDS_KEY = "trail_condition_records"
+
+
+class StreamStructureError(ValueError):
+    """ストリーミング応答のJSON構造が崩れており、続きを受信しても回復できない"""
+
+
+class RecordStreamParser:
+    """
+    ストリーミング応答からtrail_condition_recordsの要素を受信途中で1件ずつ取り出して検証する
+
+    配列の要素（オブジェクト）が閉じた時点でrecord_schema（TrailConditionSchemaAi等）として検証し、on_recordに渡す。
+    構造の崩れ（先頭が"{"でない、配列の要素がオブジェクトでない等）はStreamStructureError、
+    レコードの検証失敗はpydanticのValidationErrorをその場で送出し、残りの受信を待たずに打ち切れるようにする。
+    応答全体の検証は受信完了後に従来どおりTrailConditionSchemaListで行う。
+    """
+
+    def __init__(
+        self,
+        on_record: Callable[[TrailConditionSchemaAi], None] | None = None,
+        record_schema: type[TrailConditionSchemaAi] = TrailConditionSchemaAi,
+    ):
+        self.on_record = on_record
+        self.record_schema = record_schema
+        self.text = ""  # 受信済みのテキスト全体
+        self.records: list[TrailConditionSchemaAi] = []
+        self._pos = 0  # 走査済みの位置
+        self._state = "start"  # start / before_array / in_array / done
+        self._record_start: int | None = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key: str | None = None  # 直前に閉じたトップレベルの文字列（キーの候補）
+        self._awaiting_records = False  # トップレベルの "trail_condition_records": の直後
+
+    def feed(self, chunk: str) -> list[TrailConditionSchemaAi]:
+        """受信したテキストを追加し、新たに完成したレコードを返す"""
+        self.text += chunk
+        completed: list[TrailConditionSchemaAi] = []
+
+        if self._state == "start":
+            stripped = self.text.lstrip()
+            if not stripped:
+                return completed
+            if not stripped.startswith("{"):
+                raise StreamStructureError(f"応答がJSONオブジェクトではありません: {stripped[:50]!r}")
+            self._state = "before_array"
+
+        if self._state == "before_array":
+            self._find_records_array()
+
+        while self._state == "in_array" and self._pos < len(self.text):
+            char = self.text[self._pos]
+            if self._record_start is None:
+                # 要素の間（空白・カンマ）または配列の終わり
+                if char == "{":
+                    self._record_start = self._pos
+                    self._depth = 1
+                elif char == "]":
+                    self._state = "done"
+                elif not (char.isspace() or char == ","):
+                    raise StreamStructureError(f"配列の要素がオブジェクトではありません: {self.text[self._pos:][:50]!r}")
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(self._complete_record(self.text[self._record_start : self._pos + 1]))
+                    self._record_start = None
+            self._pos += 1
+
+        return completed
+
+    def _find_records_array(self) -> None:
+        """
+        トップレベルのオブジェクトのtrail_condition_recordsキーの配列の開始位置まで走査
+
+        文字列・入れ子の状態を追うため、他のキーの値（文字列や入れ子のオブジェクト）に含まれる同名のキーには反応しない。
+        """
+        while self._state == "before_array" and self._pos < len(self.text):
+            char = self.text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._key = json.loads(self.text[self._string_start : self._pos + 1])
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+                self._awaiting_records = False
+            elif char == ":" and self._depth == 1:
+                self._awaiting_records = self._key == RECORDS_KEY
+                self._key = None
+            elif char == "[" and self._awaiting_records:
+                self._state = "in_array"
+                self._depth = 0
+            elif not char.isspace():
+                if char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                self._key = None
+                self._awaiting_records = False
+            self._pos += 1
+
+    def _complete_record(self, record_json: str) -> TrailConditionSchemaAi:
+        # JSONの構文・スキーマの検証に失敗した場合はValidationErrorをそのまま送出（従来の構造化出力失敗と同じ扱い）
+        record = self.record_schema.model_validate_json(record_json)
+        self.records.append(record)
+        logger.debug(f"レコード受信: {record.mountain_name_raw} / {record.trail_name}")
+        if self.on_record is not None:
+            self.on_record(record)
+        return record
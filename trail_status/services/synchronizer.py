@@ -1,22 +1,15 @@
 import logging
-import unicodedata
 
 from trail_status.models.condition import TrailCondition
 from trail_status.models.source import DataSource
 
 from .llm_client import LlmConfig
 from .schema import TrailConditionSchemaInternal
+from .text_utils import normalize_text
 
 logger = logging.getLogger(__name__)
 
 
-def normalize_text(text: str) -> str:
-    """全角半角・空白を揃えて比較の精度を上げる"""
-    if not text:
-        return ""
-    return unicodedata.normalize("NFKC", text).strip().replace(" ", "").replace("　", "")
-
-
 def sync_trail_conditions(
     source: DataSource, ai_data_list: list[TrailConditionSchemaInternal], config: LlmConfig, prompt_filename: str
 ) -> None:
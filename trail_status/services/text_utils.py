@@ -0,0 +1,8 @@
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """全角半角・空白を揃えて比較の精度を上げる"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", text).strip().replace(" ", "").replace("　", "")
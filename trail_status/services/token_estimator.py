@@ -0,0 +1,39 @@
+import math
+
+# 文字種ごとの1文字あたりトークン数の目安（実際の値はモデルのトークナイザにより異なる）
+ASCII_TOKENS_PER_CHAR = 0.25  # 英数字・記号はおよそ4文字で1トークン
+NON_ASCII_TOKENS_PER_CHAR = 1.0  # 日本語は1文字1トークン前後（多めに見積もる）
+
+# モデル系列ごとの目安（ASCII, 非ASCII）。キーはモデル名の接頭辞
+MODEL_FAMILY_TOKENS_PER_CHAR = {
+    "deepseek": (0.3, 0.6),  # DeepSeek公式の目安（英字1文字≒0.3、漢字1文字≒0.6トークン）
+    "gemini": (0.25, 1.0),  # Gemini公式の目安（約4文字で1トークン）。日本語は多めに見積もる
+}
+
+
+def tokens_per_char(model: str | None = None) -> tuple[float, float]:
+    """モデル系列ごとの1文字あたりトークン数（ASCII, 非ASCII）。不明なモデルは多めの既定値"""
+    if model:
+        for prefix, ratios in MODEL_FAMILY_TOKENS_PER_CHAR.items():
+            if model.startswith(prefix):
+                return ratios
+    return ASCII_TOKENS_PER_CHAR, NON_ASCII_TOKENS_PER_CHAR
+
+
+def estimate_tokens(text: str, model: str | None = None) -> int:
+    """
+    送信前にテキストのトークン数を概算（レート制限・予算判定用。APIは呼ばない）
+
+    Args:
+        text: 送信するテキスト
+        model: 送信先のモデル名（省略時はどの系列よりも多めに見積もる）
+
+    Returns:
+        int: 推定トークン数（多めに見積もる）
+    """
+    if not text:
+        return 0
+    ascii_ratio, non_ascii_ratio = tokens_per_char(model)
+    ascii_count = sum(1 for char in text if char.isascii())
+    non_ascii_count = len(text) - ascii_count
+    return math.ceil(ascii_count * ascii_ratio + non_ascii_count * non_ascii_ratio)
@@ -3,7 +3,6 @@ pytest設定とテスト共通フィクスチャ
 """
 
 import pytest
-import os
 from pathlib import Path
 
 # pytest設定
@@ -17,6 +16,73 @@ def mock_api_keys(monkeypatch):
     monkeypatch.setenv('GEMINI_API_KEY', 'test-gemini-key')
 
 
+@pytest.fixture(autouse=True)
+def isolated_llm_cache(settings, tmp_path):
+    """LLM応答キャッシュの保存先をテストごとの一時ディレクトリにする"""
+    settings.LLM_CACHE_DIR = tmp_path / "llm_cache"
+
+
+@pytest.fixture(autouse=True)
+def isolated_artifacts(settings, tmp_path):
+    """デバッグ用の出力の保存先をテストごとの一時ディレクトリにする"""
+    from trail_status.services.artifacts import artifact_writer
+
+    settings.LLM_ARTIFACT_DIR = tmp_path / "outputs"
+    yield
+    artifact_writer.close()
+
+
+@pytest.fixture
+def inline_executor():
+    """イベントループ上で同期実行する抽出処理の実行先"""
+    from trail_status.services.executor import ExtractionExecutor
+
+    return ExtractionExecutor("inline")
+
+
+@pytest.fixture
+def no_wait_scheduler():
+    """ホスト単位の待機・robots.txt取得を行わないスケジューラ"""
+    from trail_status.services.scheduler import PolitenessScheduler
+
+    return PolitenessScheduler(per_host_interval=0, respect_crawl_delay=False)
+
+
+@pytest.fixture
+def replay_pipeline(settings, inline_executor, no_wait_scheduler):
+    """
+    ネットワーク・APIなしで動くパイプラインを作成する
+
+    make(pages, response_text=None, latency=0.0, **kwargs) -> (パイプライン, LLMに渡した設定のリスト)
+    pagesはURL → HTML（Noneの場合は通常のDataFetcherを使う）。latencyはモデルごとに変える場合は
+    LlmConfigを受け取る関数を渡す。その他の引数（llm_client_factoryの差し替えを含む）は
+    TrailConditionPipelineにそのまま渡す。
+    スナップショットは保存しない。LLMキャッシュは無効（使う場合は作成前にsettings.LLM_CACHE_ENABLEDを上書き）。
+    """
+    from trail_status.services.pipeline import TrailConditionPipeline
+    from trail_status.services.replay import ReplayFetcher, ReplayLlmClient
+
+    settings.LLM_CACHE_ENABLED = False
+
+    def make(pages=None, response_text=None, latency=0.0, **kwargs):
+        calls = []
+
+        def llm_client_factory(config):
+            calls.append(config)
+            delay = latency(config) if callable(latency) else latency
+            return ReplayLlmClient(config, response_text=response_text, latency=delay)
+
+        if pages is not None:
+            raw_pages = {url: html.encode("utf-8") if isinstance(html, str) else html for url, html in pages.items()}
+            kwargs.setdefault("fetcher", ReplayFetcher(raw_pages, executor=inline_executor))
+        kwargs.setdefault("llm_client_factory", llm_client_factory)
+        kwargs.setdefault("save_snapshots", False)
+        pipeline = TrailConditionPipeline(scheduler=no_wait_scheduler, executor=inline_executor, **kwargs)
+        return pipeline, calls
+
+    return make
+
+
 @pytest.fixture
 def clean_env(monkeypatch):
     """環境変数をクリア"""
@@ -83,10 +149,3 @@ def django_db_setup():
     """テスト用データベース設定"""
     pass
 
-
-# 非同期テスト用の設定
-@pytest.fixture(scope="session")
-def event_loop_policy():
-    """非同期テスト用のイベントループポリシー"""
-    import asyncio
-    return asyncio.WindowsProactorEventLoopPolicy() if os.name == 'nt' else asyncio.DefaultEventLoopPolicy()
\ No newline at end of file
@@ -12,10 +12,13 @@ django.setup()
 import asyncio
 from pathlib import Path
 
-from trail_status.services.llm_client import DeepseekClient, LlmConfig, get_prompts_dir, get_sample_dir
+from django.conf import settings
+
+from trail_status.services.llm_client import DeepseekClient, LlmConfig
+from trail_status.services.prompt_registry import get_prompts_dir
 
 PROMPT_DIR = get_prompts_dir() / "001_okutama_vc.yaml"
-SAMPLE_DIR = get_sample_dir() / "sample_okutama.txt"
+SAMPLE_DIR = settings.BASE_DIR / "trail_status" / "services" / "sample" / "sample_okutama.txt"
 D_MODEL = "deepseek-reasoner"
 G_MODEL = "gemini-3-flash-preview"
 
@@ -0,0 +1,78 @@
+"""
+デバッグ用の出力の書き込みのテスト
+"""
+
+import threading
+import time
+
+from trail_status.services.artifacts import ArtifactWriter, artifact_label
+
+
+def test_writes_per_run_and_source(tmp_path):
+    """実行ID・情報源ごとのファイル名で、別スレッドで保存するテスト"""
+    writer = ArtifactWriter(tmp_path, enabled=True, sample_rate=1.0)
+    writer.start_run("run1")
+
+    first = writer.write_response("deepseek-chat", artifact_label("001_okutama_vc.yaml"), "{}")
+    second = writer.write_invalid("deepseek-chat", artifact_label(None, [1, 2]), "broken")
+    writer.close()
+
+    assert first == tmp_path / "run1" / "0001_response_deepseek-chat_001_okutama_vc.json"
+    assert second == tmp_path / "run1" / "0002_validation_error_deepseek-chat_batch_1-2.txt"
+    assert (first.read_text(encoding="utf-8"), second.read_text(encoding="utf-8")) == ("{}", "broken")
+    assert writer.stats.written == 2
+
+
+def test_disabled_and_sampled(tmp_path):
+    writer = ArtifactWriter(tmp_path, enabled=True, sample_rate=0.0)
+    assert writer.write_response("deepseek-chat", "001_test", "{}") is None
+    assert writer.stats.sampled_out == 1
+    assert writer.write_invalid("deepseek-chat", "001_test", "broken") is not None  # 検証エラー時は間引かない
+
+    disabled = ArtifactWriter(tmp_path / "disabled", enabled=False)
+    assert disabled.write_invalid("deepseek-chat", "001_test", "broken") is None
+    writer.close()
+    assert not (tmp_path / "disabled").exists()
+
+
+def test_drops_when_queue_is_full(tmp_path, monkeypatch):
+    """書き込みが詰まっている間は呼び出し側を待たせずに破棄するテスト"""
+    writer = ArtifactWriter(tmp_path, enabled=True, sample_rate=1.0, max_pending=1)
+    release = threading.Event()
+    write_text = type(tmp_path).write_text
+
+    def blocked_write_text(self, *args, **kwargs):
+        release.wait()
+        return write_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(tmp_path), "write_text", blocked_write_text)
+
+    results = [writer.write_invalid("deepseek-chat", "001_test", str(i)) for i in range(5)]
+    release.set()
+    writer.close()
+
+    assert results[0] is not None
+    assert writer.stats.dropped >= 3
+    assert writer.stats.written == 5 - writer.stats.dropped
+
+
+def test_close_does_not_hang_when_queue_is_full(tmp_path, monkeypatch):
+    """書き込みが詰まってキューが満杯でも、終了処理はtimeout秒で戻るテスト"""
+    writer = ArtifactWriter(tmp_path, enabled=True, sample_rate=1.0, max_pending=1)
+    release = threading.Event()
+    write_text = type(tmp_path).write_text
+
+    def blocked_write_text(self, *args, **kwargs):
+        release.wait()
+        return write_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(tmp_path), "write_text", blocked_write_text)
+    for i in range(3):
+        writer.write_invalid("deepseek-chat", "001_test", str(i))
+
+    started = time.monotonic()
+    writer.close(timeout=0.1)
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert elapsed < 1.0
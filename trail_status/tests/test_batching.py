@@ -0,0 +1,91 @@
+"""
+小さな情報源のまとめ解析のテスト
+"""
+
+import json
+
+import pytest
+
+from trail_status.services.batching import BatchItem, attribute_stats, plan_batches
+from trail_status.services.llm_client import LlmConfig
+from trail_status.services.llm_stats import LlmStats, TokenStats
+from trail_status.services.token_estimator import estimate_tokens
+
+
+def _record(source_id: int, title: str) -> dict:
+    return {
+        "source_id": source_id,
+        "trail_name": "鴨沢ルート",
+        "mountain_name_raw": "雲取山",
+        "title": title,
+        "status": "CLOSURE",
+        "area": "OKUTAMA",
+    }
+
+
+def test_plan_batches(sample_llm_config):
+    """トークン数・情報源数の上限とモデルごとにグループを分けるテスト"""
+
+    def item(source_id, data, model="deepseek-chat"):
+        config = LlmConfig(**{**sample_llm_config, "data": data, "model": model})
+        return BatchItem({"id": source_id, "name": f"情報源{source_id}"}, config)
+
+    items = [item(1, "あ" * 10), item(2, "い" * 10), item(3, "う" * 500), item(4, "え" * 10, "gemini-2.5-flash")]
+
+    batches = plan_batches(items, max_tokens=100, max_sources=8)
+
+    assert [[i.source_data["id"] for i in batch] for batch in batches] == [[1, 2], [3], [4]]
+    assert len(plan_batches(items[:2], max_tokens=100, max_sources=1)) == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_small_sources(replay_pipeline):
+    """2つの情報源を1回で解析し、情報源IDで結果を振り分け、料金を按分するテスト"""
+    pages = {
+        "https://example.com/a": "<html><body><p>鴨沢ルートで落石が発生しています。</p></body></html>",
+        "https://example.com/b": "<html><body><p>御岳山ロックガーデンで倒木があります。</p></body></html>",
+    }
+    response_text = json.dumps(
+        {"trail_condition_records": [_record(1, "落石"), _record(2, "倒木"), _record(99, "対象外")]},
+        ensure_ascii=False,
+    )
+    pipeline, calls = replay_pipeline(pages, response_text=response_text, batch=True)
+    source_data_list = [
+        {"id": 1, "name": "奥多摩VC", "url1": "https://example.com/a", "prompt_key": "okutama_vc", "content_hash": ""},
+        {"id": 2, "name": "御岳VC", "url1": "https://example.com/b", "prompt_key": "mitake_vc", "content_hash": ""},
+    ]
+
+    results = [result for _, result in await pipeline.process_source_data(source_data_list, "deepseek-chat")]
+
+    assert len(calls) == 1
+    assert calls[0].batch_source_ids == [1, 2]
+    assert "# 情報源ID: 2（御岳VC）" in calls[0].data
+    assert [[r.title for r in result["extracted_trail_conditions"].trail_condition_records] for result in results] == [
+        ["落石"],
+        ["倒木"],
+    ]
+    assert results[1]["config"].prompt_filename == "002_mitake_vc.yaml"
+    assert all(result["stats"].batch_size == 2 for result in results)
+    total_input = sum(result["stats"].token_stats.input_tokens for result in results)
+    assert total_input == pytest.approx(estimate_tokens(calls[0].full_prompt + calls[0].data, calls[0].model), abs=1)
+
+
+def test_attribute_stats_keeps_metrics(sample_llm_config):
+    """按分するのはトークン数・料金のみで、その他のメトリクスは各情報源に引き継ぐテスト"""
+    items = [
+        BatchItem({"id": i, "name": f"情報源{i}"}, LlmConfig(**{**sample_llm_config, "data": "あ" * size}))
+        for i, size in ((1, 100), (2, 300))
+    ]
+    llm_stats = LlmStats(TokenStats(400, 0, 100, 400, 100, "deepseek-chat"))
+    llm_stats.execution_time = 1.5
+    llm_stats.retry_count = 2
+    llm_stats.hedged = True
+    llm_stats.hedge_extra_cost = 0.4
+
+    attributed = attribute_stats(items, llm_stats)
+
+    assert [stats.batch_size for stats in attributed] == [2, 2]
+    assert all((stats.execution_time, stats.retry_count, stats.hedged) == (1.5, 2, True) for stats in attributed)
+    assert sum(stats.token_stats.input_tokens for stats in attributed) == pytest.approx(400, abs=1)
+    assert sum(stats.hedge_extra_cost for stats in attributed) == pytest.approx(0.4)
+    assert llm_stats.batch_size == 1
@@ -0,0 +1,68 @@
+"""
+ブロック単位の変更検知のテスト
+"""
+
+import pytest
+
+from trail_status.services.blocks import diff_blocks, hash_block, render_changed_blocks, split_blocks
+from trail_status.services.fetcher import extract_text, hash_text
+
+PREVIOUS_TEXT = """登山道情報
+更新日 2025/1/1
+| ルート | 状況 |
+|---|---|
+| 鴨沢ルート | 通行可 |
+| 石尾根 | 通行可 |
+その他
+冬季は凍結に注意してください。
+"""
+
+
+def test_diff_blocks_detects_added_and_modified():
+    """追加・変更ブロックのみを検出し、削除・並べ替えは変更とみなさないテスト"""
+    previous_hashes = [hash_block(block) for block in split_blocks(PREVIOUS_TEXT)]
+    text = PREVIOUS_TEXT.replace("2025/1/1", "2025/2/1").replace("| 石尾根 | 通行可 |", "| 石尾根 | 通行止め |")
+
+    diff = diff_blocks(text, previous_hashes)
+
+    assert [diff.blocks[i] for i in diff.changed] == ["更新日 2025/2/1", "| 石尾根 | 通行止め |"]
+    assert diff_blocks("\n".join(reversed(split_blocks(PREVIOUS_TEXT))), previous_hashes).changed == []
+
+
+def test_render_changed_blocks_includes_context():
+    """変更ブロックに直前の行・表のヘッダーを添えて抜き出すテスト"""
+    previous_hashes = [hash_block(block) for block in split_blocks(PREVIOUS_TEXT)]
+    text = PREVIOUS_TEXT.replace("| 石尾根 | 通行可 |", "| 石尾根 | 通行止め |")
+
+    rendered = render_changed_blocks(diff_blocks(text, previous_hashes))
+
+    assert rendered == "| ルート | 状況 |\n|---|---|\n| 鴨沢ルート | 通行可 |\n| 石尾根 | 通行止め |"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_sends_only_changed_blocks(replay_pipeline):
+    """前回のブロックハッシュがある場合、追加されたブロックと前後関係のみをLLMに渡すテスト"""
+    url = "https://example.com/trail"
+    paragraphs = [f"<p>{name}は通行可能です。最新の状況は各管理者へお問い合わせください。</p>" for name in "ABCDEFGH"]
+    old_html = f"<html><body><article><h1>登山道情報</h1>{''.join(paragraphs)}</article></body></html>"
+    new_html = old_html.replace("</article>", "<p>鴨沢ルートは落石のため通行止めです。</p></article>")
+    old_text = extract_text(old_html)
+    pipeline, calls = replay_pipeline({url: new_html})
+    source_data = {
+        "id": 1,
+        "name": "テスト",
+        "url1": url,
+        "prompt_key": "okutama_vc",
+        "content_hash": hash_text(old_text),
+        "block_hashes": [hash_block(block) for block in split_blocks(old_text)],
+    }
+
+    results = await pipeline.process_source_data([source_data], None)
+
+    _, result = results[0]
+    assert result["content_changed"] is True
+    assert result["pages"]["url1"]["changed_blocks"] == 1
+    assert len(calls) == 1
+    assert "鴨沢ルート" in calls[0].data
+    assert "Aは通行可能" not in calls[0].data
+    assert "Hは通行可能" in calls[0].data  # 直前の行
@@ -0,0 +1,82 @@
+"""
+送信前のトークン見積もりと実行全体のLLM予算のテスト
+"""
+
+import pytest
+
+from trail_status.services.budget import BudgetExceededError, RunBudget, estimate_input_cost
+from trail_status.services.chunker import truncate_to_tokens
+from trail_status.services.llm_client import LlmConfig
+from trail_status.services.llm_stats import LlmFee, TokenStats
+from trail_status.services.token_estimator import estimate_tokens
+
+
+def test_estimate_tokens_by_model_family():
+    """モデル系列ごとの目安で見積もり、不明なモデルは多めに見積もるテスト"""
+    text = "鴨沢ルート closed"
+    assert estimate_tokens(text, "deepseek-chat") < estimate_tokens(text, "gemini-2.5-flash")
+    assert estimate_tokens(text, "gemini-2.5-flash") <= estimate_tokens(text)
+
+
+def test_reserve_and_settle(sample_llm_config):
+    """見積もりを確保して上限を判定し、実績で精算するテスト"""
+    config = LlmConfig(**sample_llm_config)
+    estimate = RunBudget.estimate(config)
+    budget = RunBudget(max_input_tokens=estimate.input_tokens * 2 - 1)
+
+    reservation = budget.reserve(config)
+    with pytest.raises(BudgetExceededError):
+        budget.reserve(config)  # 確保中の見積もりと合わせると上限を超える
+
+    budget.settle(reservation, TokenStats(100, 0, 50, 10, 5, config.model))
+    assert budget.spent_input_tokens == 100
+    assert budget.reserved_input_tokens == 0
+    assert budget.rejected == 1
+
+
+def test_truncate_to_tokens_keeps_leading_blocks():
+    text = "\n".join(f"{i}行目: 通行止め" for i in range(100))
+    truncated = truncate_to_tokens(text, 50)
+    assert estimate_tokens(truncated) <= 50
+    assert text.startswith(truncated)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_llm_over_budget(replay_pipeline):
+    """予算を超える情報源はLLMを呼ばずにエラーとして返すテスト"""
+    url = "https://example.com/trail"
+    html = "<html><body><h1>登山道情報</h1><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+    pipeline, calls = replay_pipeline({url: html}, budget=RunBudget(max_input_tokens=10))
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+    [(_, result)] = await pipeline.process_source_data([source_data], None)
+
+    assert "入力トークン数の上限" in result["error"]
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_pipeline_truncates_only_when_limit_is_set(replay_pipeline, settings, caplog):
+    """情報源ごとの入力上限は既定では無効で、設定した場合は情報源IDを付けて警告するテスト"""
+    url = "https://example.com/trail"
+    paragraphs = "".join(f"<p>鴨沢ルートの{i}番目の区間で落石が発生しています。</p>" for i in range(40))
+    html = f"<html><body><h1>登山道情報</h1>{paragraphs}</body></html>"
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+
+    pipeline, calls = replay_pipeline({url: html})
+    await pipeline.process_source_data([source_data], None)
+    settings.LLM_MAX_INPUT_TOKENS_PER_SOURCE = 100
+    pipeline, truncated_calls = replay_pipeline({url: html})
+    await pipeline.process_source_data([source_data], None)
+
+    assert "39番目" in calls[0].data
+    assert "39番目" not in truncated_calls[0].data
+    assert "ID 1 001_okutama_vc.yaml" in caplog.text
+
+
+def test_estimate_input_cost_matches_reservation(sample_llm_config):
+    """入力分の料金の見積もりは予算の確保と同じ入力トークン数から計算するテスト"""
+    config = LlmConfig(**sample_llm_config)
+    reservation = RunBudget.estimate(config)
+
+    assert estimate_input_cost(config) == LlmFee(config.model).calculate(reservation.input_tokens, "input")
+    assert 0 < estimate_input_cost(config) < reservation.cost
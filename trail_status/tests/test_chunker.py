@@ -0,0 +1,72 @@
+"""
+大きなページのチャンク分割・結果結合のテスト
+"""
+
+from trail_status.services.chunker import merge_results, split_into_chunks
+from trail_status.services.llm_stats import LlmStats, TokenStats
+from trail_status.services.schema import TrailConditionSchemaList
+from trail_status.services.token_estimator import estimate_tokens
+
+
+def _record(mountain: str, trail: str, title: str) -> dict:
+    return {
+        "trail_name": trail,
+        "mountain_name_raw": mountain,
+        "title": title,
+        "description": "通行止め",
+        "status": "CLOSURE",
+        "area": "OKUTAMA",
+    }
+
+
+def test_small_text_is_single_chunk():
+    text = "## 【ページ1】\n鴨沢ルートは通行可能です。"
+    assert split_into_chunks(text, 1000) == [text]
+
+
+def test_split_repeats_section_and_table_header():
+    """表の途中で分割した場合、ページ見出しと表のヘッダーを次のチャンクに繰り返すテスト"""
+    rows = [f"| 登山道{i} | 倒木のため通行止め |" for i in range(40)]
+    text = "\n".join(["## 【ページ1】", "| 登山道 | 状況 |", "| --- | --- |", *rows])
+
+    chunks = split_into_chunks(text, 200)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        lines = chunk.splitlines()
+        assert lines[:3] == ["## 【ページ1】", "| 登山道 | 状況 |", "| --- | --- |"]
+        assert estimate_tokens(chunk) <= 200
+    # 全ての行がいずれかのチャンクに1回ずつ含まれる
+    assert sum(chunk.count("| 登山道") - 1 for chunk in chunks) == len(rows)
+
+
+def test_merge_results_deduplicates_normalized_records():
+    """全角・半角や空白の違いを無視して重複レコードを除くテスト"""
+    first = TrailConditionSchemaList(
+        trail_condition_records=[_record("雲取山", "鴨沢ルート", "通行止め"), _record("川苔山", "百尋ノ滝", "崩落")]
+    )
+    second = TrailConditionSchemaList(
+        trail_condition_records=[_record("雲取山 ", "鴨沢ルート", "通行止め"), _record("御岳山", "ロックガーデン", "倒木")]
+    )
+
+    merged = merge_results([first, second])
+
+    assert [record.mountain_name_raw for record in merged.trail_condition_records] == ["雲取山", "川苔山", "御岳山"]
+
+
+def test_combine_chunk_stats():
+    """チャンクごとのメトリクスの合算で、料金はAPIを呼んだ分のみ・時間は並行実行の最大値とするテスト"""
+    called = LlmStats(TokenStats(100, 0, 50, 100, 50, "deepseek-chat"))
+    called.execution_time = 1.0
+    called.first_record_time = 0.5
+    cached = LlmStats(TokenStats(200, 0, 80, 200, 80, "deepseek-chat"))
+    cached.execution_time = 2.0
+    cached.queue_time = 0.3
+    cached.cache_hit = True
+
+    combined = LlmStats.combine([called, cached])
+
+    assert combined.token_stats.input_tokens == 100
+    assert combined.cache_hit is False
+    assert (combined.execution_time, combined.queue_time, combined.first_record_time) == (2.0, 0.3, 0.5)
+    assert combined.chunk_count == 2
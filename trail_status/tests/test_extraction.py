@@ -0,0 +1,50 @@
+"""
+情報源ごとの抽出設定（extraction:）のテスト
+"""
+
+import pytest
+
+from trail_status.services.extraction import ExtractionProfile
+from trail_status.services.fetcher import extract_text
+
+HTML = """
+<html><body>
+<div id="news"><p>年末年始の休館日のお知らせです。ビジターセンターは12月29日から1月3日まで休館します。</p></div>
+<div id="main">
+  <h2>登山道情報</h2>
+  <p>鴨沢ルートは落石のため通行止めとなっています。迂回路をご利用ください。</p>
+  <p class="note">最終更新 2025年1月1日</p>
+</div>
+</body></html>
+"""
+
+
+def test_extract_text_with_region():
+    """指定した領域のみを抽出するテスト"""
+    profile = ExtractionProfile.from_dict({"xpath": "//div[@id='main']", "exclude": "//p[@class='note']"})
+
+    text = extract_text(HTML, profile=profile)
+
+    assert "鴨沢ルート" in text
+    assert "休館" not in text
+    assert "最終更新" not in text
+
+
+def test_extract_text_region_not_found():
+    """領域が見つからない場合は文書全体を使うテスト"""
+    profile = ExtractionProfile(xpath="//div[@id='missing']", mode="precision")
+
+    assert "鴨沢ルート" in extract_text(HTML, profile=profile)
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        ExtractionProfile.from_dict({"mode": "turbo"})
+
+
+def test_css_without_cssselect(monkeypatch):
+    """cssselectが無い環境でCSSセレクタを指定すると、無視せずにエラーとするテスト"""
+    monkeypatch.setattr("trail_status.services.extraction.is_css_supported", lambda: False)
+
+    with pytest.raises(ValueError, match="cssselect"):
+        ExtractionProfile.from_dict({"css": "div#main"})
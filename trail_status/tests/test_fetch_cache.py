@@ -0,0 +1,55 @@
+"""
+取得キャッシュ（同一URLの取得共有）のテスト
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from trail_status.services.fetch_cache import FetchCache
+from trail_status.services.fetcher import DataFetcher
+
+HTML = "<html><body><h1>登山道情報</h1><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+
+
+@pytest.mark.asyncio
+async def test_sources_sharing_url_fetch_once(replay_pipeline):
+    """同じURLを指す複数の情報源で取得が1回になるテスト"""
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, html=HTML)
+
+    pipeline, _ = replay_pipeline()
+    source_data_list = [
+        {"id": i, "name": f"テスト{i}", "url1": "https://example.com/trail", "prompt_key": prompt_key}
+        for i, prompt_key in ((1, "okutama_vc"), (2, "mitake_vc"))
+    ]
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        results = await pipeline.process_source_data(source_data_list, None, client=client)
+
+    assert len(requests) == 1
+    assert all(result["success"] for _, result in results)
+    assert pipeline.fetch_cache.stats.fetches == 1
+    assert pipeline.fetch_cache.stats.coalesced + pipeline.fetch_cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_reused_within_ttl(tmp_path):
+    """TTL内であれば前回の実行の取得結果を再利用するテスト"""
+    requests = []
+    transport = httpx.MockTransport(lambda request: requests.append(request) or httpx.Response(200, html=HTML))
+    fetcher = DataFetcher()
+    url = "https://example.com/trail"
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        first = await FetchCache(ttl=60, cache_dir=tmp_path).get_or_fetch(url, lambda: fetcher.fetch(client, url))
+        second = await FetchCache(ttl=60, cache_dir=tmp_path).get_or_fetch(url, lambda: fetcher.fetch(client, url))
+
+    assert len(requests) == 1
+    assert second.content_hash == first.content_hash
+    assert second.text == first.text
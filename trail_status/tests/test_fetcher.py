@@ -2,12 +2,12 @@
 DataFetcherのテスト
 """
 
-from unittest.mock import AsyncMock, MagicMock
-
 import pytest
 import httpx
 
+from trail_status.services.executor import ExtractionExecutor
 from trail_status.services.fetcher import DataFetcher
+from trail_status.services.http_client import ResponseTooLargeError, create_http_client
 
 
 @pytest.mark.asyncio
@@ -16,8 +16,7 @@ async def test_fetch_text_success():
     fetcher = DataFetcher()
 
     # HTTPレスポンスをモック
-    mock_response = MagicMock()
-    mock_response.text = """
+    html = """
     <html>
         <body>
             <h1>登山道情報</h1>
@@ -25,11 +24,10 @@ async def test_fetch_text_success():
         </body>
     </html>
     """
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, html=html))
 
-    mock_client = AsyncMock()
-    mock_client.get = AsyncMock(return_value=mock_response)
-
-    text = await fetcher.fetch_text(mock_client, "https://example.com/trail")
+    async with httpx.AsyncClient(transport=transport) as client:
+        text = await fetcher.fetch_text(client, "https://example.com/trail")
 
     assert len(text) > 0
     assert "登山道情報" in text or "通行止め" in text  # trafilaturaで抽出されたテキスト
@@ -68,3 +66,114 @@ async def test_content_change_detection():
     has_changed, hash3 = fetcher.has_content_changed(html2, hash1)
     assert has_changed is True
     assert hash3 != hash1
+
+
+@pytest.mark.asyncio
+async def test_fetch_single_request():
+    """1回の取得で抽出テキストとハッシュが同じ結果から得られるテスト"""
+    fetcher = DataFetcher()
+    html = "<html><body><h1>登山道情報</h1><p>通行止めの情報があります。</p></body></html>"
+    request_count = 0
+
+    def handler(request):
+        nonlocal request_count
+        request_count += 1
+        return httpx.Response(200, html=html)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await fetcher.fetch(client, "https://example.com/trail")
+
+    assert request_count == 1
+    assert result.raw_content == html.encode("utf-8")
+    assert "通行止め" in result.text
+    assert result.content_hash == fetcher.hash_text(result.text)
+
+
+@pytest.mark.asyncio
+async def test_fetch_not_modified():
+    """条件付きGETで304が返った場合に抽出を行わないテスト"""
+    fetcher = DataFetcher()
+    sent_headers = {}
+
+    def handler(request):
+        sent_headers.update(request.headers)
+        return httpx.Response(304, headers={"ETag": '"abc"'})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await fetcher.fetch(
+            client, "https://example.com/trail", etag='"abc"', last_modified="Wed, 01 Jan 2026 00:00:00 GMT"
+        )
+
+    assert sent_headers["if-none-match"] == '"abc"'
+    assert sent_headers["if-modified-since"] == "Wed, 01 Jan 2026 00:00:00 GMT"
+    assert result.not_modified is True
+    assert result.text == ""
+    assert result.etag == '"abc"'
+
+
+@pytest.mark.asyncio
+async def test_fetch_response_too_large():
+    """レスポンスサイズ上限を超えた場合のテスト"""
+    fetcher = DataFetcher(max_response_bytes=100)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"x" * 1000))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(ResponseTooLargeError):
+            await fetcher.fetch(client, "https://example.com/large")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["inline", "thread", "process"])
+async def test_fetch_with_extraction_executor(kind):
+    """抽出処理をワーカーで実行しても同じ結果になるテスト"""
+    executor = ExtractionExecutor(kind, max_workers=1)
+    fetcher = DataFetcher(executor=executor)
+    html = "<html><body><h1>登山道情報</h1><p>通行止めの情報があります。</p></body></html>"
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, html=html))
+
+    try:
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetcher.fetch(client, "https://example.com/trail")
+    finally:
+        executor.shutdown()
+
+    assert result.text == fetcher.extract_text(html)
+    assert result.content_hash == fetcher.hash_text(result.text)
+
+
+@pytest.mark.asyncio
+async def test_fetch_raw_hash_unchanged(monkeypatch):
+    """生バイト列のハッシュが一致する場合に抽出を省略するテスト"""
+    fetcher = DataFetcher()
+    html = "<html><body><p>テスト</p></body></html>"
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, html=html))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        first = await fetcher.fetch(client, "https://example.com/trail")
+
+        def fail_extract(*args, **kwargs):
+            raise AssertionError("抽出が実行されました")
+
+        monkeypatch.setattr("trail_status.services.fetcher.extract_and_hash", fail_extract)
+        second = await fetcher.fetch(client, "https://example.com/trail", raw_hash=first.raw_hash)
+
+    assert first.raw_unchanged is False
+    assert second.raw_unchanged is True
+    assert second.raw_hash == first.raw_hash
+
+
+def test_oversized_validator_is_dropped():
+    """保存できない長さのETagは破棄するテスト"""
+    from trail_status.management.commands.trail_sync import Command
+
+    assert Command._fit_validator("url2_etag", '"abc"') == '"abc"'
+    assert Command._fit_validator("etag", "x" * 201) == ""
+
+
+def test_http2_requires_extra(settings, monkeypatch):
+    """HTTP/2を有効にしてh2が無い場合は、HTTP/1.1に切り替えずにエラーとするテスト"""
+    settings.HTTP_USE_HTTP2 = True
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+
+    with pytest.raises(ValueError, match="http2"):
+        create_http_client()
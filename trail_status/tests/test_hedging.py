@@ -0,0 +1,106 @@
+"""
+LLM呼び出しのヘッジのテスト
+"""
+
+import asyncio
+
+import pytest
+
+from trail_status.services.hedging import HedgePolicy, percentile_of, race_with_hedge
+
+
+def test_delay_from_latency_history():
+    policy = HedgePolicy(
+        models={"deepseek-reasoner": "gemini-2.5-flash"},
+        percentile=90,
+        min_samples=5,
+        default_delay=None,
+        latencies={"deepseek-reasoner": [float(i) for i in range(1, 11)], "deepseek-chat": [1.0] * 10},
+    )
+
+    assert policy.delay_for("deepseek-reasoner") == pytest.approx(percentile_of(list(range(1, 11)), 90))
+    assert policy.delay_for("deepseek-chat") is None  # 副モデルの設定なし
+    policy.latencies["deepseek-reasoner"] = [1.0]
+    assert policy.delay_for("deepseek-reasoner") is None  # 履歴不足
+
+
+@pytest.mark.asyncio
+async def test_race_cancels_slower_request():
+    """主リクエストが遅い場合に副リクエストの結果を採用し、主リクエストをキャンセルするテスト"""
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("primary")
+            raise
+
+    async def fast():
+        return "secondary"
+
+    outcome = await race_with_hedge(slow, fast, delay=0.01)
+
+    assert (outcome.result, outcome.hedged, outcome.secondary_won) == ("secondary", True, True)
+    assert cancelled == ["primary"]
+
+
+@pytest.mark.asyncio
+async def test_race_waits_for_other_on_failure():
+    """副リクエストが失敗した場合は主リクエストの完了を待つテスト"""
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def failing():
+        raise RuntimeError("503")
+
+    outcome = await race_with_hedge(primary, failing, delay=0.01)
+
+    assert (outcome.result, outcome.hedged, outcome.secondary_won) == ("primary", True, False)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_records_hedge(replay_pipeline):
+    """副モデルが採用された場合にモデル名と追加コストを記録するテスト"""
+    url = "https://example.com/trail"
+    html = "<html><body><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+    pipeline, _ = replay_pipeline(
+        {url: html},
+        latency=lambda config: 10.0 if config.model.startswith("deepseek") else 0.0,
+        hedge_policy=HedgePolicy(models={"deepseek-chat": "gemini-2.5-flash"}, default_delay=0.01),
+    )
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+    [(_, result)] = await pipeline.process_source_data([source_data], "deepseek-chat")
+
+    stats = result["stats"]
+    assert stats.hedged and stats.hedge_won
+    assert stats.token_stats.model_name == "gemini-2.5-flash"
+    assert stats.hedge_extra_cost > 0
+    assert stats.total_fee == pytest.approx(stats.token_stats.total_fee + stats.hedge_extra_cost)
+    assert stats.execution_time < 10
+
+
+@pytest.mark.asyncio
+async def test_hedged_response_is_cached_for_primary(replay_pipeline, settings):
+    """副モデルの応答を採用した場合も、次回は主モデルの設定でキャッシュを再利用できるテスト"""
+    settings.LLM_CACHE_ENABLED = True
+    url = "https://example.com/trail"
+    html = "<html><body><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+    results = []
+    calls = []
+    for _ in range(2):
+        pipeline, pipeline_calls = replay_pipeline(
+            {url: html},
+            latency=lambda config: 10.0 if config.model.startswith("deepseek") else 0.0,
+            hedge_policy=HedgePolicy(models={"deepseek-chat": "gemini-2.5-flash"}, default_delay=0.01),
+        )
+        [(_, result)] = await pipeline.process_source_data([source_data], "deepseek-chat")
+        results.append(result["stats"])
+        calls += pipeline_calls
+
+    assert results[0].hedge_won and not results[0].cache_hit
+    assert results[1].cache_hit
+    assert len(calls) == 2  # 1回目の主モデル・副モデルのみ
@@ -0,0 +1,93 @@
+"""
+LLM応答キャッシュのテスト
+"""
+
+import pytest
+
+from trail_status.services.llm_cache import LlmResponseCache
+from trail_status.services.llm_client import LlmConfig
+from trail_status.services.llm_stats import LlmStats, TokenStats
+from trail_status.services.schema import TrailConditionSchemaList
+
+
+@pytest.fixture
+def config(sample_llm_config):
+    return LlmConfig(**sample_llm_config)
+
+
+def test_cache_key_includes_input(tmp_path, config, sample_llm_config):
+    """入力テキスト・温度が異なれば別の応答として扱うテスト"""
+    cache = LlmResponseCache(tmp_path)
+    cache.put(config, TrailConditionSchemaList(trail_condition_records=[]), TokenStats(100, 0, 50, 10, 5, config.model))
+
+    assert cache.get(config) is not None
+    assert cache.get(LlmConfig(**{**sample_llm_config, "data": "別のデータ"})) is None
+    assert cache.get(LlmConfig(**{**sample_llm_config, "temperature": 0.5})) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_cache_eviction(tmp_path, config, sample_llm_config):
+    """件数の上限を超えたら古いものから削除するテスト"""
+    cache = LlmResponseCache(tmp_path, max_entries=2)
+    stats = TokenStats(1, 0, 1, 1, 1, config.model)
+    empty = TrailConditionSchemaList(trail_condition_records=[])
+    for i in range(3):
+        cache.put(LlmConfig(**{**sample_llm_config, "data": f"データ{i}"}), empty, stats)
+
+    assert len(list(tmp_path.glob("*/*.json.gz"))) == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_reuses_cached_response(replay_pipeline, settings):
+    """同じ入力の2回目の実行でLLMを呼ばず、料金0として記録されるテスト"""
+    settings.LLM_CACHE_ENABLED = True
+    url = "https://example.com/trail"
+    html = "<html><body><h1>登山道情報</h1><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+    results = []
+    calls = []
+    for _ in range(2):
+        pipeline, pipeline_calls = replay_pipeline({url: html})
+        results.append((await pipeline.process_source_data([source_data], None))[0][1])
+        calls += pipeline_calls
+
+    assert len(calls) == 1
+    assert results[0]["stats"].cache_hit is False
+    assert results[1]["stats"].cache_hit is True
+    assert results[1]["stats"].total_fee == 0
+    assert results[1]["stats"].to_dict()["input_tokens"] == results[0]["stats"].to_dict()["input_tokens"]
+
+
+def test_cache_hit_usage_records_no_tokens(monkeypatch, config):
+    """キャッシュを再利用した呼び出しの使用履歴はトークン数0で保存するテスト"""
+    from trail_status.management.commands.trail_sync import Command
+    from trail_status.models.llm_usage import LlmUsage
+
+    saved = []
+    monkeypatch.setattr(LlmUsage.objects, "create", lambda **kwargs: saved.append(kwargs))
+    llm_stats = LlmStats(TokenStats(100, 20, 50, 10, 5, config.model))
+    llm_stats.cache_hit = True
+
+    Command()._save_llm_usage(None, llm_stats, 0)
+
+    [usage] = saved
+    assert usage["cache_hit"] is True
+    assert usage["cost_usd"] == 0
+    assert [usage[key] for key in ("prompt_tokens", "thinking_tokens", "output_tokens")] == [0, 0, 0]
+    assert (usage["prompt_cache_hit_tokens"], usage["prompt_cache_miss_tokens"]) == (0, 0)
+
+
+def test_eviction_does_not_rescan_every_put(tmp_path, config, sample_llm_config, monkeypatch):
+    """件数は初回の保存時のみ数え、上限を超えたときだけ走査して上限の9割まで削除するテスト"""
+    cache = LlmResponseCache(tmp_path, max_entries=10)
+    scans = []
+    entry_paths = cache._entry_paths
+    monkeypatch.setattr(cache, "_entry_paths", lambda: scans.append(1) or entry_paths())
+    stats = TokenStats(1, 0, 1, 1, 1, config.model)
+    empty = TrailConditionSchemaList(trail_condition_records=[])
+    for i in range(12):
+        cache.put(LlmConfig(**{**sample_llm_config, "data": f"データ{i}"}), empty, stats)
+
+    assert len(scans) == 2  # 初回の件数確認と、11件目で上限を超えたときの削除
+    assert len(list(tmp_path.glob("*/*.json.gz"))) == 10
@@ -57,3 +57,67 @@ async def test_deepseek_generate_success(config, monkeypatch, mock_openai_respon
     assert len(validated_data.trail_condition_records) == 0
     assert token_stats.input_tokens == 100
     assert token_stats.pure_output_tokens == 50
+
+
+@pytest.mark.asyncio
+async def test_deepseek_client_shared_across_calls(config, monkeypatch, mock_openai_response):
+    """同じAPIキーの呼び出しでAsyncOpenAIクライアントを共有するテスト"""
+    from trail_status.services.llm_registry import llm_client_registry
+    from trail_status.services.schema import TrailConditionSchemaList
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_openai_response)
+    mock_openai_class = MagicMock(return_value=mock_client)
+    monkeypatch.setattr("openai.AsyncOpenAI", mock_openai_class)
+
+    for _ in range(3):
+        client = DeepseekClient(config)
+        monkeypatch.setattr(client, "validate_response", lambda x: TrailConditionSchemaList(trail_condition_records=[]))
+        await client.generate()
+
+    assert mock_openai_class.call_count == 1
+    assert mock_client.chat.completions.create.call_count == 3
+
+    await llm_client_registry.aclose()
+    assert len(llm_client_registry) == 0
+
+
+def test_deepseek_static_prefix_shared_across_sites(mock_api_keys, sample_llm_config):
+    """スキーマ指示とテンプレートをsystemメッセージに置き、情報源が違っても同一になるテスト"""
+    config_a = LlmConfig(**{**sample_llm_config, "use_template": True})
+    config_b = LlmConfig(**{**sample_llm_config, "use_template": True, "site_prompt": "別サイト", "data": "別データ"})
+
+    messages_a = DeepseekClient(config_a).messages_for_deepseek
+    messages_b = DeepseekClient(config_b).messages_for_deepseek
+
+    assert messages_a[0]["role"] == "system"
+    assert messages_a[0]["content"] == messages_b[0]["content"]
+    assert "Pydanticモデル" in messages_a[0]["content"]
+    assert messages_a[1]["content"] == "テスト用プロンプト\n\nテスト用データ"
+
+
+def test_fee_with_prompt_cache_hits():
+    """プレフィックスキャッシュのヒット分は割引料金で計算するテスト"""
+    from trail_status.services.llm_stats import TokenStats
+
+    stats = TokenStats(1_000_000, 0, 0, 0, 0, "deepseek-chat", prompt_cache_hit_tokens=800_000)
+
+    assert stats.prompt_cache_miss_tokens == 200_000
+    assert stats.input_fee == pytest.approx(0.028 * 0.8 + 0.28 * 0.2)
+
+
+def test_only_valid_response_is_saved_as_sample(config, monkeypatch):
+    """検証に失敗した応答はサンプル出力として保存しないテスト"""
+    from pydantic import ValidationError
+
+    from trail_status.services import llm_client
+
+    saved = []
+    monkeypatch.setattr(llm_client.artifact_writer, "write_response", lambda *args: saved.append(args[2]))
+    client = DeepseekClient(config)
+
+    with pytest.raises(ValidationError):
+        client.validate_response('{"records": []}')
+    client.validate_response('{"trail_condition_records": []}')
+
+    assert saved == ['{"trail_condition_records": []}']
@@ -0,0 +1,67 @@
+"""
+リンク先PDFの取得・抽出ステージのテスト
+"""
+
+import httpx
+import pytest
+
+from trail_status.services import pdf
+from trail_status.services import pipeline as pipeline_module
+from trail_status.services.pdf import PdfCache, PdfFollower, find_pdf_links
+from trail_status.services.pipeline import TrailConditionPipeline
+
+
+def test_find_pdf_links():
+    """相対リンクの解決・PDF以外の除外・重複排除のテスト"""
+    text = (
+        "- [通行止めのお知らせ](/files/closure.PDF)\n"
+        "- [地図](https://example.com/map.html)\n"
+        "- [再掲](https://example.com/files/closure.PDF)\n"
+        "- [PDF](docs/report.pdf?v=2)\n"
+    )
+
+    links = find_pdf_links(text, "https://example.com/trail/index.html")
+
+    assert links == ["https://example.com/files/closure.PDF", "https://example.com/trail/docs/report.pdf?v=2"]
+
+
+@pytest.mark.asyncio
+async def test_pdf_follower_uses_cache(tmp_path, monkeypatch, no_wait_scheduler, inline_executor):
+    """2回目は条件付きGETの304でダウンロード・パースを省略するテスト"""
+    parsed = []
+
+    def fake_extract(raw_content):
+        parsed.append(raw_content)
+        return "冬季通行止め"
+
+    monkeypatch.setattr(pdf, "extract_pdf_text", fake_extract)
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=b"%PDF-1.4 ...", headers={"ETag": '"v1"'})
+
+    follower = PdfFollower(no_wait_scheduler, inline_executor, cache=PdfCache(tmp_path))
+    text = "[お知らせ](/closure.pdf)"
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        first = await follower.fetch_texts(client, text, "https://example.com/trail")
+        second = await follower.fetch_texts(client, text, "https://example.com/trail")
+
+    assert first == second == [("https://example.com/closure.pdf", "冬季通行止め")]
+    assert len(parsed) == 1
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+
+
+def test_follow_pdf_requires_pypdf(monkeypatch, no_wait_scheduler, inline_executor):
+    """pypdfが無い環境でPDFリンクの取得を指定した場合はエラーにするテスト"""
+    monkeypatch.setattr(pipeline_module, "is_pdf_supported", lambda: False)
+
+    with pytest.raises(ValueError, match="pypdf"):
+        TrailConditionPipeline(scheduler=no_wait_scheduler, executor=inline_executor, follow_pdf=True)
+
+    pipeline = TrailConditionPipeline(scheduler=no_wait_scheduler, executor=inline_executor, follow_pdf=False)
+    assert pipeline.pdf_follower is None
@@ -0,0 +1,80 @@
+"""
+プロンプトレジストリのテスト
+"""
+
+import os
+
+import pytest
+
+from trail_status.services import prompt_registry as registry_module
+from trail_status.services.llm_client import LlmConfig
+from trail_status.services.prompt_registry import PromptRegistry
+from trail_status.services.schema import TrailConditionSchemaList
+
+PROMPT_YAML = """\
+config:
+  model: deepseek-chat
+extraction:
+  xpath: //main
+prompt: |
+  {text}
+"""
+
+
+def write_prompt(path, text):
+    path.write_text(PROMPT_YAML.format(text=text), encoding="utf-8")
+
+
+def test_parses_once_and_reloads_on_change(tmp_path, monkeypatch):
+    """変更の無いファイルは解析し直さず、更新されたファイルは読み直すテスト"""
+    path = tmp_path / "001_test.yaml"
+    write_prompt(path, "最初の指示")
+    registry = PromptRegistry(tmp_path)
+    parsed = []
+    parse = PromptRegistry._parse
+    monkeypatch.setattr(PromptRegistry, "_parse", staticmethod(lambda *args: parsed.append(args[0]) or parse(*args)))
+
+    bundle = registry.get("001_test.yaml")
+    assert registry.get("001_test.yaml") is bundle
+    assert (bundle.config, bundle.extraction) == ({"model": "deepseek-chat"}, {"xpath": "//main"})
+    assert parsed == ["001_test.yaml"]
+
+    # 更新日時だけ変わった場合は内容のハッシュが同じなので解析し直さない
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert registry.get("001_test.yaml") is bundle
+    assert len(parsed) == 1
+
+    write_prompt(path, "更新した指示")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000))
+    assert registry.get("001_test.yaml").prompt == "更新した指示\n"
+    assert len(parsed) == 2
+
+
+def test_missing_file_and_prompt(tmp_path):
+    (tmp_path / "no_prompt.yaml").write_text("config: {}\n", encoding="utf-8")
+    registry = PromptRegistry(tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        registry.get("missing.yaml")
+    with pytest.raises(ValueError):
+        registry.get("no_prompt.yaml").require_prompt()
+
+
+def test_schema_artifacts_are_reused():
+    registry = PromptRegistry()
+
+    assert registry.schema_statement(TrailConditionSchemaList) is registry.schema_statement(TrailConditionSchemaList)
+    assert registry.adapter(TrailConditionSchemaList) is registry.adapter(TrailConditionSchemaList)
+    validated = registry.adapter(TrailConditionSchemaList).validate_json('{"trail_condition_records": []}')
+    assert validated == TrailConditionSchemaList(trail_condition_records=[])
+
+
+def test_llm_config_uses_registry(tmp_path, monkeypatch):
+    """LlmConfigの読み込みがレジストリの解析結果を使うテスト"""
+    write_prompt(tmp_path / "001_test.yaml", "サイト固有の指示")
+    monkeypatch.setattr(registry_module, "get_prompts_dir", lambda: tmp_path)
+
+    config = LlmConfig.from_file("001_test.yaml", data="テストデータ")
+
+    assert (config.model, config.site_prompt) == ("deepseek-chat", "サイト固有の指示\n")
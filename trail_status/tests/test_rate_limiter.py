@@ -0,0 +1,60 @@
+"""
+LLM呼び出しのレート制限のテスト
+"""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from trail_status.services.llm_client import DeepseekClient, LlmConfig
+from trail_status.services.rate_limiter import LlmRateLimiter, parse_retry_after
+from trail_status.services.schema import TrailConditionSchemaList
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+@pytest.mark.asyncio
+async def test_requests_per_minute_queue():
+    """rpmを超える呼び出しは失敗せず順番待ちになるテスト"""
+    limiter = LlmRateLimiter(rpm=600, tpm=1_000_000, concurrency=10)  # 0.1秒に1回補充
+    limiter.requests.tokens = 1
+
+    first = await limiter.acquire(10)
+    limiter.release()
+    second = await limiter.acquire(10)
+    limiter.release()
+
+    assert first == pytest.approx(0, abs=0.01)
+    assert second >= 0.05
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(RateLimitError("3")) == 3.0
+    assert parse_retry_after(Exception()) is None
+
+
+@pytest.mark.asyncio
+async def test_retry_after_429(mock_api_keys, sample_llm_config, monkeypatch, mock_openai_response, settings):
+    """429を受けたらRetry-Afterだけ待ってリトライし、待ち時間をqueue_timeに記録するテスト"""
+    settings.LLM_RATE_LIMITS = {"deepseek": {"rpm": 600, "tpm": 1_000_000, "concurrency": 1}}
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(side_effect=[RateLimitError("0.2"), mock_openai_response])
+    monkeypatch.setattr("openai.AsyncOpenAI", MagicMock(return_value=mock_client))
+
+    client = DeepseekClient(LlmConfig(**sample_llm_config))
+    monkeypatch.setattr(client, "validate_response", lambda x: TrailConditionSchemaList(trail_condition_records=[]))
+    start = time.monotonic()
+    _, stats = await client.generate()
+
+    assert mock_client.chat.completions.create.call_count == 2
+    assert time.monotonic() - start >= 0.2
+    assert client.queue_time >= 0.15
+    assert stats.input_tokens == 100
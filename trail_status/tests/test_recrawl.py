@@ -0,0 +1,61 @@
+"""
+変更頻度に応じた再取得スケジュールのテスト
+"""
+
+from datetime import datetime, timedelta
+
+from trail_status.services.recrawl import RecrawlPolicy, RecrawlState, estimate_change_rate
+
+POLICY = RecrawlPolicy(min_interval=3600, max_interval=7 * 86400, history_limit=50)
+START = datetime(2025, 1, 1)
+
+
+def simulate(changed_pattern, check_interval=timedelta(hours=6)):
+    state = RecrawlState(0, 0, None)
+    now = START
+    state = state.record(True, now, POLICY)
+    for changed in changed_pattern:
+        now += check_interval
+        state = state.record(changed, now, POLICY)
+    return state, now
+
+
+def test_first_check_is_due_after_min_interval():
+    state = RecrawlState(0, 0, None).record(True, START, POLICY)
+
+    assert state.check_count == 0
+    assert state.next_due_at == START + timedelta(seconds=POLICY.min_interval)
+
+
+def test_volatile_source_polled_more_often():
+    """変更の多い情報源ほど次回取得までの間隔が短いテスト"""
+    volatile, volatile_now = simulate([True] * 10)
+    stable, stable_now = simulate([False] * 9 + [True])
+
+    assert volatile.next_due_at - volatile_now < stable.next_due_at - stable_now
+    assert volatile.next_due_at - volatile_now >= timedelta(seconds=POLICY.min_interval)
+
+
+def test_unchanged_source_capped_at_max_interval():
+    state, now = simulate([False] * 10, check_interval=timedelta(days=4))
+
+    assert state.next_due_at - now == timedelta(seconds=POLICY.max_interval)
+
+
+def test_single_unchanged_check_grows_gradually():
+    """1回変更が無かっただけでは最長の間隔にせず、平均取得間隔の倍率までしか延ばさないテスト"""
+    state, now = simulate([False], check_interval=timedelta(hours=1))
+
+    assert state.next_due_at - now == timedelta(hours=2)
+
+    state, now = simulate([False] * 10)
+    assert state.next_due_at - now == timedelta(hours=12)
+
+
+def test_history_decay_keeps_rate():
+    """観測回数が上限を超えたら統計を減衰させても変更率は保たれるテスト"""
+    state, now = simulate([True, False] * 30)
+
+    assert state.check_count <= POLICY.history_limit
+    observed = (now - state.stats_since).total_seconds()
+    assert estimate_change_rate(state.check_count, state.change_count, observed) > 0
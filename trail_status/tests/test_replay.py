@@ -0,0 +1,210 @@
+"""
+リプレイモード（保存済みスナップショット + ローカルLLM代替）のテスト
+"""
+
+import pytest
+
+from trail_status.services.extraction import ExtractionProfile
+from trail_status.services.llm_client import LlmConfig
+from trail_status.services.fetcher import extract_text, hash_text, legacy_content_hash
+from trail_status.services.pipeline import attribute_record_urls
+from trail_status.services.replay import ReplayFetcher, ReplayLlmClient, load_snapshot_dir
+from trail_status.services.schema import TrailConditionSchemaList
+from trail_status.services.token_estimator import estimate_tokens
+
+RESPONSE = """
+{
+    "trail_condition_records": [
+        {
+            "trail_name": "鴨沢ルート",
+            "mountain_name_raw": "雲取山",
+            "title": "落石注意",
+            "status": "HAZARD",
+            "area": "OKUTAMA"
+        }
+    ]
+}
+"""
+
+
+def test_load_snapshot_dir(tmp_path):
+    """スナップショットディレクトリの読み込みテスト"""
+    (tmp_path / "1.html").write_bytes(b"<html>1</html>")
+    (tmp_path / "1_2.html").write_bytes(b"<html>1-2</html>")
+    (tmp_path / "memo.txt").write_text("skip")
+
+    pages = load_snapshot_dir(tmp_path)
+
+    assert pages == {1: {"url1": b"<html>1</html>", "url2": b"<html>1-2</html>"}}
+
+
+@pytest.mark.asyncio
+async def test_replay_llm_client_estimates_tokens(sample_llm_config, clean_env):
+    """ローカル代替はAPIキーなしで作成でき、実APIと同じ見積もりでトークン数を返すテスト"""
+    config = LlmConfig(**sample_llm_config)
+    client = ReplayLlmClient(config, response_text=RESPONSE)
+
+    _, stats = await client.generate()
+
+    assert (client.api_key, client.queue_time, client.first_record_time) == ("", 0.0, None)
+    assert stats.input_tokens == estimate_tokens(config.full_prompt + config.data, config.model)
+    assert stats.pure_output_tokens == estimate_tokens(RESPONSE, config.model)
+    assert stats.input_letter_count == len(config.full_prompt + config.data)
+
+
+@pytest.mark.asyncio
+async def test_replay_pipeline(tmp_path, replay_pipeline):
+    """ネットワーク・APIなしでパイプライン全体を実行できるテスト"""
+    url = "https://example.com/trail"
+    html = "<html><body><h1>登山道情報</h1><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+    fixture = tmp_path / "response.json"
+    fixture.write_text(RESPONSE, encoding="utf-8")
+
+    pipeline, _ = replay_pipeline({url: html}, llm_client_factory=ReplayLlmClient.factory(str(fixture)))
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+
+    results = await pipeline.process_source_data([source_data], None)
+
+    _, result = results[0]
+    assert result["success"] is True
+    assert result["content_changed"] is True
+    assert result["extracted_trail_conditions"].trail_condition_records[0].trail_name == "鴨沢ルート"
+
+
+@pytest.mark.asyncio
+async def test_multi_url_sends_only_changed_pages(replay_pipeline):
+    """URL①・URL②のうち変更のあったページのみをLLMに渡すテスト"""
+    url1 = "https://example.com/closures"
+    url2 = "https://example.com/hazards"
+    html1 = "<html><body><h1>通行止め</h1><p>鴨沢ルートが通行止めです。</p></body></html>"
+    html2 = "<html><body><h1>危険箇所</h1><p>石尾根で倒木があります。</p></body></html>"
+    pipeline, calls = replay_pipeline({url1: html1, url2: html2})
+    source_data = {
+        "id": 1,
+        "name": "テスト",
+        "url1": url1,
+        "url2": url2,
+        "prompt_key": "okutama_vc",
+        "content_hash": "",
+        "url2_content_hash": hash_text(extract_text(html2)),
+    }
+
+    results = await pipeline.process_source_data([source_data], None)
+
+    _, result = results[0]
+    assert result["pages"]["url1"]["content_changed"] is True
+    assert result["pages"]["url2"]["content_changed"] is False
+    assert len(calls) == 1
+    assert "鴨沢ルート" in calls[0].data
+    assert "石尾根" not in calls[0].data
+
+
+@pytest.mark.asyncio
+async def test_legacy_hash_is_treated_as_unchanged(replay_pipeline, monkeypatch):
+    """従来の方式で保存されたハッシュと一致するページは、移行後最初の実行でも変更なしとするテスト"""
+    url = "https://example.com/trail"
+    html = '<html><body><p>鴨沢ルートは通行可能です。</p><p class="notice">更新日: 1月1日</p></body></html>'
+    # 抽出設定により、従来の方式とは異なるテキストからハッシュを計算する
+    profile = ExtractionProfile(exclude=('//p[@class="notice"]',))
+    monkeypatch.setattr(ExtractionProfile, "from_prompt_file", classmethod(lambda cls, filename: profile))
+    pipeline, calls = replay_pipeline({url: html})
+    source_data = {
+        "id": 1,
+        "name": "テスト",
+        "url1": url,
+        "prompt_key": "okutama_vc",
+        "content_hash": legacy_content_hash(html),
+        "raw_content_hash": "",  # 生データハッシュ導入前の状態
+    }
+
+    [(_, result)] = await pipeline.process_source_data([source_data], None)
+
+    assert result["content_changed"] is False
+    assert result["pages"]["url1"]["new_hash"] != source_data["content_hash"]  # 新しい方式のハッシュに置き換え
+    assert result["pages"]["url1"]["new_raw_hash"]
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_failed_url2_keeps_url1_result(replay_pipeline):
+    """URL②の取得に失敗してもURL①の結果を処理し、失敗したURLのエラーを記録するテスト"""
+    url1 = "https://example.com/closures"
+    html1 = "<html><body><h1>通行止め</h1><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+    pipeline, calls = replay_pipeline({url1: html1}, response_text=RESPONSE)  # URL②のスナップショットなし
+    source_data = {
+        "id": 1,
+        "name": "テスト",
+        "url1": url1,
+        "url2": "https://example.com/missing",
+        "prompt_key": "okutama_vc",
+        "content_hash": "",
+    }
+
+    [(_, result)] = await pipeline.process_source_data([source_data], None)
+
+    assert result["success"] is True
+    assert result["changed_slots"] == ["url1"]
+    assert "error" in result["pages"]["url2"]
+    assert result["record_urls"] == [url1]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_url2_extraction_keeps_url1_result(replay_pipeline):
+    """URL②の抽出結果が空でもURL①の結果を処理し、URL②のみエラーとして記録するテスト"""
+    url1 = "https://example.com/closures"
+    url2 = "https://example.com/empty"
+    html1 = "<html><body><h1>通行止め</h1><p>鴨沢ルートで落石が発生しています。</p></body></html>"
+    pipeline, calls = replay_pipeline({url1: html1, url2: "<html><body></body></html>"}, response_text=RESPONSE)
+    source_data = {"id": 1, "name": "テスト", "url1": url1, "url2": url2, "prompt_key": "okutama_vc", "content_hash": ""}
+
+    [(_, result)] = await pipeline.process_source_data([source_data], None)
+
+    assert result["success"] is True
+    assert result["changed_slots"] == ["url1"]
+    assert result["pages"]["url2"] == {"url": url2, "error": "テキスト抽出結果が空でした"}
+    assert result["pages"]["url1"]["new_hash"]
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_extraction_profile_change_skips_stored_state(replay_pipeline, monkeypatch, inline_executor):
+    """抽出設定が前回と異なる場合は、生データハッシュ・検証子を使わずに抽出し直すテスト"""
+    url = "https://example.com/trail"
+    html = "<html><body><p>鴨沢ルートは通行可能です。</p></body></html>".encode("utf-8")
+    profile = ExtractionProfile(xpath="//body")
+    monkeypatch.setattr(ExtractionProfile, "from_prompt_file", classmethod(lambda cls, filename: profile))
+    requests = []
+
+    class RecordingFetcher(ReplayFetcher):
+        async def fetch(self, client, url, etag=None, last_modified=None, raw_hash=None, profile=None):
+            requests.append((etag, raw_hash))
+            return await super().fetch(client, url, etag, last_modified, raw_hash, profile)
+
+    pipeline, _ = replay_pipeline(fetcher=RecordingFetcher({url: html}, executor=inline_executor))
+    source_data = {
+        "id": 1,
+        "name": "テスト",
+        "url1": url,
+        "prompt_key": "okutama_vc",
+        "content_hash": "",
+        "raw_content_hash": "a" * 64,
+        "etag": '"v1"',
+        "extraction_digest": ExtractionProfile().digest,  # 抽出設定の変更前
+    }
+
+    [(_, result)] = await pipeline.process_source_data([source_data], None)
+    await pipeline.process_source_data([{**source_data, "extraction_digest": profile.digest}], None)
+
+    assert result["pages"]["url1"]["extraction_digest"] == profile.digest
+    assert requests == [(None, ""), ('"v1"', "a" * 64)]
+
+
+def test_attribute_record_urls():
+    """複数ページをまとめて解析した場合、レコードを原文を含むページのURLに振り分けるテスト"""
+    records = TrailConditionSchemaList.model_validate_json(RESPONSE)
+    page_texts = [
+        ("https://example.com/closures", "奥多摩の通行止め情報"),
+        ("https://example.com/hazards", "鴨沢ルート: 落石注意"),
+    ]
+
+    assert attribute_record_urls(records, page_texts) == ["https://example.com/hazards"]
@@ -0,0 +1,104 @@
+"""
+PolitenessSchedulerのテスト
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt
+
+from trail_status.services.replay import ReplayFetcher
+from trail_status.services.scheduler import PolitenessScheduler
+
+
+@pytest.mark.asyncio
+async def test_per_host_concurrency_limit():
+    """同一ホストへの同時実行数が制限されるテスト"""
+    scheduler = PolitenessScheduler(max_concurrency=10, per_host_concurrency=1, per_host_interval=0)
+    running = 0
+    max_running = 0
+
+    async def task(url):
+        nonlocal running, max_running
+        async with scheduler.slot(url):
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(task(f"https://example.com/page{i}") for i in range(5)))
+
+    assert max_running == 1
+    assert scheduler.stats.request_count == 5
+    assert scheduler.stats.max_queue_depth >= 4
+    assert scheduler.stats.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_per_host_interval():
+    """同一ホストへのリクエスト間隔が空けられるテスト"""
+    scheduler = PolitenessScheduler(per_host_concurrency=2, per_host_interval=0.05)
+    loop = asyncio.get_running_loop()
+    started = []
+
+    async def task(url):
+        async with scheduler.slot(url):
+            started.append(loop.time())
+
+    await asyncio.gather(*(task("https://example.com/") for _ in range(3)))
+
+    assert started[-1] - started[0] >= 0.09
+    assert scheduler.stats.total_wait_time > 0
+
+
+@pytest.mark.asyncio
+async def test_robots_fetch_counts_against_global_limit():
+    """robots.txtの取得も全体の同時実行数の枠内で行うテスト"""
+    scheduler = PolitenessScheduler(max_concurrency=1, per_host_interval=0)
+    requested = []
+    transport = httpx.MockTransport(lambda request: requested.append(request.url.host) or httpx.Response(404))
+
+    async def task(url, client):
+        async with scheduler.slot(url, client):
+            pass
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with scheduler.slot("https://a.example.com/"):
+            other = asyncio.create_task(task("https://b.example.com/", client))
+            await asyncio.sleep(0.01)
+            assert requested == []
+        await other
+
+    assert requested == ["b.example.com"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_retry_reacquires_slot(replay_pipeline, inline_executor, monkeypatch):
+    """取得の再試行は枠を確保し直して行われるテスト"""
+    from trail_status.services import pipeline as pipeline_module
+
+    url = "https://example.com/trail"
+    attempts = []
+
+    class FlakyFetcher(ReplayFetcher):
+        async def fetch(self, client, url, etag=None, last_modified=None, raw_hash=None, profile=None):
+            attempts.append(url)
+            if len(attempts) == 1:
+                raise httpx.ConnectError("接続失敗")
+            return await super().fetch(client, url, etag, last_modified, raw_hash, profile)
+
+    monkeypatch.setattr(
+        pipeline_module,
+        "fetch_retrying",
+        lambda: AsyncRetrying(stop=stop_after_attempt(3), retry=retry_if_exception_type(httpx.HTTPError), reraise=True),
+    )
+    html = "<html><body><p>鴨沢ルートで落石が発生しています。</p></body></html>".encode("utf-8")
+    pipeline, _ = replay_pipeline(fetcher=FlakyFetcher({url: html}, executor=inline_executor))
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+
+    [(_, result)] = await pipeline.process_source_data([source_data], None)
+
+    assert len(attempts) == 2
+    assert pipeline.scheduler.stats.request_count == 2
+    assert "error" not in result
@@ -0,0 +1,55 @@
+"""
+SnapshotStoreのテスト
+"""
+
+import pytest
+
+from trail_status.services.snapshot import SnapshotStore
+
+
+def test_put_and_get(tmp_path):
+    """保存したスナップショットを読み出せるテスト"""
+    store = SnapshotStore(tmp_path)
+    raw = "<html><body><p>通行止め</p></body></html>".encode("utf-8")
+
+    content_hash = store.put(raw)
+
+    assert content_hash == SnapshotStore.hash_content(raw)
+    assert store.exists(content_hash)
+    assert store.get(content_hash) == raw
+
+
+def test_put_deduplicates(tmp_path):
+    """同じ内容は1回だけ保存されるテスト"""
+    store = SnapshotStore(tmp_path)
+    raw = b"<html>same</html>"
+
+    hash1 = store.put(raw)
+    hash2 = store.put(raw)
+
+    assert hash1 == hash2
+    assert list(store.iter_hashes()) == [hash1]
+
+
+def test_get_missing(tmp_path):
+    """存在しないスナップショットの読み出しテスト"""
+    store = SnapshotStore(tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        store.get("0" * 64)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_links_snapshot_only_when_raw_changed(tmp_path, replay_pipeline):
+    """生データが前回と同じページはスナップショットを紐付けないテスト"""
+    url = "https://example.com/trail"
+    raw = "<html><body><p>鴨沢ルートで落石が発生しています。</p></body></html>".encode("utf-8")
+    pipeline, _ = replay_pipeline({url: raw}, snapshot_store=SnapshotStore(tmp_path), save_snapshots=True)
+    source_data = {"id": 1, "name": "テスト", "url1": url, "prompt_key": "okutama_vc", "content_hash": ""}
+
+    [(_, first)] = await pipeline.process_source_data([source_data], None)
+    raw_hash = first["pages"]["url1"]["new_raw_hash"]
+    [(_, second)] = await pipeline.process_source_data([{**source_data, "raw_content_hash": raw_hash}], None)
+
+    assert first["pages"]["url1"]["snapshot_hash"] == SnapshotStore.hash_content(raw)
+    assert "snapshot_hash" not in second["pages"]["url1"]
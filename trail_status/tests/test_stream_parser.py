@@ -0,0 +1,122 @@
+"""
+ストリーミング応答の逐次パースのテスト
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import ValidationError
+
+from trail_status.services.llm_client import DeepseekClient, LlmConfig
+from trail_status.services.stream_parser import RecordStreamParser, StreamStructureError
+
+RECORD = {
+    "trail_name": "鴨沢ルート",
+    "mountain_name_raw": "雲取山",
+    "title": "通行止め {注意}",
+    "description": '崩落のため "全面" 通行止め',
+    "status": "CLOSURE",
+    "area": "OKUTAMA",
+}
+
+
+def _split(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_records_are_yielded_as_they_complete():
+    """文字列中の括弧・エスケープを考慮して、閉じたレコードから順に取り出すテスト"""
+    text = json.dumps({"trail_condition_records": [RECORD, {**RECORD, "trail_name": "石尾根"}]}, ensure_ascii=False)
+    received = []
+    parser = RecordStreamParser(received.append)
+
+    completed_at = []
+    for i, chunk in enumerate(_split(text, 7)):
+        if parser.feed(chunk):
+            completed_at.append(i)
+
+    assert [record.trail_name for record in received] == ["鴨沢ルート", "石尾根"]
+    assert received[0].title == "通行止め {注意}"
+    assert completed_at[0] < len(_split(text, 7)) - 1  # 受信完了前に1件目を取り出せる
+    assert parser.text == text
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_records_key_only_at_top_level(size):
+    """他のキーの値に含まれる同名のキーには反応せず、トップレベルの配列のみを取り出すテスト"""
+    text = json.dumps(
+        {
+            "note": '"trail_condition_records": [{}]',
+            "meta": {"trail_condition_records": [{"trail_name": "別の配列"}]},
+            "trail_condition_records": [RECORD],
+        },
+        ensure_ascii=False,
+    )
+    parser = RecordStreamParser()
+
+    for chunk in _split(text, size):
+        parser.feed(chunk)
+
+    assert [record.trail_name for record in parser.records] == ["鴨沢ルート"]
+
+
+def test_invalid_record_aborts_immediately():
+    """スキーマに合わないレコードは後続を待たずにValidationErrorとなるテスト"""
+    parser = RecordStreamParser()
+    parser.feed('{"trail_condition_records": [')
+    with pytest.raises(ValidationError):
+        parser.feed(json.dumps({**RECORD, "status": "UNKNOWN"}))
+
+
+@pytest.mark.parametrize("text", ["```json\n{", '{"trail_condition_records": ["text"'])
+def test_structure_error(text):
+    with pytest.raises(StreamStructureError):
+        RecordStreamParser().feed(text)
+
+
+class FakeStream:
+    """openaiのAsyncStreamの代替"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_deepseek_streaming(mock_api_keys, sample_llm_config, monkeypatch, settings):
+    """ストリーミング時に受信途中でレコードを検証し、使用量を最後のチャンクから取得するテスト"""
+    settings.LLM_STREAMING_ENABLED = True
+    text = json.dumps({"trail_condition_records": [RECORD]}, ensure_ascii=False)
+    usage = MagicMock(prompt_tokens=100, completion_tokens=50, prompt_cache_hit_tokens=0)
+    usage.completion_tokens_details.reasoning_tokens = 0
+    chunks = [
+        SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+        for part in _split(text, 10)
+    ]
+    stream = FakeStream([*chunks, SimpleNamespace(usage=usage, choices=[])])
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=stream)
+    monkeypatch.setattr("openai.AsyncOpenAI", MagicMock(return_value=mock_client))
+
+    client = DeepseekClient(LlmConfig(**sample_llm_config))
+
+    validated_data, token_stats = await client.generate()
+
+    assert [record.trail_name for record in validated_data.trail_condition_records] == ["鴨沢ルート"]
+    assert token_stats.input_tokens == 100
+    assert client.first_record_time is not None
+    assert stream.closed
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True